@@ -0,0 +1,136 @@
+"""
+检查程序启动时的导入开销
+使用 python -X importtime 导入主窗口模块，统计导入耗时并检查启动时不应加载的重量级模块
+（yt-dlp、requests/urllib3、aiohttp以及依赖它们的API客户端，这些模块在第一次下载或创建任务时才导入）
+
+用法:
+    python check_startup_imports.py                  # 使用默认预算
+    python check_startup_imports.py --budget-ms 500  # 指定导入耗时预算（毫秒）
+超出预算或加载了不应加载的模块时以退出码1结束
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+# 启动时导入的模块（main.py导入主窗口，主窗口再导入各个界面）
+STARTUP_MODULE = "src.ui.main_window"
+
+# 启动时不应加载的模块（包括其子模块）
+DEFERRED_MODULES = (
+    "yt_dlp",
+    "requests",
+    "urllib3",
+    "aiohttp",
+    "src.api_clients",
+    "src.async_api_clients",
+    "src.http_session",
+    "src.cover_downloader",
+)
+
+# 默认的导入耗时预算（毫秒）
+DEFAULT_BUDGET_MS = 800
+
+
+def run_importtime(code: str, project_root: Path) -> str:
+    """在新的解释器中执行代码，返回 -X importtime 的输出"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=str(project_root),
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        # 导入失败时，错误信息在importtime输出之后
+        lines = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise Exception(f"执行 {code} 失败:\n" + "\n".join(lines))
+    return result.stderr
+
+
+def parse_importtime(output: str) -> list:
+    """解析 -X importtime 的输出
+    
+    Returns:
+        [(模块名, 嵌套层级, 自身耗时微秒, 累计耗时微秒)]，按输出顺序
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 表头
+        # 模块名前每两个空格表示一层嵌套（分隔符后固定有一个空格）
+        raw_name = parts[2][1:]
+        name = raw_name.lstrip()
+        level = (len(raw_name) - len(name)) // 2
+        entries.append((name, level, int(parts[0]), int(parts[1])))
+    return entries
+
+
+def measure(entries: list, baseline: set) -> int:
+    """计算累计导入耗时（微秒）：解释器自身启动时（baseline）之外的顶层导入的累计耗时之和
+    
+    importtime按导入完成的顺序输出，子模块在父模块之前，因此只需累加顶层（层级0）的条目
+    """
+    return sum(cumulative for name, level, _, cumulative in entries
+               if level == 0 and name not in baseline)
+
+
+def find_deferred(entries: list) -> list:
+    """找出加载了的、启动时不应加载的模块"""
+    loaded = []
+    for name, _, _, _ in entries:
+        for deferred in DEFERRED_MODULES:
+            if name == deferred or name.startswith(deferred + "."):
+                if deferred not in loaded:
+                    loaded.append(deferred)
+    return loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查程序启动时的导入开销")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"导入耗时预算（毫秒），默认{DEFAULT_BUDGET_MS}")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="测量次数，取最短的一次（第一次运行可能包含编译字节码的时间），默认3")
+    parser.add_argument("--top", type=int, default=15, help="列出自身耗时最多的模块数，默认15")
+    args = parser.parse_args()
+    
+    project_root = Path(__file__).parent.absolute()
+    
+    best = None
+    try:
+        baseline = {name for name, _, _, _ in parse_importtime(run_importtime("pass", project_root))}
+        for _ in range(max(1, args.runs)):
+            entries = parse_importtime(run_importtime(f"import {STARTUP_MODULE}", project_root))
+            total = measure(entries, baseline)
+            if best is None or total < best[0]:
+                best = (total, entries)
+    except Exception as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+    total, entries = best
+    entries = [entry for entry in entries if entry[0] not in baseline]
+    
+    print(f"导入 {STARTUP_MODULE} 耗时: {total / 1000:.1f} ms（预算 {args.budget_ms:.0f} ms）")
+    print(f"\n自身耗时最多的 {args.top} 个模块:")
+    for name, _, self_us, cumulative in sorted(entries, key=lambda entry: entry[2], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  (累计 {cumulative / 1000:8.1f} ms)  {name}")
+    
+    ok = True
+    deferred = find_deferred(entries)
+    if deferred:
+        ok = False
+        print(f"\n✗ 启动时加载了应延迟导入的模块: {', '.join(deferred)}")
+    if total > args.budget_ms * 1000:
+        ok = False
+        print(f"\n✗ 导入耗时超出预算 {total / 1000 - args.budget_ms:.1f} ms")
+    
+    if not ok:
+        sys.exit(1)
+    print("\n✓ 启动导入检查通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,68 @@
 API客户端，用于获取shortlinetv和reelshort的视频信息
 """
 import re
+import time
+import threading
 import requests
 from typing import List, Dict, Optional, Tuple
 import logging
 # 使用绝对导入，兼容打包后的exe
 try:
     from src.config import config
+    from src.http_session import get_session
+    from src.credential_pool import credential_pool, CREDENTIAL_FAILURE_STATUSES
+    from src.models import Credential
 except ImportError:
     from .config import config
+    from .http_session import get_session
+    from .credential_pool import credential_pool, CREDENTIAL_FAILURE_STATUSES
+    from .models import Credential
 
 logger = logging.getLogger(__name__)
 
 
-class ShortLineTVClient:
+class ApiCacheMixin:
+    """剧集列表API响应的本地缓存（保存在数据库api_cache表中）
+    
+    子类设置CACHE_SOURCE，并在构造时设置self.db（为None时不使用缓存）
+    """
+    
+    CACHE_SOURCE = ''
+    db = None
+    
+    def _load_cached_payload(self, cache_key, max_age: Optional[float] = None) -> Optional[Dict]:
+        """读取未过期的缓存，没有或出错时返回None
+        
+        max_age为缓存允许的最大年龄（秒），不超过API_CACHE_TTL；为None时使用API_CACHE_TTL
+        """
+        if self.db is None or config.API_CACHE_TTL <= 0:
+            return None
+        if max_age is None or max_age > config.API_CACHE_TTL:
+            max_age = config.API_CACHE_TTL
+        try:
+            payload = self.db.get_api_cache(self.CACHE_SOURCE, cache_key, max_age)
+        except Exception as e:
+            logger.warning(f"读取API缓存失败: {e}")
+            return None
+        if payload is not None:
+            logger.info(f"使用缓存的剧集信息: {self.CACHE_SOURCE}/{cache_key}")
+        return payload
+    
+    def _store_payload(self, cache_key, payload: Dict):
+        """保存API响应到缓存（失败不影响主流程）"""
+        if self.db is None or config.API_CACHE_TTL <= 0:
+            return
+        try:
+            self.db.set_api_cache(self.CACHE_SOURCE, cache_key, payload)
+        except Exception as e:
+            logger.warning(f"保存API缓存失败: {e}")
+
+
+class ShortLineTVClient(ApiCacheMixin):
     """ShortLineTV API客户端"""
     
+    CACHE_SOURCE = 'shortlinetv'
+    
     API_URL = "https://shortlinetv.com/api/frontend/video/episode"
     
     # 默认headers模板（如果未提供自定义token和uid，使用默认值）
@@ -49,24 +96,47 @@ class ShortLineTVClient:
         "__cf_bm": "7SEzu6x9MGo643kfcy_Rm3eRKEChUYl9E_I3JvXj1MQ-1764500722-1.0.1.1-cUZ72NdmDl3aVZE9Laca9EJWNMga5pPWGvjxkFd5GTSE180troyjW7Dn4_9drOqeUJm1qwSFcveUPUjiiIf_wtQCeFhziAnFYg5DtUakuLk"
     }
     
-    def __init__(self, xtoken: str = None, uid: str = None):
+    def __init__(self, xtoken: str = None, uid: str = None, db=None):
         """初始化客户端
         
         Args:
             xtoken: access-token，用于替换headers中的access-token
             uid: uid-token，用于替换headers中的uid-token
+            db: 数据库实例（可选），用于缓存API响应；提供时请求在凭证池中轮换，xtoken/uid会加入凭证池
         """
-        # 构建headers，使用自定义token和uid（如果提供）
-        self.HEADERS = self.DEFAULT_HEADERS.copy()
+        self.db = db
+        # 构建headers和cookies，使用自定义token和uid（如果提供），凭证池不可用时使用
+        self.HEADERS, self.COOKIES = self.build_auth(xtoken, uid)
+        
+        if db is not None:
+            credential_pool.attach_database(db)
+            credential_pool.add(xtoken, uid)
+    
+    @classmethod
+    def build_auth(cls, xtoken: str = None, uid: str = None) -> Tuple[Dict, Dict]:
+        """根据xtoken和uid构建请求的headers和cookies"""
+        headers = cls.DEFAULT_HEADERS.copy()
         if xtoken:
-            self.HEADERS["access-token"] = xtoken
+            headers["access-token"] = xtoken
         if uid:
-            self.HEADERS["uid-token"] = uid
+            headers["uid-token"] = uid
         
-        # 构建cookies，使用自定义token（如果提供）
-        self.COOKIES = self.DEFAULT_COOKIES.copy()
+        cookies = cls.DEFAULT_COOKIES.copy()
         if xtoken:
-            self.COOKIES["PC_AC_ACCESS_TOKEN"] = xtoken
+            cookies["PC_AC_ACCESS_TOKEN"] = xtoken
+        return headers, cookies
+    
+    def acquire_auth(self) -> Tuple[Optional[Credential], Dict, Dict]:
+        """为一次请求选择凭证：优先从凭证池中取最久未使用的可用凭证，否则使用客户端自身的凭证
+        
+        Returns:
+            (credential, headers, cookies)，使用客户端自身凭证时credential为None
+        """
+        credential = credential_pool.acquire() if self.db is not None else None
+        if credential is None:
+            return None, self.HEADERS, self.COOKIES
+        headers, cookies = self.build_auth(credential.xtoken, credential.uid)
+        return credential, headers, cookies
     
     @staticmethod
     def extract_video_id(url: str) -> Optional[int]:
@@ -76,28 +146,57 @@ class ShortLineTVClient:
             return int(match.group(1))
         return None
     
-    def get_episodes(self, video_id: int) -> Dict:
-        """获取所有剧集信息"""
+    def get_episodes(self, video_id: int, use_cache: bool = True,
+                     cache_max_age: Optional[float] = None) -> Dict:
+        """获取所有剧集信息
+        
+        Args:
+            video_id: 视频ID
+            use_cache: 是否优先使用未过期的本地缓存
+            cache_max_age: 可接受的缓存最大年龄（秒），为None时使用API_CACHE_TTL
+        """
+        if use_cache:
+            cached = self._load_cached_payload(video_id, cache_max_age)
+            if cached is not None:
+                return cached
+        
         try:
             payload = {
                 "video_id": str(video_id),
                 "episode_num": "1"
             }
             
-            response = requests.post(
-                self.API_URL,
-                headers=self.HEADERS,
-                cookies=self.COOKIES,
-                json=payload,
-                timeout=config.API_TIMEOUT
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            if data.get("code") == 0 and "data" in data:
-                return data["data"]
-            else:
-                raise Exception(f"API返回错误: {data.get('msg', '未知错误')}")
+            # 401/403/429或接口返回错误时换下一个凭证重试；每次尝试后关闭响应，连接归还连接池
+            for attempt in range(config.CREDENTIAL_MAX_ATTEMPTS):
+                last_attempt = attempt == config.CREDENTIAL_MAX_ATTEMPTS - 1
+                credential, headers, cookies = self.acquire_auth()
+                with get_session().post(
+                    self.API_URL,
+                    headers=headers,
+                    cookies=cookies,
+                    json=payload,
+                    timeout=config.API_TIMEOUT
+                ) as response:
+                    if credential is not None and response.status_code in CREDENTIAL_FAILURE_STATUSES:
+                        credential_pool.report_failure(credential, response.status_code,
+                                                       response.headers.get('Retry-After'))
+                        if not last_attempt:
+                            continue
+                    response.raise_for_status()
+                    data = response.json()
+                
+                if data.get("code") == 0 and "data" in data:
+                    if credential is not None:
+                        credential_pool.report_success(credential)
+                    self._store_payload(video_id, data["data"])
+                    return data["data"]
+                
+                error_message = f"API返回错误: {data.get('msg', '未知错误')}"
+                if credential is not None:
+                    # 凭证失效时接口也可能返回200，只在code中报告错误
+                    credential_pool.report_failure(credential, response.status_code, message=error_message)
+                if credential is None or last_attempt:
+                    raise Exception(error_message)
         
         except requests.exceptions.RequestException as e:
             logger.error(f"请求shortlinetv API失败: {e}")
@@ -155,9 +254,146 @@ class ShortLineTVClient:
         return sorted(episodes, key=lambda x: x["episode_num"]), cover_url
 
 
-class ReelShortClient:
+# HLS流地址（_next/data JSON中的字符串值）
+STREAM_URL_PATTERN = re.compile(r'^https?://\S+?\.m3u8(?:[?#]\S*)?$', re.IGNORECASE)
+
+
+def find_stream_urls(data) -> Dict[str, str]:
+    """在任意结构的JSON中查找HLS流地址，按所属的chapter_id归类
+    
+    不依赖具体字段名：遍历所有字符串值，匹配.m3u8地址，归属到最近一层带chapter_id的对象；
+    不在任何章节对象内的地址归到空字符串键下。同一章节有多个地址时保留第一个。
+    
+    Returns:
+        {chapter_id: stream_url}
+    """
+    stream_urls = {}
+    stack = [(data, '')]
+    while stack:
+        node, chapter_id = stack.pop()
+        if isinstance(node, dict):
+            node_chapter_id = node.get('chapter_id')
+            if isinstance(node_chapter_id, str) and node_chapter_id:
+                chapter_id = node_chapter_id
+            children = node.values()
+        elif isinstance(node, list):
+            children = node
+        else:
+            if isinstance(node, str) and STREAM_URL_PATTERN.match(node):
+                stream_urls.setdefault(chapter_id, node)
+            continue
+        # 逆序压栈，使同一层中靠前的地址先被处理
+        stack.extend((child, chapter_id) for child in reversed(list(children)))
+    return stream_urls
+
+
+class BuildIdScanner:
+    """增量扫描HTML字节流，找到buildId后即可停止读取
+    
+    buildId可能被分块截断在两个chunk之间，因此保留上一块末尾中可能属于匹配的部分与下一块拼接后再扫描
+    """
+    
+    PATTERN = re.compile(rb'"buildId"\s*:\s*"([^"]+)"')
+    MARKER = b'"buildId"'
+    # 最后一个"buildId"之后最多保留的字节数（超过后认为不是有效匹配）
+    MAX_PENDING = 4096
+    
+    def __init__(self):
+        self._pending = b''
+    
+    def feed(self, chunk: bytes) -> Optional[str]:
+        """输入一块数据，找到buildId时返回它，否则返回None"""
+        data = self._pending + chunk
+        match = self.PATTERN.search(data)
+        if match:
+            return match.group(1).decode('utf-8', 'replace')
+        
+        marker_index = data.rfind(self.MARKER)
+        if marker_index != -1 and len(data) - marker_index <= self.MAX_PENDING:
+            # "buildId"已出现但值还不完整，保留从标记开始的内容
+            self._pending = data[marker_index:]
+        else:
+            # 只保留可能是被截断的标记前缀
+            self._pending = data[-(len(self.MARKER) - 1):]
+        return None
+
+
+class BuildIdCache:
+    """ReelShort buildId的进程级缓存
+    
+    buildId只在站点重新部署时变化，缓存后带TTL持久化到settings表，重启后仍可复用。
+    fetch_lock用于合并并发的页面请求：同一时间只有一个线程去下载页面，其余线程等待后直接使用其结果
+    """
+    
+    SETTING_KEY = 'reelshort_build_id'
+    SETTING_FETCHED_AT_KEY = 'reelshort_build_id_fetched_at'
+    
+    def __init__(self):
+        self._build_id: Optional[str] = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self.fetch_lock = threading.Lock()
+        self._db = None
+    
+    def attach_database(self, db):
+        """绑定数据库用于持久化（只绑定一次），并加载已保存的buildId"""
+        if db is None or self._db is not None:
+            return
+        self._db = db
+        try:
+            build_id = db.get_setting(self.SETTING_KEY)
+            fetched_at = float(db.get_setting(self.SETTING_FETCHED_AT_KEY, '0') or 0)
+        except Exception as e:
+            logger.warning(f"加载缓存的buildId失败: {e}")
+            return
+        with self._lock:
+            if build_id and fetched_at > self._fetched_at:
+                self._build_id = build_id
+                self._fetched_at = fetched_at
+    
+    def get(self) -> Optional[str]:
+        """获取未过期的buildId，没有或已过期时返回None"""
+        with self._lock:
+            if self._build_id and time.time() - self._fetched_at < config.REELSHORT_BUILD_ID_TTL:
+                return self._build_id
+            return None
+    
+    def set(self, build_id: str):
+        """更新buildId并持久化"""
+        fetched_at = time.time()
+        with self._lock:
+            self._build_id = build_id
+            self._fetched_at = fetched_at
+        self._persist(build_id, fetched_at)
+    
+    def invalidate(self, build_id: str):
+        """使指定的buildId失效（仅当缓存中仍是该值时）"""
+        with self._lock:
+            if self._build_id != build_id:
+                return
+            self._build_id = None
+            self._fetched_at = 0.0
+        self._persist('', 0.0)
+    
+    def _persist(self, build_id: str, fetched_at: float):
+        if self._db is None:
+            return
+        try:
+            self._db.set_setting(self.SETTING_KEY, build_id)
+            self._db.set_setting(self.SETTING_FETCHED_AT_KEY, str(fetched_at))
+        except Exception as e:
+            logger.warning(f"保存buildId缓存失败: {e}")
+
+
+# 进程内共享的buildId缓存
+build_id_cache = BuildIdCache()
+
+
+class ReelShortClient(ApiCacheMixin):
     """ReelShort API客户端"""
     
+    CACHE_SOURCE = 'reelshort'
+    
     BASE_URL = "https://www.reelshort.com"
     
     HEADERS = {
@@ -195,6 +431,15 @@ class ReelShortClient:
         "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"
     }
     
+    def __init__(self, db=None):
+        """初始化客户端
+        
+        Args:
+            db: 数据库实例（可选），用于持久化buildId缓存和缓存API响应
+        """
+        self.db = db
+        build_id_cache.attach_database(db)
+    
     @staticmethod
     def extract_slug(url: str) -> Optional[str]:
         """从URL中提取slug"""
@@ -243,23 +488,26 @@ class ReelShortClient:
             Exception: 如果无法获取或提取buildId
         """
         try:
-            # 使用PAGE_HEADERS请求剧集页面
-            response = requests.get(
+            # 使用PAGE_HEADERS流式请求剧集页面，找到buildId后立即停止读取并关闭连接
+            scanner = BuildIdScanner()
+            build_id = None
+            bytes_read = 0
+            with get_session().get(
                 drama_url,
                 headers=self.PAGE_HEADERS,
-                timeout=config.API_TIMEOUT
-            )
-            response.raise_for_status()
+                timeout=config.API_TIMEOUT,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                
+                for chunk in response.iter_content(chunk_size=config.BUILD_ID_SCAN_CHUNK_SIZE):
+                    bytes_read += len(chunk)
+                    build_id = scanner.feed(chunk)
+                    if build_id:
+                        break
             
-            # 从HTML中提取buildId
-            # 格式: "buildId":"7f1705b" 或 "buildId": "7f1705b"
-            html_content = response.text
-            build_id_pattern = r'"buildId"\s*:\s*"([^"]+)"'
-            match = re.search(build_id_pattern, html_content)
-            
-            if match:
-                build_id = match.group(1)
-                logger.info(f"成功提取buildId: {build_id}")
+            if build_id:
+                logger.info(f"成功提取buildId: {build_id}（读取 {bytes_read} 字节）")
                 return build_id
             else:
                 raise Exception("无法从页面HTML中提取buildId")
@@ -271,38 +519,81 @@ class ReelShortClient:
             logger.error(f"提取buildId失败: {e}")
             raise Exception(f"提取buildId失败: {str(e)}")
     
-    def get_movie_data(self, slug: str, drama_url: str = None, build_id: str = None) -> Dict:
+    def resolve_build_id(self, drama_url: Optional[str], stale_build_id: str = None) -> str:
+        """获取buildId，优先使用缓存，并发请求只会触发一次页面下载
+        
+        Args:
+            drama_url: 剧集网址（缓存不可用时用于下载页面）
+            stale_build_id: 已确认失效的buildId（_next/data返回404时传入），缓存中仍是该值时强制刷新
+            
+        Returns:
+            buildId字符串
+        """
+        cached = build_id_cache.get()
+        if cached and cached != stale_build_id:
+            return cached
+        
+        with build_id_cache.fetch_lock:
+            # 等待期间其他线程可能已经刷新了缓存
+            cached = build_id_cache.get()
+            if cached and cached != stale_build_id:
+                return cached
+            if not drama_url:
+                raise Exception("需要提供drama_url或build_id")
+            build_id = self.get_build_id(drama_url)
+            build_id_cache.set(build_id)
+            return build_id
+    
+    def _request_movie_data(self, build_id: str, slug: str) -> requests.Response:
+        """请求_next/data接口（不检查状态码）"""
+        api_url = f"{self.BASE_URL}/_next/data/{build_id}/en/movie/{slug}.json"
+        params = {"slug": slug}
+        return get_session().get(
+            api_url,
+            headers=self.HEADERS,
+            params=params,
+            timeout=config.API_TIMEOUT
+        )
+    
+    def get_movie_data(self, slug: str, drama_url: str = None, build_id: str = None,
+                       use_cache: bool = True, cache_max_age: Optional[float] = None) -> Dict:
         """获取电影数据
         
         Args:
             slug: 剧集slug
-            drama_url: 剧集网址（用于获取buildId，如果build_id未提供）
-            build_id: buildId（如果提供则直接使用，否则从drama_url获取）
+            drama_url: 剧集网址（缓存的buildId不可用时用于获取buildId）
+            build_id: buildId（如果提供则直接使用，否则使用缓存或从drama_url获取）
+            use_cache: 是否优先使用未过期的本地缓存
+            cache_max_age: 可接受的缓存最大年龄（秒），为None时使用API_CACHE_TTL
             
         Returns:
             电影数据字典
         """
+        if use_cache:
+            cached = self._load_cached_payload(slug, cache_max_age)
+            if cached is not None:
+                return cached
+        
         try:
-            # 如果没有提供build_id，则从drama_url获取
-            if not build_id:
-                if not drama_url:
-                    raise Exception("需要提供drama_url或build_id")
-                build_id = self.get_build_id(drama_url)
+            # 如果没有提供build_id，则使用缓存（缓存不可用时从drama_url获取）
+            build_id_from_cache = not build_id
+            if build_id_from_cache:
+                build_id = self.resolve_build_id(drama_url)
+            
+            response = self._request_movie_data(build_id, slug)
             
-            # 构建API URL（使用动态获取的buildId）
-            api_url = f"{self.BASE_URL}/_next/data/{build_id}/en/movie/{slug}.json"
-            params = {"slug": slug}
+            # 404说明站点已重新部署，buildId失效：刷新buildId后重试一次
+            if response.status_code == 404 and build_id_from_cache:
+                logger.info(f"buildId {build_id} 已失效，重新获取")
+                build_id_cache.invalidate(build_id)
+                build_id = self.resolve_build_id(drama_url, stale_build_id=build_id)
+                response = self._request_movie_data(build_id, slug)
             
-            response = requests.get(
-                api_url,
-                headers=self.HEADERS,
-                params=params,
-                timeout=config.API_TIMEOUT
-            )
             response.raise_for_status()
             
             data = response.json()
             if "pageProps" in data and "data" in data["pageProps"]:
+                self._store_payload(slug, data["pageProps"]["data"])
                 return data["pageProps"]["data"]
             else:
                 raise Exception("API返回数据格式错误")
@@ -399,7 +690,9 @@ class ReelShortClient:
                 "episode_num": episode_num,  # 内部使用从0开始的编号
                 "episode_name": f"{drama_name} - Episode {episode_num}",
                 "episode_url": episode_url,
-                "download_url": episode_url  # reelshort直接使用episode_url作为下载URL
+                # 默认使用episode_url作为下载URL（由yt-dlp解析页面），解析到流地址后替换，见resolve_stream_urls
+                "download_url": episode_url,
+                "chapter_id": chapter_id
             })
         
         return sorted(episodes, key=lambda x: x["episode_num"]), cover_url
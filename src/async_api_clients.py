@@ -0,0 +1,462 @@
+"""
+异步API客户端，基于aiohttp并发获取shortlinetv和reelshort的剧集信息
+"""
+import asyncio
+import threading
+import logging
+import concurrent.futures
+import functools
+from typing import List, Dict, Optional, Tuple, Coroutine, Any, Callable
+import aiohttp
+# 使用绝对导入，兼容打包后的exe
+try:
+    from src.config import config
+    from src.api_clients import (ShortLineTVClient, ReelShortClient, BuildIdScanner, build_id_cache,
+                                 find_stream_urls)
+    from src.credential_pool import credential_pool, CREDENTIAL_FAILURE_STATUSES
+    from src.error_policy import circuit_breakers, CircuitOpenError
+except ImportError:
+    from .config import config
+    from .api_clients import (ShortLineTVClient, ReelShortClient, BuildIdScanner, build_id_cache,
+                              find_stream_urls)
+    from .credential_pool import credential_pool, CREDENTIAL_FAILURE_STATUSES
+    from .error_policy import circuit_breakers, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+async def _run_blocking(func: Callable, *args) -> Any:
+    """在默认线程池中执行阻塞调用（SQLite读写等），避免卡住共享的事件循环上其他并发的请求"""
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args))
+
+
+class AsyncHostUnavailableError(CircuitOpenError, aiohttp.ClientConnectionError):
+    """目标主机熔断中，请求未发出（调用方按aiohttp连接错误处理即可）"""
+
+
+async def _on_request_start(session, context, params):
+    """发送前检查目标主机的熔断器"""
+    breaker = circuit_breakers.for_url(str(params.url))
+    if breaker is not None and not breaker.allow_request():
+        raise AsyncHostUnavailableError(breaker.host, breaker.open_until)
+
+
+async def _on_request_end(session, context, params):
+    """收到响应后计入熔断器：5xx计为失败，其他计为成功"""
+    breaker = circuit_breakers.for_url(str(params.url))
+    if breaker is None:
+        return
+    if params.response.status >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+async def _on_request_exception(session, context, params):
+    """请求异常时计入熔断器（网络错误和超时计为失败）"""
+    circuit_breakers.record(str(params.url), params.exception)
+
+
+def _create_trace_config() -> aiohttp.TraceConfig:
+    """创建把请求结果计入熔断器的TraceConfig（与同步会话的CountingHTTPAdapter一致）"""
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_request_end.append(_on_request_end)
+    trace_config.on_request_exception.append(_on_request_exception)
+    return trace_config
+
+
+class AsyncHttpRuntime:
+    """异步HTTP运行时：一个后台线程中的事件循环和一个共享的aiohttp连接池
+
+    所有异步客户端共用同一个事件循环和ClientSession，Qt线程通过submit()/run()提交协程
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._build_id_lock: Optional[asyncio.Lock] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        """确保后台事件循环已启动"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="AsyncHttpRuntime",
+                    daemon=True
+                )
+                self._thread.start()
+                logger.debug("异步HTTP事件循环已启动")
+            return self._loop
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """后台事件循环"""
+        return self._ensure_started()
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """获取共享的ClientSession（必须在后台事件循环中调用）"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=config.ASYNC_HTTP_LIMIT,
+                limit_per_host=config.ASYNC_HTTP_LIMIT_PER_HOST,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=config.API_TIMEOUT),
+                # 不保存服务端下发的cookie，每次请求显式传入（与同步会话保持一致）
+                cookie_jar=aiohttp.DummyCookieJar(),
+                trace_configs=[_create_trace_config()],
+            )
+        return self._session
+
+    def get_build_id_lock(self) -> asyncio.Lock:
+        """获取用于合并并发buildId请求的锁（必须在后台事件循环中调用）"""
+        if self._build_id_lock is None:
+            self._build_id_lock = asyncio.Lock()
+        return self._build_id_lock
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """从任意线程提交协程，返回concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """从任意线程提交协程并阻塞等待结果（不能在后台事件循环线程中调用）"""
+        return self.submit(coro).result(timeout)
+
+    def close(self):
+        """关闭共享会话并停止事件循环"""
+        with self._lock:
+            loop = self._loop
+            self._loop = None
+        if loop is None:
+            return
+        if self._session is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._session.close(), loop).result(5)
+            except Exception as e:
+                logger.debug(f"关闭异步HTTP会话时出错: {e}")
+            self._session = None
+        self._build_id_lock = None
+        loop.call_soon_threadsafe(loop.stop)
+
+
+_runtime = AsyncHttpRuntime()
+
+
+def get_runtime() -> AsyncHttpRuntime:
+    """获取进程内共享的异步HTTP运行时"""
+    return _runtime
+
+
+class AsyncShortLineTVClient(ShortLineTVClient):
+    """ShortLineTV异步API客户端（extract_video_id/parse_episodes与同步版本相同）"""
+
+    async def get_episodes(self, video_id: int, use_cache: bool = True,
+                           cache_max_age: Optional[float] = None) -> Dict:
+        """获取所有剧集信息（优先使用未过期的本地缓存）"""
+        if use_cache:
+            cached = await _run_blocking(self._load_cached_payload, video_id, cache_max_age)
+            if cached is not None:
+                return cached
+
+        try:
+            payload = {
+                "video_id": str(video_id),
+                "episode_num": "1"
+            }
+
+            session = await _runtime.get_session()
+            # 401/403/429或接口返回错误时换下一个凭证重试
+            for attempt in range(config.CREDENTIAL_MAX_ATTEMPTS):
+                last_attempt = attempt == config.CREDENTIAL_MAX_ATTEMPTS - 1
+                credential, headers, cookies = self.acquire_auth()
+                async with session.post(
+                    self.API_URL,
+                    headers=headers,
+                    cookies=cookies,
+                    json=payload
+                ) as response:
+                    if credential is not None and response.status in CREDENTIAL_FAILURE_STATUSES:
+                        # 凭证状态会写入数据库，在线程池中执行
+                        await _run_blocking(credential_pool.report_failure, credential, response.status,
+                                            response.headers.get('Retry-After'))
+                        if not last_attempt:
+                            continue
+                    response.raise_for_status()
+                    data = await response.json(content_type=None)
+
+                if data.get("code") == 0 and "data" in data:
+                    if credential is not None:
+                        await _run_blocking(credential_pool.report_success, credential)
+                    await _run_blocking(self._store_payload, video_id, data["data"])
+                    return data["data"]
+
+                error_message = f"API返回错误: {data.get('msg', '未知错误')}"
+                if credential is not None:
+                    # 凭证失效时接口也可能返回200，只在code中报告错误
+                    await _run_blocking(functools.partial(credential_pool.report_failure, credential,
+                                                          response.status, message=error_message))
+                if credential is None or last_attempt:
+                    raise Exception(error_message)
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"请求shortlinetv API失败: {e}")
+            raise Exception(f"获取剧集信息失败: {str(e)}")
+
+
+class AsyncReelShortClient(ReelShortClient):
+    """ReelShort异步API客户端（extract_slug/parse_episodes与同步版本相同）"""
+
+    async def get_build_id(self, drama_url: str) -> str:
+        """从剧集页面HTML中提取buildId"""
+        try:
+            scanner = BuildIdScanner()
+            build_id = None
+            bytes_read = 0
+            session = await _runtime.get_session()
+            async with session.get(drama_url, headers=self.PAGE_HEADERS) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(config.BUILD_ID_SCAN_CHUNK_SIZE):
+                    bytes_read += len(chunk)
+                    build_id = scanner.feed(chunk)
+                    if build_id:
+                        # 找到后不再读取剩余页面，直接关闭连接
+                        response.close()
+                        break
+
+            if build_id:
+                logger.info(f"成功提取buildId: {build_id}（读取 {bytes_read} 字节）")
+                return build_id
+            else:
+                raise Exception("无法从页面HTML中提取buildId")
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"请求reelshort页面失败: {e}")
+            raise Exception(f"获取buildId失败: {str(e)}")
+
+    async def resolve_build_id(self, drama_url: Optional[str], stale_build_id: str = None) -> str:
+        """获取buildId，优先使用进程级缓存（与同步客户端共享），并发请求只触发一次页面下载"""
+        cached = build_id_cache.get()
+        if cached and cached != stale_build_id:
+            return cached
+
+        async with _runtime.get_build_id_lock():
+            cached = build_id_cache.get()
+            if cached and cached != stale_build_id:
+                return cached
+            if not drama_url:
+                raise Exception("需要提供drama_url或build_id")
+            build_id = await self.get_build_id(drama_url)
+            # buildId会持久化到settings表，在线程池中执行
+            await _run_blocking(build_id_cache.set, build_id)
+            return build_id
+
+    async def _request_movie_data(self, build_id: str, slug: str) -> Tuple[int, Optional[Dict]]:
+        """请求_next/data接口，返回(状态码, JSON数据)，404时数据为None"""
+        api_url = f"{self.BASE_URL}/_next/data/{build_id}/en/movie/{slug}.json"
+        params = {"slug": slug}
+
+        session = await _runtime.get_session()
+        async with session.get(api_url, headers=self.HEADERS, params=params) as response:
+            if response.status == 404:
+                return response.status, None
+            response.raise_for_status()
+            return response.status, await response.json(content_type=None)
+
+    async def get_movie_data(self, slug: str, drama_url: str = None, build_id: str = None,
+                             use_cache: bool = True, cache_max_age: Optional[float] = None) -> Dict:
+        """获取电影数据（优先使用未过期的本地缓存；buildId失效返回404时自动刷新一次）"""
+        if use_cache:
+            cached = await _run_blocking(self._load_cached_payload, slug, cache_max_age)
+            if cached is not None:
+                return cached
+
+        try:
+            build_id_from_cache = not build_id
+            if build_id_from_cache:
+                build_id = await self.resolve_build_id(drama_url)
+
+            status, data = await self._request_movie_data(build_id, slug)
+
+            if status == 404 and build_id_from_cache:
+                logger.info(f"buildId {build_id} 已失效，重新获取")
+                await _run_blocking(build_id_cache.invalidate, build_id)
+                build_id = await self.resolve_build_id(drama_url, stale_build_id=build_id)
+                status, data = await self._request_movie_data(build_id, slug)
+
+            if status == 404:
+                raise Exception(f"获取剧集信息失败: 404 Not Found ({slug})")
+
+            if "pageProps" in data and "data" in data["pageProps"]:
+                await _run_blocking(self._store_payload, slug, data["pageProps"]["data"])
+                return data["pageProps"]["data"]
+            else:
+                raise Exception("API返回数据格式错误")
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"请求reelshort API失败: {e}")
+            raise Exception(f"获取剧集信息失败: {str(e)}")
+
+    async def _request_episode_data(self, build_id: str, episode_url: str) -> Dict[str, str]:
+        """请求单集页面对应的_next/data接口，返回其中找到的流地址{chapter_id: stream_url}"""
+        page = episode_url.split('?')[0].rstrip('/').rsplit('/episodes/', 1)[-1]
+        api_url = f"{self.BASE_URL}/_next/data/{build_id}/en/episodes/{page}.json"
+        params = {"slug": page}
+
+        session = await _runtime.get_session()
+        async with session.get(api_url, headers=self.HEADERS, params=params) as response:
+            response.raise_for_status()
+            return find_stream_urls(await response.json(content_type=None))
+
+    async def resolve_stream_urls(self, api_data: Dict, episodes: List[Dict], drama_url: str = None,
+                                  max_parallel: int = None) -> int:
+        """解析剧集的HLS流地址并写入episode['download_url']，下载时不再需要yt-dlp逐集抓取页面
+
+        先在已获取的剧集列表数据中查找；其余剧集请求单集的_next/data接口，
+        每个响应中出现的所有章节地址都会被采用，因此通常不需要每集请求一次。
+        先请求一集试探：响应中找不到任何流地址（页面结构不含流地址）时不再请求其余剧集。
+        未解析到的剧集保留页面地址，由yt-dlp处理。
+
+        Returns:
+            解析到流地址的剧集数
+        """
+        if not config.REELSHORT_RESOLVE_STREAMS or not episodes:
+            return 0
+
+        stream_urls = find_stream_urls(api_data)
+        stream_urls.pop('', None)
+
+        def pending_episodes() -> List[Dict]:
+            return [episode for episode in episodes
+                    if episode.get('chapter_id') and episode['chapter_id'] not in stream_urls]
+
+        async def fetch(build_id: str, episode: Dict) -> bool:
+            chapter_id = episode['chapter_id']
+            if chapter_id in stream_urls:
+                return True
+            try:
+                found = await self._request_episode_data(build_id, episode['episode_url'])
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.debug(f"获取剧集 {episode['episode_num']} 的流地址失败: {e}")
+                return False
+            # 不带chapter_id的地址属于当前请求的剧集
+            current = found.pop('', None)
+            for found_chapter_id, url in found.items():
+                stream_urls.setdefault(found_chapter_id, url)
+            if current:
+                stream_urls.setdefault(chapter_id, current)
+            return bool(found or current)
+
+        pending = pending_episodes()
+        if pending:
+            try:
+                build_id = await self.resolve_build_id(drama_url or pending[0]['episode_url'])
+            except Exception as e:
+                logger.warning(f"获取buildId失败，跳过流地址解析: {e}")
+                pending = []
+        if pending and await fetch(build_id, pending[0]):
+            semaphore = asyncio.Semaphore(max_parallel or config.DRAMA_RESOLVE_MAX_PARALLEL)
+
+            async def fetch_limited(episode: Dict):
+                async with semaphore:
+                    await fetch(build_id, episode)
+
+            await asyncio.gather(*(fetch_limited(episode) for episode in pending_episodes()))
+
+        resolved_count = 0
+        for episode in episodes:
+            url = stream_urls.get(episode.get('chapter_id'))
+            if url:
+                episode['download_url'] = url
+                resolved_count += 1
+        logger.info(f"已解析 {resolved_count}/{len(episodes)} 个reelshort剧集的流地址")
+        return resolved_count
+
+
+def resolve_reelshort_streams(api_data: Dict, episodes: List[Dict], drama_url: str = None, db=None) -> int:
+    """同步调用AsyncReelShortClient.resolve_stream_urls（在共享的事件循环中执行），出错时返回0
+
+    episodes中解析到流地址的剧集会被原地更新download_url
+    """
+    try:
+        return _runtime.run(AsyncReelShortClient(db=db).resolve_stream_urls(api_data, episodes, drama_url))
+    except Exception as e:
+        logger.warning(f"解析reelshort流地址失败: {e}")
+        return 0
+
+
+async def resolve_drama(task_data: dict, db=None) -> Tuple[List[Dict], Optional[str]]:
+    """根据任务数据获取并解析剧集列表（与TaskResolveJob的逻辑一致）
+
+    Args:
+        task_data: 包含source、drama_url、start_episode、end_episode、is_default_range，
+                   shortlinetv还可包含xtoken、uid
+        db: 数据库实例（可选），用于持久化缓存
+
+    Returns:
+        (episodes, cover_url)
+    """
+    source = task_data['source']
+    drama_url = task_data['drama_url']
+    start_episode = task_data['start_episode']
+    end_episode = task_data['end_episode']
+    is_default_range = task_data.get('is_default_range', False)
+
+    # 构造客户端时会读写数据库（绑定凭证池、添加凭证、加载buildId缓存），在线程池中执行
+    if source == 'shortlinetv':
+        client = await _run_blocking(AsyncShortLineTVClient, task_data.get('xtoken'), task_data.get('uid'), db)
+        video_id = client.extract_video_id(drama_url)
+        if not video_id:
+            raise Exception("无法从URL中提取video_id")
+        api_data = await client.get_episodes(video_id)
+        return client.parse_episodes(api_data, start_episode, end_episode, is_default_range)
+
+    elif source == 'reelshort':
+        client = await _run_blocking(AsyncReelShortClient, db)
+        slug = client.extract_slug(drama_url)
+        if not slug:
+            raise Exception("无法从URL中提取slug")
+        api_data = await client.get_movie_data(slug, drama_url=drama_url)
+        episodes, cover_url = client.parse_episodes(api_data, slug, start_episode, end_episode, is_default_range)
+        await client.resolve_stream_urls(api_data, episodes, drama_url)
+        return episodes, cover_url
+
+    else:
+        raise Exception(f"未知的来源: {source}")
+
+
+async def resolve_dramas(task_data_list: List[dict], max_parallel: int = None, db=None,
+                         on_result: Optional[Callable[[int, Any], None]] = None) -> List[Any]:
+    """并发解析多个剧集，并发数受max_parallel限制
+
+    Args:
+        on_result: 可选回调(index, result)，每个剧集解析完成（成功或失败）后立即在事件循环线程中调用，
+                   用于逐行报告进度
+
+    Returns:
+        与输入顺序一致的结果列表，每项为(episodes, cover_url)或解析失败时的异常对象
+    """
+    semaphore = asyncio.Semaphore(max_parallel or config.DRAMA_RESOLVE_MAX_PARALLEL)
+
+    async def resolve_one(index: int, task_data: dict):
+        async with semaphore:
+            try:
+                result = await resolve_drama(task_data, db=db)
+            except Exception as e:
+                result = e
+        if on_result is not None:
+            try:
+                on_result(index, result)
+            except Exception as e:
+                logger.error(f"处理解析结果回调时出错: {e}")
+        return result
+
+    return await asyncio.gather(
+        *(resolve_one(index, task_data) for index, task_data in enumerate(task_data_list)),
+        return_exceptions=True
+    )
@@ -0,0 +1,296 @@
+"""
+批量导入：解析粘贴的剧集列表或CSV/JSON文件，生成与NewTaskWidget一致的任务数据
+"""
+import csv
+import io
+import json
+import re
+import logging
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlparse
+# 使用绝对导入，兼容打包后的exe
+try:
+    from src.models import OPEN_END_EPISODE
+except ImportError:
+    from .models import OPEN_END_EPISODE
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ('shortlinetv', 'reelshort')
+
+# 域名到来源的映射（子域名同样匹配）
+SOURCE_HOSTS = {
+    'shortlinetv.com': 'shortlinetv',
+    'reelshort.com': 'reelshort',
+}
+
+# 表示"全部剧集"的区间写法
+ALL_RANGE_WORDS = ('', 'all', '*', '全部')
+
+# 区间写法：单集"5"，区间"1-10"/"1~10"，开放区间"5-"
+RANGE_PATTERN = re.compile(r'^(\d+)\s*(?:([-~～])\s*(\d*))?$')
+
+# CSV表头的别名
+FIELD_ALIASES = {
+    'source': 'source', '来源': 'source',
+    'url': 'url', 'drama_url': 'url', '网址': 'url', '剧集网址': 'url',
+    'range': 'range', '区间': 'range', '剧集区间': 'range',
+    'name': 'name', 'drama_name': 'name', '名称': 'name', '剧集名称': 'name',
+    'task_name': 'task_name', '任务名称': 'task_name',
+    'start_episode': 'start_episode', 'end_episode': 'end_episode',
+    'xtoken': 'xtoken', 'uid': 'uid',
+}
+
+
+class BatchRow:
+    """批量导入中的一行：解析成功时task_data有值，否则error说明原因"""
+    
+    __slots__ = ('line', 'raw', 'task_data', 'error')
+    
+    def __init__(self, line: int, raw: str, task_data: Optional[Dict] = None, error: Optional[str] = None):
+        self.line = line
+        self.raw = raw
+        self.task_data = task_data
+        self.error = error
+    
+    @property
+    def ok(self) -> bool:
+        """是否解析成功"""
+        return self.task_data is not None
+
+
+def infer_source(url: str) -> Optional[str]:
+    """根据网址的域名推断来源，无法识别时返回None"""
+    host = (urlparse(url).hostname or '').lower()
+    for domain, source in SOURCE_HOSTS.items():
+        if host == domain or host.endswith('.' + domain):
+            return source
+    return None
+
+
+def default_range(source: str) -> Tuple[int, int, bool]:
+    """各来源"下载全部剧集"对应的(start_episode, end_episode, is_default_range)
+    
+    与parse_episodes的约定一致：shortlinetv为1-0，reelshort为0-0
+    """
+    if source == 'shortlinetv':
+        return 1, 0, True
+    return 0, 0, True
+
+
+def parse_range(text: str, source: str) -> Tuple[int, int, bool]:
+    """解析剧集区间
+    
+    支持：空/all/全部（全部剧集）、"5"（只下载第5集）、"1-10"、"5-"（第5集及以后）
+    
+    Returns:
+        (start_episode, end_episode, is_default_range)
+    """
+    text = (text or '').strip().lower()
+    if text in ALL_RANGE_WORDS:
+        return default_range(source)
+    
+    match = RANGE_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"无法识别的剧集区间: {text}")
+    
+    start = int(match.group(1))
+    if not match.group(2):
+        return start, start, False
+    
+    if not match.group(3):
+        end = 0 if source == 'shortlinetv' else OPEN_END_EPISODE
+        return start, end, False
+    
+    end = int(match.group(3))
+    if end < start:
+        raise ValueError(f"结束剧集号必须大于等于开始剧集号: {text}")
+    return start, end, False
+
+
+def name_from_url(url: str) -> str:
+    """没有提供名称时，用网址路径的最后一段作为剧集名称"""
+    path = urlparse(url).path.rstrip('/')
+    name = path.split('/')[-1] if path else ''
+    return name or (urlparse(url).hostname or 'Unknown')
+
+
+def build_task_data(fields: Dict[str, str], defaults: Dict) -> Dict:
+    """根据一行的字段和全局默认值构建任务数据
+    
+    Args:
+        fields: 已归一化的字段（source、url、range、name、task_name、start_episode、end_episode、xtoken、uid）
+        defaults: 全局默认值（storage_path必填，xtoken/uid用于shortlinetv）
+    
+    Returns:
+        与NewTaskWidget.task_created信号一致的任务数据
+    """
+    if not defaults.get('storage_path'):
+        raise ValueError("缺少存储地址")
+    url = (fields.get('url') or '').strip()
+    if not url:
+        raise ValueError("缺少剧集网址")
+    if not url.lower().startswith(('http://', 'https://')):
+        raise ValueError(f"无效的剧集网址: {url}")
+    
+    source = (fields.get('source') or '').strip().lower() or infer_source(url)
+    if source not in SOURCES:
+        raise ValueError(f"无法识别来源: {fields.get('source') or url}")
+    
+    if fields.get('start_episode') not in (None, ''):
+        start_episode = int(fields['start_episode'])
+        end_episode = int(fields.get('end_episode') or 0)
+        is_default_range = False
+    else:
+        start_episode, end_episode, is_default_range = parse_range(fields.get('range', ''), source)
+    
+    xtoken = ''
+    uid = ''
+    if source == 'shortlinetv':
+        xtoken = (fields.get('xtoken') or defaults.get('xtoken') or '').strip()
+        uid = (fields.get('uid') or defaults.get('uid') or '').strip()
+        if not xtoken or not uid:
+            raise ValueError("shortlinetv需要xtoken和uid")
+    
+    drama_name = (fields.get('name') or '').strip() or name_from_url(url)
+    task_name = (fields.get('task_name') or '').strip() or drama_name
+    
+    return {
+        "task_name": task_name,
+        "source": source,
+        "drama_name": drama_name,
+        "drama_url": url,
+        "start_episode": start_episode,
+        "end_episode": end_episode,
+        "storage_path": defaults['storage_path'],
+        "is_default_range": is_default_range,
+        "xtoken": xtoken,
+        "uid": uid
+    }
+
+
+def classify_fields(values: List[str], join_names: bool = False) -> Dict[str, str]:
+    """识别一行中无表头的各列：网址、来源、区间，其余依次作为剧集名称和任务名称
+    
+    join_names为True时（按空白拆分的行）其余部分合并为剧集名称，避免名称中的空格被拆开
+    """
+    fields = {}
+    names = []
+    for value in values:
+        value = value.strip()
+        if not value:
+            continue
+        lower = value.lower()
+        if 'url' not in fields and lower.startswith(('http://', 'https://')):
+            fields['url'] = value
+        elif 'source' not in fields and lower in SOURCES:
+            fields['source'] = lower
+        elif 'range' not in fields and (lower in ALL_RANGE_WORDS or RANGE_PATTERN.match(lower)):
+            fields['range'] = value
+        else:
+            names.append(value)
+    if join_names and names:
+        fields['name'] = ' '.join(names)
+    elif names:
+        fields['name'] = names[0]
+    if len(names) > 1 and not join_names:
+        fields['task_name'] = names[1]
+    return fields
+
+
+def split_line(line: str) -> Tuple[List[str], bool]:
+    """拆分粘贴的一行：优先按制表符或逗号，否则按空白拆分
+    
+    Returns:
+        (各列, 是否按空白拆分)
+    """
+    if '\t' in line:
+        return line.split('\t'), False
+    if ',' in line:
+        return next(csv.reader([line])), False
+    return line.split(), True
+
+
+def parse_text(text: str, defaults: Dict) -> List[BatchRow]:
+    """解析粘贴的文本（每行一个剧集，空行和#开头的行被忽略）"""
+    rows = []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        raw = line.strip()
+        if not raw or raw.startswith('#'):
+            continue
+        values, by_whitespace = split_line(raw)
+        rows.append(_parse_row(line_no, raw, classify_fields(values, join_names=by_whitespace), defaults))
+    return rows
+
+
+def parse_csv(text: str, defaults: Dict) -> List[BatchRow]:
+    """解析CSV：有表头（包含url或网址列）时按列名读取，否则按无表头的行处理"""
+    reader = csv.reader(io.StringIO(text))
+    all_rows = [row for row in reader]
+    if not all_rows:
+        return []
+    
+    header = [FIELD_ALIASES.get(cell.strip().lower(), FIELD_ALIASES.get(cell.strip()))
+              for cell in all_rows[0]]
+    rows = []
+    if 'url' in header:
+        for line_no, values in enumerate(all_rows[1:], start=2):
+            if not any(value.strip() for value in values):
+                continue
+            fields = {key: value for key, value in zip(header, values) if key}
+            rows.append(_parse_row(line_no, ','.join(values), fields, defaults))
+    else:
+        for line_no, values in enumerate(all_rows, start=1):
+            if not any(value.strip() for value in values) or values[0].strip().startswith('#'):
+                continue
+            rows.append(_parse_row(line_no, ','.join(values), classify_fields(values), defaults))
+    return rows
+
+
+def parse_json(text: str, defaults: Dict) -> List[BatchRow]:
+    """解析JSON：对象列表（或{"tasks": [...]}），每项可以是对象或网址字符串"""
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise Exception(f"JSON格式错误: {e}")
+    if isinstance(data, dict):
+        data = data.get('tasks', [])
+    if not isinstance(data, list):
+        raise Exception("JSON格式错误：应为列表或包含tasks列表的对象")
+    
+    rows = []
+    for index, item in enumerate(data, start=1):
+        if isinstance(item, str):
+            rows.append(_parse_row(index, item, {'url': item}, defaults))
+            continue
+        if not isinstance(item, dict):
+            rows.append(BatchRow(index, str(item), error="无法识别的条目"))
+            continue
+        fields = {}
+        for key, value in item.items():
+            field = FIELD_ALIASES.get(str(key).lower(), FIELD_ALIASES.get(str(key)))
+            if field and value is not None:
+                fields[field] = str(value)
+        rows.append(_parse_row(index, json.dumps(item, ensure_ascii=False), fields, defaults))
+    return rows
+
+
+def parse_file(file_path: str, defaults: Dict) -> List[BatchRow]:
+    """根据扩展名解析CSV/JSON文件，其他扩展名按粘贴文本处理"""
+    path = Path(file_path)
+    text = path.read_text(encoding='utf-8-sig')
+    suffix = path.suffix.lower()
+    if suffix == '.json':
+        return parse_json(text, defaults)
+    if suffix == '.csv':
+        return parse_csv(text, defaults)
+    return parse_text(text, defaults)
+
+
+def _parse_row(line_no: int, raw: str, fields: Dict[str, str], defaults: Dict) -> BatchRow:
+    """构建单行的任务数据，解析错误记录在行上而不是中断整个导入"""
+    try:
+        return BatchRow(line_no, raw, task_data=build_task_data(fields, defaults))
+    except ValueError as e:
+        return BatchRow(line_no, raw, error=str(e))
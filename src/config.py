@@ -25,14 +25,114 @@ class Config:
     # 对于临时网络错误，30-60秒通常足够；对于永久性错误（如403），会通过重试次数限制避免无限重试
     RETRY_DELAY_SECONDS: int = 5
     
+    # 下载速度的指数加权平均系数（0-1，越大越贴近瞬时速度，越小越平滑）
+    PROGRESS_SPEED_SMOOTHING: float = 0.3
+    
+    # ========== 数据维护配置 ==========
+    # 软删除（deleted状态）的剧集保留天数，超过后被物理清除
+    DELETED_PURGE_AGE_DAYS: int = 7
+    
+    # 数据维护（清除软删除记录、压缩数据库）的执行间隔（秒）
+    MAINTENANCE_INTERVAL: int = 3600
+    
+    # 数据库空闲页比例超过此值且没有下载任务时执行压缩（VACUUM）
+    VACUUM_FREE_RATIO: float = 0.3
+    
+    # 批量删除已完成剧集时并发删除视频文件的线程数（网络共享目录上单个删除可能很慢）
+    DELETE_FILE_WORKERS: int = 8
+    
+    # 批量删除已完成剧集时每批删除的文件数，每批文件删除后在同一后台任务中删除对应的数据库记录
+    DELETE_BATCH_SIZE: int = 200
+    
     # ========== API配置 ==========
     # API请求超时时间（秒）
     API_TIMEOUT: int = 30
     
+    # 剧集列表API响应的本地缓存有效期（秒），在有效期内重建任务或修改区间不再重复请求API
+    # shortlinetv的下载地址带有效期签名，因此不宜设置过长
+    API_CACHE_TTL: int = 1800
+    
+    # ReelShort buildId缓存有效期（秒），buildId只在站点重新部署时变化；失效时（404）会自动刷新
+    REELSHORT_BUILD_ID_TTL: int = 12 * 3600
+    
+    # 流式扫描页面buildId时每次读取的块大小（字节）
+    BUILD_ID_SCAN_CHUNK_SIZE: int = 16 * 1024
+    
+    # 创建reelshort任务时并发解析各集的HLS流地址（_next/data接口），下载时直接使用m3u8而不再逐集抓取页面
+    REELSHORT_RESOLVE_STREAMS: bool = True
+    
+    # ========== 凭证池配置（shortlinetv的xtoken/uid轮换） ==========
+    # 每次API请求最多尝试的凭证数（遇到401/403/429时换下一个凭证）
+    CREDENTIAL_MAX_ATTEMPTS: int = 3
+    
+    # 429限流后的冷却时间（秒），连续限流时按2倍递增，不超过CREDENTIAL_MAX_COOLDOWN
+    CREDENTIAL_RATE_LIMIT_COOLDOWN: int = 60
+    CREDENTIAL_MAX_COOLDOWN: int = 1800
+    
+    # 401/403认证失败后的冷却时间（秒），连续认证失败达到次数后停用该凭证
+    CREDENTIAL_AUTH_COOLDOWN: int = 600
+    CREDENTIAL_MAX_AUTH_FAILURES: int = 3
+    
+    # 同一任务两次刷新下载地址的最小间隔（秒），避免多个失败剧集同时重复请求API
+    URL_REFRESH_MIN_INTERVAL: int = 60
+    
+    # ========== 错误处理和熔断配置 ==========
+    # 同一主机连续失败（网络错误、超时、5xx）达到此次数后熔断，熔断期间不再向该主机发请求或调度下载
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    
+    # 熔断时间（秒），再次熔断时加倍，不超过CIRCUIT_MAX_OPEN_SECONDS
+    CIRCUIT_OPEN_SECONDS: int = 30
+    CIRCUIT_MAX_OPEN_SECONDS: int = 600
+    
+    # ========== 追更配置 ==========
+    # 开启追更的任务定期重新获取剧集列表，只把新出现的剧集加入下载队列
+    # 新任务的初始检查间隔（秒）；发现新剧集后间隔减半，没有新剧集时按系数拉长，限制在最小/最大值之间
+    FOLLOW_DEFAULT_INTERVAL: int = 3600
+    FOLLOW_MIN_INTERVAL: int = 900
+    FOLLOW_MAX_INTERVAL: int = 86400
+    FOLLOW_BACKOFF_FACTOR: float = 1.5
+    
+    # 追更线程检查到期任务的间隔（秒）
+    FOLLOW_CHECK_INTERVAL: int = 60
+    
+    # ========== HTTP连接池配置 ==========
+    # 默认连接池：缓存的主机连接池数量和每个主机的最大连接数
+    HTTP_POOL_CONNECTIONS: int = 10
+    HTTP_POOL_MAXSIZE: int = 10
+    
+    # 按主机单独配置的最大连接数（键为URL前缀）
+    HTTP_HOST_POOL_MAXSIZE: dict = {
+        'https://www.reelshort.com': 16,
+        'https://shortlinetv.com': 16,
+    }
+    
+    # 连接错误和502/503/504的自动重试次数及退避系数（秒）
+    HTTP_MAX_RETRIES: int = 2
+    HTTP_RETRY_BACKOFF: float = 0.5
+    
+    # 异步客户端（aiohttp）连接池：总连接数上限和每个主机的连接数上限
+    ASYNC_HTTP_LIMIT: int = 32
+    ASYNC_HTTP_LIMIT_PER_HOST: int = 8
+    
+    # 并发解析剧集信息时的最大并发数
+    DRAMA_RESOLVE_MAX_PARALLEL: int = 8
+    
+    # 新建任务队列的线程数（同时获取剧集信息、保存任务的最大数量，其余排队等待）
+    TASK_CREATION_MAX_PARALLEL: int = 3
+    
     # ========== UI配置 ==========
     # 界面刷新间隔（毫秒）
     UI_REFRESH_INTERVAL: int = 2000
     
+    # 已完成列表每页加载的剧集数（滚动到底部时加载下一页）
+    COMPLETED_PAGE_SIZE: int = 200
+    
+    # 下载监控：采样间隔（秒）、曲线保留时长（秒）、下载线程超过多少秒没有进度按速度0计算、错误率统计窗口（秒）
+    METRICS_SAMPLE_INTERVAL: float = 1.0
+    METRICS_HISTORY_SECONDS: int = 300
+    METRICS_STALE_SECONDS: float = 10.0
+    METRICS_ERROR_WINDOW: int = 600
+    
     # 窗口配置
     WINDOW_X: int = 100
     WINDOW_Y: int = 100
@@ -80,8 +180,46 @@ class Config:
             'WORKER_TIMEOUT': cls.WORKER_TIMEOUT,
             'MAX_RETRY_COUNT': cls.MAX_RETRY_COUNT,
             'RETRY_DELAY_SECONDS': cls.RETRY_DELAY_SECONDS,
+            'PROGRESS_SPEED_SMOOTHING': cls.PROGRESS_SPEED_SMOOTHING,
+            'DELETED_PURGE_AGE_DAYS': cls.DELETED_PURGE_AGE_DAYS,
+            'MAINTENANCE_INTERVAL': cls.MAINTENANCE_INTERVAL,
+            'VACUUM_FREE_RATIO': cls.VACUUM_FREE_RATIO,
+            'DELETE_FILE_WORKERS': cls.DELETE_FILE_WORKERS,
+            'DELETE_BATCH_SIZE': cls.DELETE_BATCH_SIZE,
             'API_TIMEOUT': cls.API_TIMEOUT,
+            'API_CACHE_TTL': cls.API_CACHE_TTL,
+            'REELSHORT_BUILD_ID_TTL': cls.REELSHORT_BUILD_ID_TTL,
+            'BUILD_ID_SCAN_CHUNK_SIZE': cls.BUILD_ID_SCAN_CHUNK_SIZE,
+            'REELSHORT_RESOLVE_STREAMS': cls.REELSHORT_RESOLVE_STREAMS,
+            'CREDENTIAL_MAX_ATTEMPTS': cls.CREDENTIAL_MAX_ATTEMPTS,
+            'CREDENTIAL_RATE_LIMIT_COOLDOWN': cls.CREDENTIAL_RATE_LIMIT_COOLDOWN,
+            'CREDENTIAL_MAX_COOLDOWN': cls.CREDENTIAL_MAX_COOLDOWN,
+            'CREDENTIAL_AUTH_COOLDOWN': cls.CREDENTIAL_AUTH_COOLDOWN,
+            'CREDENTIAL_MAX_AUTH_FAILURES': cls.CREDENTIAL_MAX_AUTH_FAILURES,
+            'URL_REFRESH_MIN_INTERVAL': cls.URL_REFRESH_MIN_INTERVAL,
+            'CIRCUIT_FAILURE_THRESHOLD': cls.CIRCUIT_FAILURE_THRESHOLD,
+            'CIRCUIT_OPEN_SECONDS': cls.CIRCUIT_OPEN_SECONDS,
+            'CIRCUIT_MAX_OPEN_SECONDS': cls.CIRCUIT_MAX_OPEN_SECONDS,
+            'FOLLOW_DEFAULT_INTERVAL': cls.FOLLOW_DEFAULT_INTERVAL,
+            'FOLLOW_MIN_INTERVAL': cls.FOLLOW_MIN_INTERVAL,
+            'FOLLOW_MAX_INTERVAL': cls.FOLLOW_MAX_INTERVAL,
+            'FOLLOW_BACKOFF_FACTOR': cls.FOLLOW_BACKOFF_FACTOR,
+            'FOLLOW_CHECK_INTERVAL': cls.FOLLOW_CHECK_INTERVAL,
+            'HTTP_POOL_CONNECTIONS': cls.HTTP_POOL_CONNECTIONS,
+            'HTTP_POOL_MAXSIZE': cls.HTTP_POOL_MAXSIZE,
+            'HTTP_HOST_POOL_MAXSIZE': cls.HTTP_HOST_POOL_MAXSIZE,
+            'HTTP_MAX_RETRIES': cls.HTTP_MAX_RETRIES,
+            'HTTP_RETRY_BACKOFF': cls.HTTP_RETRY_BACKOFF,
+            'ASYNC_HTTP_LIMIT': cls.ASYNC_HTTP_LIMIT,
+            'ASYNC_HTTP_LIMIT_PER_HOST': cls.ASYNC_HTTP_LIMIT_PER_HOST,
+            'DRAMA_RESOLVE_MAX_PARALLEL': cls.DRAMA_RESOLVE_MAX_PARALLEL,
+            'TASK_CREATION_MAX_PARALLEL': cls.TASK_CREATION_MAX_PARALLEL,
             'UI_REFRESH_INTERVAL': cls.UI_REFRESH_INTERVAL,
+            'COMPLETED_PAGE_SIZE': cls.COMPLETED_PAGE_SIZE,
+            'METRICS_SAMPLE_INTERVAL': cls.METRICS_SAMPLE_INTERVAL,
+            'METRICS_HISTORY_SECONDS': cls.METRICS_HISTORY_SECONDS,
+            'METRICS_STALE_SECONDS': cls.METRICS_STALE_SECONDS,
+            'METRICS_ERROR_WINDOW': cls.METRICS_ERROR_WINDOW,
             'WINDOW_X': cls.WINDOW_X,
             'WINDOW_Y': cls.WINDOW_Y,
             'WINDOW_WIDTH': cls.WINDOW_WIDTH,
@@ -104,10 +242,46 @@ class Config:
         """验证配置项的有效性"""
         if cls.MAX_CONCURRENT_DOWNLOADS < 1:
             raise ValueError("MAX_CONCURRENT_DOWNLOADS 必须大于0")
+        if not 0 < cls.PROGRESS_SPEED_SMOOTHING <= 1:
+            raise ValueError("PROGRESS_SPEED_SMOOTHING 必须在0到1之间（不含0）")
+        if cls.DELETED_PURGE_AGE_DAYS < 0:
+            raise ValueError("DELETED_PURGE_AGE_DAYS 不能小于0")
+        if cls.MAINTENANCE_INTERVAL < 1:
+            raise ValueError("MAINTENANCE_INTERVAL 必须大于0")
         if cls.API_TIMEOUT < 1:
             raise ValueError("API_TIMEOUT 必须大于0")
+        if cls.API_CACHE_TTL < 0:
+            raise ValueError("API_CACHE_TTL 不能小于0")
+        if cls.CREDENTIAL_MAX_ATTEMPTS < 1:
+            raise ValueError("CREDENTIAL_MAX_ATTEMPTS 必须大于0")
+        if cls.CREDENTIAL_MAX_AUTH_FAILURES < 1:
+            raise ValueError("CREDENTIAL_MAX_AUTH_FAILURES 必须大于0")
+        if cls.CIRCUIT_FAILURE_THRESHOLD < 1:
+            raise ValueError("CIRCUIT_FAILURE_THRESHOLD 必须大于0")
+        if not 0 < cls.FOLLOW_MIN_INTERVAL <= cls.FOLLOW_MAX_INTERVAL:
+            raise ValueError("FOLLOW_MIN_INTERVAL 必须大于0且不大于 FOLLOW_MAX_INTERVAL")
+        if cls.FOLLOW_BACKOFF_FACTOR < 1:
+            raise ValueError("FOLLOW_BACKOFF_FACTOR 必须大于等于1")
+        if cls.HTTP_POOL_MAXSIZE < 1:
+            raise ValueError("HTTP_POOL_MAXSIZE 必须大于0")
+        if cls.HTTP_MAX_RETRIES < 0:
+            raise ValueError("HTTP_MAX_RETRIES 不能小于0")
+        if cls.DRAMA_RESOLVE_MAX_PARALLEL < 1:
+            raise ValueError("DRAMA_RESOLVE_MAX_PARALLEL 必须大于0")
+        if cls.TASK_CREATION_MAX_PARALLEL < 1:
+            raise ValueError("TASK_CREATION_MAX_PARALLEL 必须大于0")
         if cls.UI_REFRESH_INTERVAL < 100:
             raise ValueError("UI_REFRESH_INTERVAL 必须大于等于100毫秒")
+        if cls.COMPLETED_PAGE_SIZE < 1:
+            raise ValueError("COMPLETED_PAGE_SIZE 必须大于0")
+        if cls.DELETE_FILE_WORKERS < 1:
+            raise ValueError("DELETE_FILE_WORKERS 必须大于0")
+        if cls.DELETE_BATCH_SIZE < 1:
+            raise ValueError("DELETE_BATCH_SIZE 必须大于0")
+        if cls.METRICS_SAMPLE_INTERVAL <= 0:
+            raise ValueError("METRICS_SAMPLE_INTERVAL 必须大于0")
+        if cls.METRICS_HISTORY_SECONDS < cls.METRICS_SAMPLE_INTERVAL:
+            raise ValueError("METRICS_HISTORY_SECONDS 不能小于 METRICS_SAMPLE_INTERVAL")
         if cls.EPISODE_MAX < 1:
             raise ValueError("EPISODE_MAX 必须大于0")
         if cls.FILENAME_MAX_LENGTH < 1:
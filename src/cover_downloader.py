@@ -0,0 +1,114 @@
+"""
+封面图片下载（单个任务创建和批量导入共用，不依赖UI）
+"""
+import re
+import logging
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse, urlunparse
+# 使用绝对导入，兼容打包后的exe
+try:
+    from src.config import config
+    from src.http_session import get_session
+except ImportError:
+    from .config import config
+    from .http_session import get_session
+
+logger = logging.getLogger(__name__)
+
+# 允许的封面图片扩展名，其他情况统一使用jpg
+COVER_EXTENSIONS = ['jpg', 'jpeg', 'png', 'webp', 'gif']
+
+
+def download_cover_image(cover_url: str, save_path: Path) -> bool:
+    """下载封面图片
+    
+    Args:
+        cover_url: 封面图片URL
+        save_path: 保存路径（包含文件名）
+    
+    Returns:
+        bool: 是否下载成功
+    """
+    if not cover_url:
+        return False
+    
+    try:
+        # 处理URL中的多余斜杠
+        # 将URL解析为组件，然后重新组合以去除多余的斜杠
+        parsed = urlparse(cover_url)
+        # 清理path中的多余斜杠
+        clean_path = re.sub(r'/+', '/', parsed.path)
+        # 重新组合URL
+        clean_url = urlunparse((
+            parsed.scheme,
+            parsed.netloc,
+            clean_path,
+            parsed.params,
+            parsed.query,
+            parsed.fragment
+        ))
+        
+        # 使用基本的headers下载图片
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36',
+            'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
+            'Accept-Language': 'zh-CN,zh;q=0.9',
+        }
+        
+        # 下载图片（跳过SSL证书验证，与视频下载保持一致）
+        with get_session().get(clean_url, headers=headers, timeout=config.API_TIMEOUT,
+                               stream=True, verify=False) as response:
+            response.raise_for_status()
+            
+            # 确保目录存在
+            save_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            # 保存文件
+            with open(save_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    f.write(chunk)
+        
+        logger.info(f"封面图片下载成功: {save_path}")
+        return True
+    
+    except Exception as e:
+        logger.error(f"下载封面图片失败: {e}")
+        return False
+
+
+def get_cover_save_path(cover_url: str, storage_path: str, drama_name: str) -> Path:
+    """计算封面保存路径：存储地址/剧集名称/cover.<扩展名>"""
+    # 清理文件夹名中的非法字符和控制字符
+    safe_drama_name = config.sanitize_filename(drama_name or 'Unknown')
+    drama_storage_path = Path(storage_path) / safe_drama_name
+    
+    # 尝试从URL中提取扩展名
+    path = urlparse(cover_url).path
+    ext = 'jpg'
+    if '.' in path:
+        ext = path.split('.')[-1].split('?')[0].lower()
+        # 验证扩展名是否合理（常见图片格式）
+        if ext not in COVER_EXTENSIONS:
+            ext = 'jpg'
+    
+    return drama_storage_path / f"cover.{ext}"
+
+
+def download_drama_cover(cover_url: str, storage_path: str, drama_name: str) -> Optional[Path]:
+    """下载剧集封面到剧集文件夹
+    
+    Returns:
+        成功时返回封面文件路径，失败或没有封面时返回None（封面下载失败不影响任务创建）
+    """
+    if not cover_url or not storage_path:
+        return None
+    
+    try:
+        cover_save_path = get_cover_save_path(cover_url, storage_path, drama_name)
+        cover_save_path.parent.mkdir(parents=True, exist_ok=True)
+        if download_cover_image(cover_url, cover_save_path):
+            return cover_save_path
+    except Exception as e:
+        logger.error(f"下载封面时出错: {e}")
+    return None
@@ -0,0 +1,173 @@
+"""
+凭证池：shortlinetv的xtoken/uid保存在数据库中，API请求在多个账号之间轮换并跟踪健康状态
+"""
+import time
+import threading
+import logging
+from typing import Dict, List, Optional
+# 使用绝对导入，兼容打包后的exe
+try:
+    from src.config import config
+    from src.models import Credential
+except ImportError:
+    from .config import config
+    from .models import Credential
+
+logger = logging.getLogger(__name__)
+
+# 认证失败（凭证无效或过期）的状态码
+AUTH_FAILURE_STATUSES = (401, 403)
+
+# 限流的状态码
+RATE_LIMIT_STATUSES = (429,)
+
+# 需要换凭证重试的状态码
+CREDENTIAL_FAILURE_STATUSES = AUTH_FAILURE_STATUSES + RATE_LIMIT_STATUSES
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After响应头（只支持秒数），无法解析时返回None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class CredentialPool:
+    """进程级凭证池
+    
+    acquire()在可用凭证中选择最久未使用的一个（LRU），把请求分散到各个账号；
+    401/403后冷却一段时间，连续认证失败达到次数后停用；429后按Retry-After或指数退避冷却。
+    健康状态保存到credentials表，重启后保留。
+    """
+    
+    def __init__(self, source: str = 'shortlinetv'):
+        self.source = source
+        self._credentials: Dict[int, Credential] = {}
+        self._lock = threading.Lock()
+        self._db = None
+    
+    def attach_database(self, db):
+        """绑定数据库（只绑定一次），并加载已保存的凭证"""
+        if db is None or self._db is not None:
+            return
+        try:
+            credentials = db.get_credentials(self.source)
+        except Exception as e:
+            logger.warning(f"加载凭证池失败: {e}")
+            return
+        with self._lock:
+            if self._db is not None:
+                return
+            self._db = db
+            self._credentials = {credential.id: credential for credential in credentials}
+        logger.debug(f"已加载 {len(credentials)} 个{self.source}凭证")
+    
+    def add(self, xtoken: str, uid: str) -> Optional[Credential]:
+        """添加凭证到池中（已存在时直接返回），未绑定数据库时返回None"""
+        if not xtoken or not uid:
+            return None
+        with self._lock:
+            for credential in self._credentials.values():
+                if credential.xtoken == xtoken and credential.uid == uid:
+                    return credential
+            db = self._db
+        if db is None:
+            return None
+        try:
+            credential = db.add_credential(self.source, xtoken, uid)
+        except Exception as e:
+            logger.warning(f"保存凭证失败: {e}")
+            return None
+        with self._lock:
+            self._credentials.setdefault(credential.id, credential)
+            logger.info(f"凭证池新增{self.source}凭证 (uid={uid})")
+            return self._credentials[credential.id]
+    
+    def acquire(self) -> Optional[Credential]:
+        """取出最久未使用的可用凭证，没有可用凭证时返回None"""
+        now = time.time()
+        with self._lock:
+            available = [credential for credential in self._credentials.values()
+                         if credential.is_available(now)]
+            if not available:
+                return None
+            credential = min(available, key=lambda c: c.last_used_at or 0)
+            credential.last_used_at = now
+            return credential
+    
+    def report_success(self, credential: Credential):
+        """记录凭证请求成功"""
+        with self._lock:
+            credential.success_count = (credential.success_count or 0) + 1
+            had_failures = bool(credential.consecutive_failures)
+            credential.consecutive_failures = 0
+            credential.last_error = None
+        # 只在健康状态变化时写库，避免每次请求都写数据库
+        if had_failures:
+            self._persist(credential)
+    
+    def report_failure(self, credential: Credential, status_code: int, retry_after: Optional[str] = None,
+                       message: Optional[str] = None):
+        """记录凭证请求失败，设置冷却时间
+        
+        429按限流处理，其他（401/403，以及HTTP 200但接口返回错误码）按认证失败处理
+        
+        Args:
+            credential: 失败的凭证
+            status_code: HTTP状态码
+            retry_after: 429响应的Retry-After头
+            message: 接口返回的错误信息（为None时记录状态码）
+        """
+        now = time.time()
+        with self._lock:
+            credential.failure_count = (credential.failure_count or 0) + 1
+            credential.consecutive_failures = (credential.consecutive_failures or 0) + 1
+            credential.last_error = message or f"HTTP {status_code}"
+            
+            if status_code in RATE_LIMIT_STATUSES:
+                cooldown = parse_retry_after(retry_after)
+                if cooldown is None:
+                    cooldown = config.CREDENTIAL_RATE_LIMIT_COOLDOWN * 2 ** (credential.consecutive_failures - 1)
+                cooldown = min(cooldown, config.CREDENTIAL_MAX_COOLDOWN)
+            else:
+                cooldown = config.CREDENTIAL_AUTH_COOLDOWN
+                if credential.consecutive_failures >= config.CREDENTIAL_MAX_AUTH_FAILURES:
+                    credential.enabled = 0
+            credential.cooldown_until = now + cooldown
+        
+        if not credential.enabled:
+            logger.error(
+                f"{self.source}凭证 (uid={credential.uid}) 连续认证失败 "
+                f"{credential.consecutive_failures} 次，已停用"
+            )
+        else:
+            logger.warning(
+                f"{self.source}凭证 (uid={credential.uid}) 请求失败 ({credential.last_error})，冷却 {cooldown:.0f} 秒"
+            )
+        self._persist(credential)
+    
+    def get_all(self) -> List[Credential]:
+        """获取池中的所有凭证（下载监控界面显示健康状态）"""
+        with self._lock:
+            return list(self._credentials.values())
+    
+    def available_count(self) -> int:
+        """当前可用的凭证数"""
+        now = time.time()
+        with self._lock:
+            return sum(1 for credential in self._credentials.values() if credential.is_available(now))
+    
+    def _persist(self, credential: Credential):
+        if self._db is None:
+            return
+        try:
+            self._db.update_credential_health(credential)
+        except Exception as e:
+            logger.warning(f"保存凭证状态失败: {e}")
+
+
+# 进程内共享的shortlinetv凭证池
+credential_pool = CredentialPool('shortlinetv')
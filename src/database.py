@@ -4,14 +4,18 @@
 import sqlite3
 import json
 import sys
-from typing import List, Dict, Optional
+import time
+import threading
+from typing import List, Dict, Optional, Set, Tuple
 from datetime import datetime
 from pathlib import Path
 # 使用绝对导入，兼容打包后的exe
 try:
     from src.config import config
+    from src.models import Task, Episode, TaskStats, Credential
 except ImportError:
     from .config import config
+    from .models import Task, Episode, TaskStats, Credential
 
 
 def get_app_data_dir():
@@ -34,12 +38,18 @@ class Database:
             self.db_path = str(app_dir / config.DATABASE_NAME)
         else:
             self.db_path = db_path
+        # 数据变更计数器：每次写入episodes/tasks后递增，供界面判断是否需要重新查询
+        # 注意：PRAGMA data_version只对“其他连接”的提交可见，而这里每次操作都新建连接，所以使用进程内计数器
+        self._data_version = 0
+        self._data_version_lock = threading.Lock()
         self.init_database()
     
     def get_connection(self):
         """获取数据库连接"""
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
+        # INSERT OR REPLACE删除冲突行时，只有开启recursive_triggers才会触发DELETE触发器（task_stats依赖它保持准确）
+        conn.execute("PRAGMA recursive_triggers = ON")
         return conn
     
     def init_database(self):
@@ -76,11 +86,23 @@ class Database:
         except sqlite3.OperationalError:
             pass  # 字段已存在
         
-        # 为episodes表添加retry_count字段（用于跟踪重试次数）
-        try:
-            cursor.execute("ALTER TABLE episodes ADD COLUMN retry_count INTEGER DEFAULT 0")
-        except sqlite3.OperationalError:
-            pass  # 字段已存在
+        # 追更字段：follow是否追更；follow_interval当前检查间隔（秒，按更新节奏自适应）；
+        # next_sync_at/last_synced_at/last_new_episode_at为Unix时间戳
+        for column_def in ("follow INTEGER DEFAULT 0",
+                           "follow_interval REAL DEFAULT 0",
+                           "next_sync_at REAL DEFAULT 0",
+                           "last_synced_at REAL DEFAULT 0",
+                           "last_new_episode_at REAL DEFAULT 0"):
+            try:
+                cursor.execute(f"ALTER TABLE tasks ADD COLUMN {column_def}")
+            except sqlite3.OperationalError:
+                pass  # 字段已存在
+        
+        # 追更线程按下次检查时间查询到期任务
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tasks_follow
+            ON tasks (follow, next_sync_at)
+        """)
         
         # 剧集表
         cursor.execute("""
@@ -102,6 +124,95 @@ class Database:
             )
         """)
         
+        # 为episodes表添加新字段（兼容旧数据库，必须在建表之后执行）
+        # retry_count: 重试次数；downloaded_bytes/total_bytes: 已下载字节数和（估算的）总字节数
+        # error_kind: 最近一次失败的错误类别（transient/auth/expired_url/permanent），见error_policy
+        for column_def in ("retry_count INTEGER DEFAULT 0",
+                           "downloaded_bytes INTEGER DEFAULT 0",
+                           "total_bytes INTEGER DEFAULT 0",
+                           "error_kind TEXT"):
+            try:
+                cursor.execute(f"ALTER TABLE episodes ADD COLUMN {column_def}")
+            except sqlite3.OperationalError:
+                pass  # 字段已存在
+        
+        # 任务统计表：按任务汇总各状态的剧集数、进度和字节数，由触发器在同一事务内增量维护
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'task_stats'")
+        task_stats_exists = cursor.fetchone() is not None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS task_stats (
+                task_id INTEGER PRIMARY KEY,
+                pending_count INTEGER DEFAULT 0,
+                downloading_count INTEGER DEFAULT 0,
+                completed_count INTEGER DEFAULT 0,
+                error_count INTEGER DEFAULT 0,
+                deleted_count INTEGER DEFAULT 0,
+                progress_sum REAL DEFAULT 0.0,
+                downloaded_bytes INTEGER DEFAULT 0,
+                total_bytes INTEGER DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        self._create_task_stats_triggers(cursor)
+        
+        # 按状态查询（队列扫描、列表刷新、清理软删除记录）使用的索引
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_episodes_status_updated
+            ON episodes (status, updated_at)
+        """)
+        if not task_stats_exists:
+            # 旧数据库首次升级：根据现有episodes回填统计
+            self._rebuild_task_stats(cursor)
+        
+        # 已完成剧集的移出日志：剧集离开completed状态（重新下载、软删除）或被删除时由触发器记录，
+        # 已完成列表刷新时只需读取上次刷新之后的记录，不必重新检查所有已加载的剧集
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS completed_removals (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                episode_id INTEGER NOT NULL
+            )
+        """)
+        self._create_completed_removals_triggers(cursor)
+        
+        # API响应缓存表（按来源和video_id/slug缓存剧集列表的原始数据）
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS api_cache (
+                source TEXT NOT NULL,
+                cache_key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (source, cache_key)
+            )
+        """)
+        
+        # 凭证池表（shortlinetv的xtoken/uid，API请求在多个账号之间轮换并记录健康状态）
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'credentials'")
+        credentials_exists = cursor.fetchone() is not None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS credentials (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL,
+                xtoken TEXT NOT NULL,
+                uid TEXT NOT NULL,
+                enabled INTEGER DEFAULT 1,
+                last_used_at REAL DEFAULT 0,
+                cooldown_until REAL DEFAULT 0,
+                success_count INTEGER DEFAULT 0,
+                failure_count INTEGER DEFAULT 0,
+                consecutive_failures INTEGER DEFAULT 0,
+                last_error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(source, xtoken, uid)
+            )
+        """)
+        if not credentials_exists:
+            # 旧数据库首次升级：用已有任务中的xtoken/uid初始化凭证池
+            cursor.execute("""
+                INSERT OR IGNORE INTO credentials (source, xtoken, uid)
+                SELECT DISTINCT source, xtoken, uid FROM tasks
+                WHERE source = 'shortlinetv' AND xtoken != '' AND uid != ''
+            """)
+        
         # 配置表（用于存储用户设置）
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS settings (
@@ -114,6 +225,141 @@ class Database:
         conn.commit()
         conn.close()
     
+    # 确保task_stats中存在NEW.task_id对应的行
+    # 注意：不能用INSERT OR IGNORE，触发器内语句的冲突策略会被外层语句覆盖（例如add_episodes的INSERT OR REPLACE会把它变成REPLACE，清空统计）
+    _TASK_STATS_ENSURE_ROW_SQL = """
+        INSERT INTO task_stats (task_id)
+        SELECT NEW.task_id WHERE NOT EXISTS (SELECT 1 FROM task_stats WHERE task_id = NEW.task_id);
+    """
+    
+    @staticmethod
+    def _task_stats_delta_sql(row: str, sign: str) -> str:
+        """生成按单行剧集增减task_stats的UPDATE语句
+        
+        Args:
+            row: 触发器中的行引用（NEW或OLD）
+            sign: '+'（计入）或'-'（扣除）
+        """
+        # deleted状态的剧集只计入deleted_count，不计入进度和字节数
+        active = f"({row}.status IS NOT 'deleted')"
+        return f"""
+            UPDATE task_stats SET
+                pending_count = pending_count {sign} ({row}.status IS 'pending'),
+                downloading_count = downloading_count {sign} ({row}.status IS 'downloading'),
+                completed_count = completed_count {sign} ({row}.status IS 'completed'),
+                error_count = error_count {sign} ({row}.status IS 'error'),
+                deleted_count = deleted_count {sign} ({row}.status IS 'deleted'),
+                progress_sum = progress_sum {sign} {active} * COALESCE({row}.progress, 0),
+                downloaded_bytes = downloaded_bytes {sign} {active} * COALESCE({row}.downloaded_bytes, 0),
+                total_bytes = total_bytes {sign} {active} * COALESCE({row}.total_bytes, 0),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE task_id = {row}.task_id;
+        """
+    
+    def _create_task_stats_triggers(self, cursor):
+        """创建维护task_stats的触发器"""
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_episodes_stats_insert
+            AFTER INSERT ON episodes
+            BEGIN
+                {self._TASK_STATS_ENSURE_ROW_SQL}
+                {self._task_stats_delta_sql('NEW', '+')}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_episodes_stats_update
+            AFTER UPDATE OF task_id, status, progress, downloaded_bytes, total_bytes ON episodes
+            BEGIN
+                {self._task_stats_delta_sql('OLD', '-')}
+                {self._TASK_STATS_ENSURE_ROW_SQL}
+                {self._task_stats_delta_sql('NEW', '+')}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_episodes_stats_delete
+            AFTER DELETE ON episodes
+            BEGIN
+                {self._task_stats_delta_sql('OLD', '-')}
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_tasks_stats_delete
+            AFTER DELETE ON tasks
+            BEGIN
+                DELETE FROM task_stats WHERE task_id = OLD.id;
+            END
+        """)
+    
+    # 移出日志保留的记录数（更早的记录由触发器清理，落后更多的读取方退回全量检查）
+    _COMPLETED_REMOVALS_KEEP = 10000
+    
+    def _create_completed_removals_triggers(self, cursor):
+        """创建记录已完成剧集移出的触发器"""
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_episodes_completed_update
+            AFTER UPDATE OF status ON episodes
+            WHEN OLD.status = 'completed' AND NEW.status IS NOT 'completed'
+            BEGIN
+                INSERT INTO completed_removals (episode_id) VALUES (OLD.id);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_episodes_completed_delete
+            AFTER DELETE ON episodes
+            WHEN OLD.status = 'completed'
+            BEGIN
+                INSERT INTO completed_removals (episode_id) VALUES (OLD.id);
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_completed_removals_prune
+            AFTER INSERT ON completed_removals
+            BEGIN
+                DELETE FROM completed_removals WHERE seq <= NEW.seq - {self._COMPLETED_REMOVALS_KEEP};
+            END
+        """)
+    
+    @staticmethod
+    def _rebuild_task_stats(cursor):
+        """根据episodes表全量重建task_stats"""
+        cursor.execute("DELETE FROM task_stats")
+        cursor.execute("""
+            INSERT INTO task_stats (task_id, pending_count, downloading_count, completed_count,
+                                    error_count, deleted_count, progress_sum,
+                                    downloaded_bytes, total_bytes)
+            SELECT task_id,
+                   SUM(status IS 'pending'),
+                   SUM(status IS 'downloading'),
+                   SUM(status IS 'completed'),
+                   SUM(status IS 'error'),
+                   SUM(status IS 'deleted'),
+                   SUM((status IS NOT 'deleted') * COALESCE(progress, 0)),
+                   SUM((status IS NOT 'deleted') * COALESCE(downloaded_bytes, 0)),
+                   SUM((status IS NOT 'deleted') * COALESCE(total_bytes, 0))
+            FROM episodes
+            GROUP BY task_id
+        """)
+    
+    def _bump_data_version(self):
+        """递增数据变更计数器（在写入episodes/tasks并提交后调用）"""
+        with self._data_version_lock:
+            self._data_version += 1
+    
+    def get_data_version(self) -> int:
+        """获取当前数据版本号
+        
+        版本号在每次修改任务或剧集数据后单调递增，读取无需访问数据库
+        """
+        return self._data_version
+    
+    def has_changed_since(self, version: Optional[int]) -> bool:
+        """检查自指定版本以来数据是否发生变化
+        
+        Args:
+            version: 上次读取数据时的版本号（None表示从未读取过）
+        """
+        return version is None or self._data_version != version
+    
     def task_name_exists(self, task_name: str) -> bool:
         """检查任务名称是否已存在"""
         conn = self.get_connection()
@@ -124,23 +370,52 @@ class Database:
         conn.close()
         return count > 0
     
+    @staticmethod
+    def _insert_task(cursor, task_name: str, source: str, drama_name: str, 
+                     drama_url: str, start_episode: int, end_episode: int, 
+                     storage_path: str, xtoken: str = None, uid: str = None,
+                     follow: bool = False) -> int:
+        """在当前事务中插入任务记录，返回任务ID"""
+        # 追更任务从默认间隔开始，刚创建时已经获取过剧集列表，因此第一次检查安排在一个间隔之后
+        now = time.time()
+        follow_interval = config.FOLLOW_DEFAULT_INTERVAL if follow else 0
+        cursor.execute("""
+            INSERT INTO tasks (task_name, source, drama_name, drama_url, 
+                             start_episode, end_episode, storage_path, xtoken, uid,
+                             follow, follow_interval, next_sync_at, last_synced_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (task_name, source, drama_name, drama_url, 
+              start_episode, end_episode, storage_path, xtoken, uid,
+              1 if follow else 0, follow_interval,
+              now + follow_interval if follow else 0, now if follow else 0))
+        return cursor.lastrowid
+    
+    @staticmethod
+    def _insert_episodes(cursor, task_id: int, episodes: List[Dict]):
+        """在当前事务中批量插入剧集"""
+        cursor.executemany("""
+            INSERT OR REPLACE INTO episodes 
+            (task_id, episode_num, episode_name, episode_url, download_url, status)
+            VALUES (?, ?, ?, ?, ?, 'pending')
+        """, [(task_id, episode['episode_num'], episode.get('episode_name', ''),
+               episode['episode_url'], episode.get('download_url', ''))
+              for episode in episodes])
+    
     def create_task(self, task_name: str, source: str, drama_name: str, 
                    drama_url: str, start_episode: int, end_episode: int, 
-                   storage_path: str, xtoken: str = None, uid: str = None) -> int:
-        """创建新任务"""
+                   storage_path: str, xtoken: str = None, uid: str = None,
+                   follow: bool = False) -> int:
+        """创建新任务（follow为True时开启追更）"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute("""
-            INSERT INTO tasks (task_name, source, drama_name, drama_url, 
-                             start_episode, end_episode, storage_path, xtoken, uid)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (task_name, source, drama_name, drama_url, 
-              start_episode, end_episode, storage_path, xtoken, uid))
+        task_id = self._insert_task(cursor, task_name, source, drama_name, drama_url,
+                                    start_episode, end_episode, storage_path, xtoken, uid,
+                                    follow)
         
-        task_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        self._bump_data_version()
         return task_id
     
     def add_episodes(self, task_id: int, episodes: List[Dict]):
@@ -148,28 +423,73 @@ class Database:
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        for episode in episodes:
-            cursor.execute("""
-                INSERT OR REPLACE INTO episodes 
-                (task_id, episode_num, episode_name, episode_url, download_url, status)
-                VALUES (?, ?, ?, ?, ?, 'pending')
-            """, (task_id, episode['episode_num'], episode.get('episode_name', ''),
-                  episode['episode_url'], episode.get('download_url', '')))
+        self._insert_episodes(cursor, task_id, episodes)
         
         conn.commit()
         conn.close()
+        self._bump_data_version()
     
-    def get_all_tasks(self) -> List[Dict]:
+    def create_tasks_with_episodes(self, items: List[Tuple[Dict, List[Dict]]]) -> List[int]:
+        """在同一个事务中批量创建任务及其剧集（用于批量导入）
+        
+        Args:
+            items: [(task_data, episodes), ...]，task_data的键与NewTaskWidget发出的任务数据一致
+        
+        Returns:
+            与items顺序一致的任务ID列表；任一条写入失败时整体回滚并抛出异常
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        task_ids = []
+        try:
+            for task_data, episodes in items:
+                task_id = self._insert_task(
+                    cursor,
+                    task_name=task_data['task_name'],
+                    source=task_data['source'],
+                    drama_name=task_data['drama_name'],
+                    drama_url=task_data['drama_url'],
+                    start_episode=task_data['start_episode'],
+                    end_episode=task_data['end_episode'],
+                    storage_path=task_data['storage_path'],
+                    xtoken=task_data.get('xtoken'),
+                    uid=task_data.get('uid'),
+                    follow=task_data.get('follow', False)
+                )
+                self._insert_episodes(cursor, task_id, episodes)
+                task_ids.append(task_id)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        
+        self._bump_data_version()
+        return task_ids
+    
+    def get_all_tasks(self) -> List[Task]:
         """获取所有任务"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute("SELECT * FROM tasks ORDER BY created_at DESC")
-        tasks = [dict(row) for row in cursor.fetchall()]
+        tasks = Task.from_cursor(cursor)
         conn.close()
         return tasks
     
-    def get_task_episodes(self, task_id: int, status: Optional[str] = None) -> List[Dict]:
+    def get_task_by_id(self, task_id: int) -> Optional[Task]:
+        """根据ID获取任务"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
+        task = Task.first_from_cursor(cursor)
+        conn.close()
+        return task
+    
+    def get_task_episodes(self, task_id: int, status: Optional[str] = None) -> List[Episode]:
         """获取任务的剧集列表"""
         conn = self.get_connection()
         cursor = conn.cursor()
@@ -187,11 +507,22 @@ class Database:
                 ORDER BY episode_num
             """, (task_id,))
         
-        episodes = [dict(row) for row in cursor.fetchall()]
+        episodes = Episode.from_cursor(cursor)
         conn.close()
         return episodes
     
-    def get_downloading_episodes(self) -> List[Dict]:
+    def get_task_episode_nums(self, task_id: int) -> Set[int]:
+        """获取任务中已有的剧集号（包括已完成和已删除的，只读索引）"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT episode_num FROM episodes WHERE task_id = ?", (task_id,))
+        
+        episode_nums = {row[0] for row in cursor.fetchall()}
+        conn.close()
+        return episode_nums
+    
+    def get_downloading_episodes(self) -> List[Episode]:
         """获取所有下载中的剧集"""
         conn = self.get_connection()
         cursor = conn.cursor()
@@ -204,11 +535,11 @@ class Database:
             ORDER BY e.created_at
         """)
         
-        episodes = [dict(row) for row in cursor.fetchall()]
+        episodes = Episode.from_cursor(cursor)
         conn.close()
         return episodes
     
-    def get_completed_episodes(self) -> List[Dict]:
+    def get_completed_episodes(self) -> List[Episode]:
         """获取所有已完成的剧集"""
         conn = self.get_connection()
         cursor = conn.cursor()
@@ -221,13 +552,101 @@ class Database:
             ORDER BY e.updated_at DESC
         """)
         
-        episodes = [dict(row) for row in cursor.fetchall()]
+        episodes = Episode.from_cursor(cursor)
         conn.close()
         return episodes
     
+    def get_completed_episodes_page(self, limit: Optional[int] = None,
+                                    before: Optional[Tuple[str, int]] = None,
+                                    after: Optional[Tuple[str, int]] = None) -> List[Episode]:
+        """按(updated_at, id)倒序分页获取已完成的剧集（键集分页，不使用OFFSET，翻到多深都只扫描一页）
+        
+        Args:
+            limit: 最多返回的条数，None表示不限
+            before: 只返回排在该(updated_at, id)之后（更早完成）的剧集，用于加载下一页
+            after: 只返回排在该(updated_at, id)之前（更晚完成）的剧集，用于获取新完成的剧集
+        """
+        conditions = ["e.status = 'completed'"]
+        params = []
+        if before is not None:
+            conditions.append("(e.updated_at < ? OR (e.updated_at = ? AND e.id < ?))")
+            params.extend([before[0], before[0], before[1]])
+        if after is not None:
+            conditions.append("(e.updated_at > ? OR (e.updated_at = ? AND e.id > ?))")
+            params.extend([after[0], after[0], after[1]])
+        sql = f"""
+            SELECT e.*, t.task_name, t.storage_path as task_storage_path
+            FROM episodes e
+            JOIN tasks t ON e.task_id = t.id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY e.updated_at DESC, e.id DESC
+        """
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(sql, params)
+        
+        episodes = Episode.from_cursor(cursor)
+        conn.close()
+        return episodes
+    
+    def get_completed_episode_ids(self, since: Tuple[str, int]) -> Set[int]:
+        """获取(updated_at, id)不早于since的已完成剧集ID（只读索引，用于检查已加载的行是否仍然存在）"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT id FROM episodes
+            WHERE status = 'completed'
+              AND (updated_at > ? OR (updated_at = ? AND id >= ?))
+        """, (since[0], since[0], since[1]))
+        
+        episode_ids = {row[0] for row in cursor.fetchall()}
+        conn.close()
+        return episode_ids
+    
+    def get_completed_removals(self, since: Optional[int]) -> Tuple[int, Optional[Set[int]]]:
+        """获取移出日志中序号大于since的剧集ID（这些剧集已不再是completed状态或已被删除）
+        
+        Args:
+            since: 上次读取时返回的序号，None表示只获取当前序号
+        
+        Returns:
+            (当前序号, 剧集ID集合)；since为None或日志已清理到since之后（无法确定期间的全部变化）时集合为None
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        if since is None:
+            cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM completed_removals")
+            latest = cursor.fetchone()[0]
+            conn.close()
+            return latest, None
+        
+        cursor.execute("""
+            SELECT seq, episode_id FROM completed_removals
+            WHERE seq > ?
+            ORDER BY seq
+        """, (since,))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        if not rows:
+            return since, set()
+        # 序号连续递增（AUTOINCREMENT，回滚的事务不占用序号），第一条不紧接since说明中间的记录已被清理
+        if rows[0][0] != since + 1:
+            return rows[-1][0], None
+        return rows[-1][0], {row[1] for row in rows}
+    
     def update_episode_status(self, episode_id: int, status: str, 
                              progress: float = 0.0, error_message: str = None,
-                             storage_path: str = None, retry_count: int = None):
+                             storage_path: str = None, retry_count: int = None,
+                             downloaded_bytes: int = None, total_bytes: int = None,
+                             error_kind: str = None):
         """更新剧集状态
         
         Args:
@@ -237,36 +656,40 @@ class Database:
             error_message: 错误消息
             storage_path: 存储路径
             retry_count: 重试次数（如果为None，则保持原值；如果为整数，则更新）
+            downloaded_bytes: 已下载字节数（如果为None，则保持原值）
+            total_bytes: 总字节数或估算值（如果为None，则保持原值）
+            error_kind: 错误类别（只在status为error时保存，其他状态清空）
         """
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        if retry_count is not None:
-            # 如果指定了retry_count，则更新它
-            cursor.execute("""
-                UPDATE episodes 
-                SET status = ?, progress = ?, error_message = ?, 
-                    storage_path = ?, retry_count = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (status, progress, error_message, storage_path, retry_count, episode_id))
-        else:
-            # 如果不指定retry_count，保持原值
-            cursor.execute("""
-                UPDATE episodes 
-                SET status = ?, progress = ?, error_message = ?, 
-                    storage_path = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (status, progress, error_message, storage_path, episode_id))
+        assignments = ["status = ?", "progress = ?", "error_message = ?", "storage_path = ?", "error_kind = ?"]
+        params = [status, progress, error_message, storage_path, error_kind if status == 'error' else None]
+        # 可选字段：为None时保持原值
+        for column, value in (("retry_count", retry_count),
+                              ("downloaded_bytes", downloaded_bytes),
+                              ("total_bytes", total_bytes)):
+            if value is not None:
+                assignments.append(f"{column} = ?")
+                params.append(value)
+        params.append(episode_id)
+        
+        cursor.execute(f"""
+            UPDATE episodes 
+            SET {', '.join(assignments)}, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, params)
         
         conn.commit()
         conn.close()
+        self._bump_data_version()
     
     def increment_episode_retry_count(self, episode_id: int) -> int:
         """增加剧集的重试次数并返回新的重试次数
         
         Args:
             episode_id: 剧集ID
-            
+        
         Returns:
             新的重试次数
         """
@@ -288,6 +711,7 @@ class Database:
         
         conn.commit()
         conn.close()
+        self._bump_data_version()
         return new_count
     
     def reset_episode_retry_count(self, episode_id: int):
@@ -307,26 +731,71 @@ class Database:
         
         conn.commit()
         conn.close()
+        self._bump_data_version()
+    
+    @staticmethod
+    def _load_selected_ids(cursor, ids: List[int]):
+        """将待处理的ID（剧集ID或任务ID）写入临时表temp_selected_ids
+        
+        使用临时表代替IN (?, ?, ...)，不受SQLite绑定参数数量上限（SQLITE_MAX_VARIABLE_NUMBER）限制
+        """
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS temp_selected_ids (id INTEGER PRIMARY KEY)")
+        cursor.execute("DELETE FROM temp_selected_ids")
+        cursor.executemany(
+            "INSERT OR IGNORE INTO temp_selected_ids (id) VALUES (?)",
+            ((selected_id,) for selected_id in ids)
+        )
+    
+    @staticmethod
+    def _delete_orphan_tasks(cursor) -> int:
+        """删除temp_affected_tasks中已没有有效episodes的任务（集合操作，一次完成）
+        
+        有效episodes是指状态不是'deleted'的episodes。被删除任务的所有episodes（包括deleted状态的）也会一并删除
+        
+        Returns:
+            删除的任务数量
+        """
+        cursor.execute("DROP TABLE IF EXISTS temp_orphan_tasks")
+        cursor.execute("""
+            CREATE TEMP TABLE temp_orphan_tasks AS
+            SELECT a.task_id FROM temp_affected_tasks a
+            WHERE NOT EXISTS (
+                SELECT 1 FROM episodes e
+                WHERE e.task_id = a.task_id AND e.status != 'deleted'
+            )
+        """)
+        cursor.execute("""
+            DELETE FROM episodes WHERE task_id IN (SELECT task_id FROM temp_orphan_tasks)
+        """)
+        cursor.execute("""
+            DELETE FROM tasks WHERE id IN (SELECT task_id FROM temp_orphan_tasks)
+        """)
+        return cursor.rowcount
     
     def delete_episodes(self, episode_ids: List[int]):
         """删除剧集（标记为删除，不实际删除记录）"""
+        if not episode_ids:
+            return
+        
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        placeholders = ','.join(['?'] * len(episode_ids))
-        cursor.execute(f"""
+        self._load_selected_ids(cursor, episode_ids)
+        cursor.execute("""
             UPDATE episodes 
             SET status = 'deleted', updated_at = CURRENT_TIMESTAMP
-            WHERE id IN ({placeholders})
-        """, episode_ids)
+            WHERE id IN (SELECT id FROM temp_selected_ids)
+        """)
         
         conn.commit()
         conn.close()
+        self._bump_data_version()
     
     def delete_completed_episodes(self, episode_ids: List[int]):
         """删除已完成的剧集记录（从数据库中物理删除）
         
-        删除后，如果某个任务没有任何有效episodes了（只有deleted状态或完全没有episodes），也会删除该任务记录
+        删除后，如果某个任务没有任何有效episodes了（只有deleted状态或完全没有episodes），也会删除该任务记录。
+        所有操作在同一个事务中完成，选中数量不受SQLite绑定参数上限限制
         """
         if not episode_ids:
             return
@@ -334,50 +803,152 @@ class Database:
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        # 先获取要删除的episodes的task_id，用于后续检查
-        placeholders = ','.join(['?'] * len(episode_ids))
-        cursor.execute(f"""
-            SELECT DISTINCT task_id FROM episodes 
-            WHERE id IN ({placeholders})
-        """, episode_ids)
-        affected_task_ids = [row[0] for row in cursor.fetchall()]
+        self._load_selected_ids(cursor, episode_ids)
+        
+        # 先记录受影响的任务，用于后续检查
+        cursor.execute("DROP TABLE IF EXISTS temp_affected_tasks")
+        cursor.execute("""
+            CREATE TEMP TABLE temp_affected_tasks AS
+            SELECT DISTINCT task_id FROM episodes
+            WHERE id IN (SELECT id FROM temp_selected_ids)
+        """)
         
         # 删除episodes
-        cursor.execute(f"""
+        cursor.execute("""
             DELETE FROM episodes 
-            WHERE id IN ({placeholders}) AND status = 'completed'
-        """, episode_ids)
+            WHERE id IN (SELECT id FROM temp_selected_ids) AND status = 'completed'
+        """)
         
-        # 检查并删除没有有效episodes的任务
-        # 有效episodes是指状态不是'deleted'的episodes
-        for task_id in affected_task_ids:
-            # 检查该任务是否还有非deleted状态的episodes
-            cursor.execute("""
-                SELECT COUNT(*) FROM episodes 
-                WHERE task_id = ? AND status != 'deleted'
-            """, (task_id,))
-            active_episode_count = cursor.fetchone()[0]
-            
-            if active_episode_count == 0:
-                # 该任务没有任何有效episodes了（只有deleted状态或完全没有episodes），删除任务记录
-                # 同时删除该任务的所有episodes（包括deleted状态的）
-                cursor.execute("DELETE FROM episodes WHERE task_id = ?", (task_id,))
-                cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+        # 删除没有有效episodes的任务
+        self._delete_orphan_tasks(cursor)
         
         conn.commit()
         conn.close()
+        self._bump_data_version()
     
-    def get_episode_by_id(self, episode_id: int) -> Optional[Dict]:
+    def purge_deleted_episodes(self, older_than_seconds: int = 0) -> int:
+        """物理清除软删除（deleted状态）的剧集记录
+        
+        delete_episodes只把剧集标记为deleted，这些记录会一直保留；此方法定期清理它们，
+        并删除因此不再有任何有效episodes的任务
+        
+        Args:
+            older_than_seconds: 只清除标记删除超过该秒数的记录（0表示全部清除）
+        
+        Returns:
+            清除的剧集数量
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("DROP TABLE IF EXISTS temp_purged_ids")
+        cursor.execute("""
+            CREATE TEMP TABLE temp_purged_ids AS
+            SELECT id, task_id FROM episodes
+            WHERE status = 'deleted' AND updated_at <= datetime('now', ?)
+        """, (f"-{int(older_than_seconds)} seconds",))
+        
+        cursor.execute("DROP TABLE IF EXISTS temp_affected_tasks")
+        cursor.execute("""
+            CREATE TEMP TABLE temp_affected_tasks AS
+            SELECT DISTINCT task_id FROM temp_purged_ids
+        """)
+        
+        cursor.execute("DELETE FROM episodes WHERE id IN (SELECT id FROM temp_purged_ids)")
+        purged_count = cursor.rowcount
+        
+        self._delete_orphan_tasks(cursor)
+        
+        conn.commit()
+        conn.close()
+        if purged_count > 0:
+            self._bump_data_version()
+        return purged_count
+    
+    def get_free_page_ratio(self) -> float:
+        """获取数据库文件中空闲页所占比例（用于判断是否需要压缩）"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        page_count = cursor.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        conn.close()
+        return freelist_count / page_count if page_count else 0.0
+    
+    def compact_database(self):
+        """压缩数据库文件（VACUUM），回收已删除记录占用的空间
+        
+        VACUUM期间会锁住整个数据库，应在没有下载写入时调用
+        """
+        conn = self.get_connection()
+        conn.execute("VACUUM")
+        conn.close()
+    
+    def get_all_task_stats(self) -> List[TaskStats]:
+        """获取所有任务的统计信息（每个任务一行，不扫描episodes表）"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT s.*, t.task_name, t.drama_name, t.storage_path, t.follow
+            FROM task_stats s
+            JOIN tasks t ON s.task_id = t.id
+            ORDER BY t.created_at DESC
+        """)
+        stats = TaskStats.from_cursor(cursor)
+        conn.close()
+        return stats
+    
+    def get_active_task_stats(self) -> List[TaskStats]:
+        """获取有等待中或下载中剧集的任务的统计信息（按创建顺序，与下载队列一致）"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT s.*, t.task_name, t.drama_name, t.storage_path, t.follow
+            FROM task_stats s
+            JOIN tasks t ON s.task_id = t.id
+            WHERE s.pending_count + s.downloading_count > 0
+            ORDER BY t.created_at, t.id
+        """)
+        stats = TaskStats.from_cursor(cursor)
+        conn.close()
+        return stats
+    
+    def get_active_episodes_for_tasks(self, task_ids: List[int]) -> Dict[int, List[Episode]]:
+        """获取指定任务中等待中和下载中的剧集，按task_id分组（每组按剧集号排序）"""
+        result = {task_id: [] for task_id in task_ids}
+        if not task_ids:
+            return result
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        self._load_selected_ids(cursor, task_ids)
+        cursor.execute("""
+            SELECT e.*, t.task_name, t.storage_path as task_storage_path
+            FROM episodes e
+            JOIN tasks t ON e.task_id = t.id
+            WHERE e.task_id IN (SELECT id FROM temp_selected_ids) AND e.status IN ('pending', 'downloading')
+            ORDER BY e.task_id, e.episode_num
+        """)
+        
+        for episode in Episode.from_cursor(cursor):
+            result[episode.task_id].append(episode)
+        conn.close()
+        return result
+    
+    def get_episode_by_id(self, episode_id: int) -> Optional[Episode]:
         """根据ID获取剧集"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute("SELECT * FROM episodes WHERE id = ?", (episode_id,))
-        row = cursor.fetchone()
+        episode = Episode.first_from_cursor(cursor)
         conn.close()
-        return dict(row) if row else None
+        return episode
     
-    def get_episodes_by_status(self, status: str) -> List[Dict]:
+    def get_episodes_by_status(self, status: str) -> List[Episode]:
         """根据状态获取剧集"""
         conn = self.get_connection()
         cursor = conn.cursor()
@@ -388,10 +959,212 @@ class Database:
             ORDER BY created_at
         """, (status,))
         
-        episodes = [dict(row) for row in cursor.fetchall()]
+        episodes = Episode.from_cursor(cursor)
         conn.close()
         return episodes
     
+    def get_api_cache(self, source: str, cache_key: str, max_age: float) -> Optional[Dict]:
+        """获取未过期的API响应缓存
+        
+        Args:
+            source: 来源（shortlinetv/reelshort）
+            cache_key: 缓存键（video_id或slug）
+            max_age: 最大缓存时间（秒）
+        
+        Returns:
+            缓存的原始API数据，不存在或已过期时返回None
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT payload FROM api_cache
+            WHERE source = ? AND cache_key = ? AND fetched_at >= ?
+        """, (source, str(cache_key), time.time() - max_age))
+        row = cursor.fetchone()
+        conn.close()
+        
+        if not row:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+    
+    def set_api_cache(self, source: str, cache_key: str, payload: Dict):
+        """保存API响应缓存（覆盖旧值）"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT OR REPLACE INTO api_cache (source, cache_key, payload, fetched_at)
+            VALUES (?, ?, ?, ?)
+        """, (source, str(cache_key), json.dumps(payload, ensure_ascii=False), time.time()))
+        
+        conn.commit()
+        conn.close()
+    
+    def purge_api_cache(self, max_age: float) -> int:
+        """清除超过max_age秒的API响应缓存，返回清除的条数"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("DELETE FROM api_cache WHERE fetched_at < ?", (time.time() - max_age,))
+        purged_count = cursor.rowcount
+        
+        conn.commit()
+        conn.close()
+        return purged_count
+    
+    def add_credential(self, source: str, xtoken: str, uid: str) -> Credential:
+        """添加凭证（已存在时不重复添加），返回凭证记录"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT OR IGNORE INTO credentials (source, xtoken, uid) VALUES (?, ?, ?)
+        """, (source, xtoken, uid))
+        conn.commit()
+        
+        cursor.execute("""
+            SELECT * FROM credentials WHERE source = ? AND xtoken = ? AND uid = ?
+        """, (source, xtoken, uid))
+        credential = Credential.first_from_cursor(cursor)
+        conn.close()
+        return credential
+    
+    def get_credentials(self, source: str) -> List[Credential]:
+        """获取指定来源的所有凭证（包括已停用的）"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM credentials WHERE source = ? ORDER BY id", (source,))
+        credentials = Credential.from_cursor(cursor)
+        conn.close()
+        return credentials
+    
+    def update_credential_health(self, credential: Credential):
+        """保存凭证的使用时间、冷却时间和健康计数"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            UPDATE credentials
+            SET enabled = ?, last_used_at = ?, cooldown_until = ?, success_count = ?,
+                failure_count = ?, consecutive_failures = ?, last_error = ?
+            WHERE id = ?
+        """, (credential.enabled, credential.last_used_at, credential.cooldown_until,
+              credential.success_count, credential.failure_count,
+              credential.consecutive_failures, credential.last_error, credential.id))
+        
+        conn.commit()
+        conn.close()
+    
+    def update_episode_download_urls(self, task_id: int, download_urls: Dict[int, str]) -> int:
+        """按剧集号批量更新任务中未完成剧集的下载地址（用于刷新过期的签名地址）
+        
+        Args:
+            task_id: 任务ID
+            download_urls: {episode_num: download_url}
+        
+        Returns:
+            更新的剧集数
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.executemany("""
+            UPDATE episodes SET download_url = ?
+            WHERE task_id = ? AND episode_num = ? AND status NOT IN ('completed', 'deleted')
+        """, [(url, task_id, episode_num) for episode_num, url in download_urls.items()])
+        updated_count = cursor.rowcount
+        
+        conn.commit()
+        conn.close()
+        if updated_count:
+            self._bump_data_version()
+        return updated_count
+    
+    def add_new_episodes(self, task_id: int, episodes: List[Dict]) -> List[int]:
+        """只插入任务中还不存在的剧集（按(task_id, episode_num)唯一键去重，用于追更）
+        
+        已存在的剧集（包括已完成和已删除的）保持不变，新剧集以pending状态插入，由下载队列自动处理
+        
+        Returns:
+            新插入的剧集号列表
+        """
+        if not episodes:
+            return []
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        new_episode_nums = []
+        for episode in episodes:
+            cursor.execute("""
+                INSERT OR IGNORE INTO episodes 
+                (task_id, episode_num, episode_name, episode_url, download_url, status)
+                VALUES (?, ?, ?, ?, ?, 'pending')
+            """, (task_id, episode['episode_num'], episode.get('episode_name', ''),
+                  episode['episode_url'], episode.get('download_url', '')))
+            if cursor.rowcount > 0:
+                new_episode_nums.append(episode['episode_num'])
+        
+        conn.commit()
+        conn.close()
+        if new_episode_nums:
+            self._bump_data_version()
+        return new_episode_nums
+    
+    def get_due_follow_tasks(self, now: float) -> List[Task]:
+        """获取开启追更且已到检查时间的任务（最早到期的在前）"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT * FROM tasks
+            WHERE follow = 1 AND next_sync_at <= ?
+            ORDER BY next_sync_at
+        """, (now,))
+        tasks = Task.from_cursor(cursor)
+        conn.close()
+        return tasks
+    
+    def set_task_follow(self, task_id: int, follow: bool):
+        """开启或关闭任务的追更（开启时立即安排一次检查）"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        if follow:
+            cursor.execute("""
+                UPDATE tasks SET follow = 1, next_sync_at = ?,
+                    follow_interval = CASE WHEN follow_interval > 0 THEN follow_interval ELSE ? END
+                WHERE id = ?
+            """, (time.time(), config.FOLLOW_DEFAULT_INTERVAL, task_id))
+        else:
+            cursor.execute("UPDATE tasks SET follow = 0 WHERE id = ?", (task_id,))
+        
+        conn.commit()
+        conn.close()
+        self._bump_data_version()
+    
+    def update_follow_schedule(self, task_id: int, follow_interval: float, next_sync_at: float,
+                               last_synced_at: float = None, last_new_episode_at: float = None):
+        """保存追更任务的检查间隔和下次检查时间（last_*为None时保持原值）"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            UPDATE tasks SET follow_interval = ?, next_sync_at = ?,
+                last_synced_at = COALESCE(?, last_synced_at),
+                last_new_episode_at = COALESCE(?, last_new_episode_at)
+            WHERE id = ?
+        """, (follow_interval, next_sync_at, last_synced_at, last_new_episode_at, task_id))
+        
+        conn.commit()
+        conn.close()
+        self._bump_data_version()
+    
     def set_setting(self, key: str, value: str):
         """保存设置"""
         conn = self.get_connection()
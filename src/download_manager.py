@@ -1,20 +1,30 @@
 """
 下载管理器，使用yt-dlp进行视频下载，支持进度跟踪和并发下载
+
+yt-dlp（加载时会导入全部提取器）和API客户端（requests、aiohttp等HTTP库）在第一次下载或刷新下载地址时
+才在函数内导入，不拖慢程序启动
 """
-import os
+import time
 import threading
 import queue
 import logging
-from typing import Callable, Optional
+from typing import Callable, Optional, Tuple
 from pathlib import Path
-import yt_dlp
 # 使用绝对导入，兼容打包后的exe
 try:
     from src.database import Database
     from src.config import config
+    from src.models import OPEN_END_EPISODE
+    from src.error_policy import (classify_error, circuit_breakers, ERROR_AUTH,
+                                  ERROR_EXPIRED_URL, ERROR_PERMANENT)
+    from src.metrics import metrics
 except ImportError:
     from .database import Database
     from .config import config
+    from .models import OPEN_END_EPISODE
+    from .error_policy import (classify_error, circuit_breakers, ERROR_AUTH,
+                               ERROR_EXPIRED_URL, ERROR_PERMANENT)
+    from .metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -62,27 +72,122 @@ def cleanup_temp_files(storage_path: Path, episode_name: str):
 
 
 class DownloadProgressHook:
-    """yt-dlp进度钩子"""
+    """yt-dlp进度钩子
+    
+    HLS等分片下载时yt-dlp只给出不断变化的total_bytes_estimate（经常超过100%），因此：
+    - 有分片信息时按分片数计算进度，当前分片内按已下载的字节数在该分片的区间内插值；
+    - 分片大小按已完成分片的平均大小估算（第一个分片完成前按yt-dlp的估算总大小平均），
+      总大小为分片大小×分片总数，并随进度写入数据库（队列剩余时间依赖它）；
+    - 速度取已下载字节数变化的指数加权平均，剩余时间按平滑后的速度计算；
+    - 进度只增不减，完成前不超过99.9%
+    """
     
     def __init__(self, episode_id: int, progress_callback: Callable):
         self.episode_id = episode_id
         self.progress_callback = progress_callback
         self.last_progress = 0.0
+        self.speed = None  # 平滑后的速度（字节/秒）
+        self._last_sample = None  # 上次采样的(时间, 已下载字节数)
+        self._fragment_start = None  # 当前分片开始时的(已完成分片数, 已下载字节数)
+    
+    def update_fragment(self, d: dict) -> Optional[Tuple[int, int, float]]:
+        """记录当前分片的起点，返回(已完成分片数, 分片总数, 当前分片开始时已下载的字节数)，没有分片信息时返回None
+        
+        yt-dlp的fragment_index从0开始，每完成一个分片加1（即已完成的分片数，正在下载的是第fragment_index+1个）；
+        已完成分片数变化后第一次回调时的已下载字节数即已完成分片的大小之和
+        """
+        fragment_count = d.get('fragment_count')
+        if not fragment_count:
+            return None
+        completed = min(max(d.get('fragment_index') or 0, 0), fragment_count)
+        if self._fragment_start is None or self._fragment_start[0] != completed:
+            self._fragment_start = (completed, d.get('downloaded_bytes') or 0)
+        return completed, fragment_count, self._fragment_start[1]
+    
+    @staticmethod
+    def estimate_fragment_size(d: dict, fragment: Optional[Tuple[int, int, float]]) -> Optional[float]:
+        """估算单个分片的大小：按已完成分片的平均大小，第一个分片完成前按yt-dlp的估算总大小平均"""
+        if fragment is None:
+            return None
+        completed, fragment_count, start_bytes = fragment
+        if completed > 0 and start_bytes > 0:
+            return start_bytes / completed
+        estimate = d.get('total_bytes') or d.get('total_bytes_estimate')
+        return estimate / fragment_count if estimate else None
+    
+    @staticmethod
+    def estimate_total_bytes(d: dict, fragment: Optional[Tuple[int, int, float]],
+                             fragment_size: Optional[float]) -> Optional[float]:
+        """估算总字节数：优先使用确切大小，其次按分片大小，最后使用yt-dlp的估算值"""
+        if d.get('total_bytes'):
+            return d['total_bytes']
+        if fragment is not None and fragment_size:
+            return max(d.get('downloaded_bytes') or 0, fragment_size * fragment[1])
+        return d.get('total_bytes_estimate')
+    
+    def compute_progress(self, d: dict, total_bytes: Optional[float],
+                         fragment: Optional[Tuple[int, int, float]], fragment_size: Optional[float]) -> float:
+        """计算进度（0.0-99.9）"""
+        downloaded = d.get('downloaded_bytes') or 0
+        if fragment is not None:
+            # 进度限定在正在下载的分片的区间内，按该分片已下载的字节数插值
+            completed, fragment_count, start_bytes = fragment
+            low = completed / fragment_count * 100
+            high = min(completed + 1, fragment_count) / fragment_count * 100
+            ratio = 0.0
+            if fragment_size:
+                ratio = min(max((downloaded - start_bytes) / fragment_size, 0.0), 1.0)
+            progress = low + (high - low) * ratio
+        elif total_bytes:
+            progress = downloaded / total_bytes * 100
+        else:
+            progress = self.last_progress
+        return min(max(progress, self.last_progress), 99.9)
+    
+    def update_speed(self, downloaded_bytes: Optional[int], now: float = None) -> Optional[float]:
+        """按已下载字节数的变化更新平滑速度"""
+        if downloaded_bytes is None:
+            return self.speed
+        now = time.monotonic() if now is None else now
+        previous = self._last_sample
+        self._last_sample = (now, downloaded_bytes)
+        if previous is None or now <= previous[0] or downloaded_bytes < previous[1]:
+            return self.speed
+        rate = (downloaded_bytes - previous[1]) / (now - previous[0])
+        alpha = config.PROGRESS_SPEED_SMOOTHING
+        self.speed = rate if self.speed is None else alpha * rate + (1 - alpha) * self.speed
+        return self.speed
     
     def __call__(self, d: dict):
         """进度回调函数"""
         if d['status'] == 'downloading':
-            # 计算下载进度
-            if 'total_bytes' in d:
-                progress = (d.get('downloaded_bytes', 0) / d['total_bytes']) * 100
-            elif 'total_bytes_estimate' in d:
-                progress = (d.get('downloaded_bytes', 0) / d['total_bytes_estimate']) * 100
-            else:
-                progress = self.last_progress
+            downloaded_bytes = d.get('downloaded_bytes')
+            fragment = self.update_fragment(d)
+            fragment_size = self.estimate_fragment_size(d, fragment)
+            total_bytes = self.estimate_total_bytes(d, fragment, fragment_size)
+            progress = self.compute_progress(d, total_bytes, fragment, fragment_size)
+            speed = self.update_speed(downloaded_bytes)
+            eta = None
+            if speed and total_bytes and downloaded_bytes is not None:
+                eta = max(0.0, total_bytes - downloaded_bytes) / speed
             
             self.last_progress = progress
+            # 速度、剩余时间和分片信息只进入内存指标（监控页面），不写数据库
+            metrics.record_progress(
+                threading.current_thread().name, self.episode_id,
+                speed=speed,
+                downloaded_bytes=downloaded_bytes,
+                total_bytes=int(total_bytes) if total_bytes else None,
+                eta=eta,
+                fragment_index=d.get('fragment_index'),
+                fragment_count=d.get('fragment_count')
+            )
             if self.progress_callback:
-                self.progress_callback(self.episode_id, progress, 'downloading')
+                self.progress_callback(
+                    self.episode_id, progress, 'downloading',
+                    downloaded_bytes=downloaded_bytes,
+                    total_bytes=total_bytes
+                )
         
         elif d['status'] == 'finished':
             if self.progress_callback:
@@ -106,6 +211,9 @@ class DownloadManager:
         self.running = False
         self.lock = threading.Lock()
         self.processing_episodes = set()  # 正在处理或已加入队列的episode_id
+        self._url_refresh_times = {}  # task_id -> 上次刷新下载地址的时间
+        self._url_refresh_locks = {}  # task_id -> 该任务的刷新锁（不同任务的刷新互不阻塞）
+        self._url_refresh_lock = threading.Lock()  # 保护_url_refresh_locks
     
     def start(self):
         """启动下载管理器"""
@@ -115,7 +223,7 @@ class DownloadManager:
         self.running = True
         # 启动工作线程
         for i in range(self.max_concurrent):
-            worker = threading.Thread(target=self._worker, daemon=True)
+            worker = threading.Thread(target=self._worker, name=f"下载线程{i + 1}", daemon=True)
             worker.start()
             self.workers.append(worker)
         
@@ -123,6 +231,10 @@ class DownloadManager:
         queue_thread = threading.Thread(target=self._process_queue, daemon=True)
         queue_thread.start()
         
+        # 启动指标采样线程
+        metrics_thread = threading.Thread(target=self._sample_metrics, daemon=True)
+        metrics_thread.start()
+        
         logger.info("下载管理器已启动")
     
     def stop(self):
@@ -144,7 +256,11 @@ class DownloadManager:
             logger.warning(f"剧集 {episode_id} 不存在")
             return
         
-        status = episode.get('status')
+        status = episode.status
+        
+        # 目标主机熔断中时暂不调度，熔断解除后由队列扫描重新加入
+        if not circuit_breakers.is_available(episode.download_url or episode.episode_url or ''):
+            return
         
         # pending 状态的剧集直接添加
         if status == 'pending':
@@ -157,12 +273,17 @@ class DownloadManager:
         
         # error 状态的剧集需要检查重试次数和时间间隔
         if status == 'error':
-            from datetime import datetime, timedelta
+            from datetime import datetime
             
-            episode_num = episode.get('episode_num', 'Unknown')
-            retry_count = episode.get('retry_count', 0) or 0
+            episode_num = episode.episode_num
+            retry_count = episode.retry_count or 0
             max_retry_count = config.MAX_RETRY_COUNT
-            retry_delay_seconds = config.RETRY_DELAY_SECONDS
+            # 下载地址过期的剧集会在下载前刷新地址，可以立即重试
+            retry_delay_seconds = 0 if episode.error_kind == ERROR_EXPIRED_URL else config.RETRY_DELAY_SECONDS
+            
+            # 永久错误（资源不存在等）重试也不会成功
+            if episode.error_kind == ERROR_PERMANENT:
+                return
             
             # 检查重试次数是否超过限制
             if retry_count >= max_retry_count:
@@ -173,7 +294,7 @@ class DownloadManager:
                 return
             
             # 检查时间间隔
-            updated_at = episode.get('updated_at')
+            updated_at = episode.updated_at
             if updated_at:
                 try:
                     # 解析更新时间
@@ -216,28 +337,106 @@ class DownloadManager:
                         f"重试次数: {retry_count + 1}/{max_retry_count}"
                     )
     
+    def refresh_download_urls(self, task_info) -> bool:
+        """重新获取任务的剧集列表，更新未完成剧集的下载地址（签名地址会过期）
+        
+        shortlinetv的请求通过凭证池轮换账号；reelshort重新解析各集的流地址，解析不到的剧集改回页面地址。
+        同一任务在URL_REFRESH_MIN_INTERVAL内只刷新一次：同一任务并发的刷新请求等待正在进行的刷新完成后返回False
+        （此时数据库中已是刷新后的地址，调用方重新读取剧集即可），不同任务的刷新各自加锁、互不阻塞
+        
+        Returns:
+            bool: 是否更新了下载地址
+        """
+        if task_info.source not in ('shortlinetv', 'reelshort'):
+            return False
+        
+        with self._url_refresh_lock:
+            task_lock = self._url_refresh_locks.get(task_info.id)
+            if task_lock is None:
+                task_lock = self._url_refresh_locks[task_info.id] = threading.Lock()
+        
+        with task_lock:
+            last_refresh = self._url_refresh_times.get(task_info.id, 0.0)
+            if time.time() - last_refresh < config.URL_REFRESH_MIN_INTERVAL:
+                return False
+            self._url_refresh_times[task_info.id] = time.time()
+            
+            try:
+                if task_info.source == 'shortlinetv':
+                    try:
+                        from src.api_clients import ShortLineTVClient
+                    except ImportError:
+                        from .api_clients import ShortLineTVClient
+                    client = ShortLineTVClient(xtoken=task_info.xtoken, uid=task_info.uid, db=self.db)
+                    video_id = client.extract_video_id(task_info.drama_url)
+                    if not video_id:
+                        return False
+                    api_data = client.get_episodes(video_id, use_cache=False)
+                    episodes, _ = client.parse_episodes(api_data, 1, 0, is_default_range=True)
+                else:
+                    episodes = self._resolve_reelshort_episodes(task_info)
+                    if not episodes:
+                        return False
+                download_urls = {
+                    episode['episode_num']: episode['download_url']
+                    for episode in episodes if episode.get('download_url')
+                }
+                updated_count = self.db.update_episode_download_urls(task_info.id, download_urls)
+                logger.info(f"任务 {task_info.id} 已刷新 {updated_count} 个剧集的下载地址")
+                return updated_count > 0
+            except Exception as e:
+                logger.warning(f"刷新任务 {task_info.id} 的下载地址失败: {e}")
+                return False
+    
+    def _resolve_reelshort_episodes(self, task_info) -> list:
+        """重新获取reelshort任务的剧集列表并解析流地址，只返回数据库中尚未完成的剧集"""
+        try:
+            from src.api_clients import ReelShortClient
+            from src.async_api_clients import resolve_reelshort_streams
+        except ImportError:
+            from .api_clients import ReelShortClient
+            from .async_api_clients import resolve_reelshort_streams
+        
+        client = ReelShortClient(db=self.db)
+        slug = client.extract_slug(task_info.drama_url)
+        if not slug:
+            return []
+        unfinished_nums = {
+            episode.episode_num for episode in self.db.get_task_episodes(task_info.id)
+            if episode.status not in ('completed', 'deleted')
+        }
+        api_data = client.get_movie_data(slug, drama_url=task_info.drama_url, use_cache=False)
+        episodes, _ = client.parse_episodes(api_data, slug, 0, OPEN_END_EPISODE)
+        episodes = [episode for episode in episodes if episode['episode_num'] in unfinished_nums]
+        resolve_reelshort_streams(api_data, episodes, task_info.drama_url, db=self.db)
+        return episodes
+    
     def _process_queue(self):
         """处理下载队列（定期检查新的待下载剧集）"""
-        import time
-        from datetime import datetime, timedelta
+        last_maintenance = 0.0
         
         while self.running:
             try:
+                # 定期执行数据维护（清除软删除记录、压缩数据库）
+                if time.time() - last_maintenance >= config.MAINTENANCE_INTERVAL:
+                    last_maintenance = time.time()
+                    self._run_maintenance()
+                
                 # 获取待下载的剧集（pending状态）
                 pending_episodes = self.db.get_episodes_by_status('pending')
                 
                 for episode in pending_episodes:
-                    if episode['status'] != 'deleted':
-                        self.add_episode(episode['id'])
+                    if episode.status != 'deleted':
+                        self.add_episode(episode.id)
                 
                 # 获取失败状态的剧集（error状态），尝试添加到队列
                 # 注意：add_episode 方法内部已经检查了重试次数和时间间隔，这里只需要调用即可
                 error_episodes = self.db.get_episodes_by_status('error')
                 
                 for episode in error_episodes:
-                    if episode['status'] != 'deleted':
+                    if episode.status != 'deleted':
                         # add_episode 内部会检查重试次数和时间间隔
-                        self.add_episode(episode['id'])
+                        self.add_episode(episode.id)
                 
                 # 等待一段时间后再次检查
                 time.sleep(config.QUEUE_CHECK_INTERVAL)
@@ -246,6 +445,36 @@ class DownloadManager:
                 logger.error(f"处理队列时出错: {e}")
                 time.sleep(config.QUEUE_CHECK_INTERVAL * 2)
     
+    def _run_maintenance(self):
+        """数据维护：清除过期的软删除剧集和API缓存，空闲页较多且没有下载时压缩数据库"""
+        try:
+            purged_count = self.db.purge_deleted_episodes(
+                older_than_seconds=config.DELETED_PURGE_AGE_DAYS * 24 * 3600
+            )
+            if purged_count > 0:
+                logger.info(f"已清除 {purged_count} 条已删除的剧集记录")
+            
+            expired_count = self.db.purge_api_cache(config.API_CACHE_TTL)
+            if expired_count > 0:
+                logger.debug(f"已清除 {expired_count} 条过期的API缓存")
+            
+            with self.lock:
+                idle = not self.processing_episodes
+            if idle and self.db.get_free_page_ratio() >= config.VACUUM_FREE_RATIO:
+                self.db.compact_database()
+                logger.info("数据库压缩完成")
+        except Exception as e:
+            logger.warning(f"数据维护时出错: {e}")
+    
+    def _sample_metrics(self):
+        """定期把下载速度和队列深度写入指标环形缓冲区"""
+        while self.running:
+            try:
+                metrics.sample(self.download_queue.qsize())
+            except Exception as e:
+                logger.warning(f"采样下载指标时出错: {e}")
+            time.sleep(config.METRICS_SAMPLE_INTERVAL)
+    
     def _worker(self):
         """工作线程，执行下载任务"""
         while self.running:
@@ -259,14 +488,35 @@ class DownloadManager:
             except Exception as e:
                 logger.error(f"工作线程出错: {e}")
     
+    def _record_host_result(self, breaker, download_url: Optional[str], error=None):
+        """把下载结果记录到下载地址所属主机的熔断器
+        
+        调度时占用名额的熔断器如果不是下载地址所属的主机（还没取得下载地址就失败，或刷新后换了主机），
+        只释放名额，不改变其状态
+        """
+        if download_url:
+            circuit_breakers.record(download_url, error)
+        if breaker is not None and (not download_url or circuit_breakers.for_url(download_url) is not breaker):
+            breaker.release_probe()
+    
     def _download_episode(self, episode_id: int):
         """下载单个剧集"""
         episode = self.db.get_episode_by_id(episode_id)
         if not episode:
+            with self.lock:
+                self.processing_episodes.discard(episode_id)
             return
         
         # 检查是否已删除
-        if episode['status'] == 'deleted':
+        if episode.status == 'deleted':
+            with self.lock:
+                self.processing_episodes.discard(episode_id)
+            return
+        
+        # 占用目标主机熔断器的名额：熔断中不下载（状态保持不变，熔断解除后重新调度），
+        # 半开状态只放行一个试探下载，名额在下载结束记录结果时释放
+        breaker = circuit_breakers.for_url(episode.download_url or episode.episode_url or '')
+        if breaker is not None and not breaker.allow_request():
             with self.lock:
                 self.processing_episodes.discard(episode_id)
             return
@@ -274,26 +524,18 @@ class DownloadManager:
         # 更新状态为下载中
         self.db.update_episode_status(episode_id, 'downloading', 0.0)
         
+        download_url = None
+        
         try:
             # 获取任务信息以确定存储路径
-            task_episodes = self.db.get_task_episodes(episode['task_id'])
-            task_info = None
-            for ep in task_episodes:
-                if ep['id'] == episode_id:
-                    # 从任务中获取存储路径
-                    tasks = self.db.get_all_tasks()
-                    for task in tasks:
-                        if task['id'] == episode['task_id']:
-                            task_info = task
-                            break
-                    break
+            task_info = self.db.get_task_by_id(episode.task_id)
             
             if not task_info:
                 raise Exception("无法找到任务信息")
             
             # 在存储地址下创建以剧集名称为名的文件夹
-            base_storage_path = Path(task_info['storage_path'])
-            drama_name = task_info.get('drama_name', 'Unknown')
+            base_storage_path = Path(task_info.storage_path)
+            drama_name = task_info.drama_name or 'Unknown'
             # 清理文件夹名中的非法字符和控制字符
             safe_drama_name = config.sanitize_filename(drama_name)
             # 创建剧集名称文件夹
@@ -301,19 +543,30 @@ class DownloadManager:
             storage_path.mkdir(parents=True, exist_ok=True)
             
             # 构建输出文件名
-            episode_name = episode.get('episode_name', f"Episode_{episode['episode_num']}")
+            episode_name = episode.episode_name or f"Episode_{episode.episode_num}"
             # 清理文件名中的非法字符和控制字符
             safe_name = config.sanitize_filename(episode_name)
             # yt-dlp输出模板，使用%(ext)s让yt-dlp自动选择扩展名
             output_template = str(storage_path / f"{safe_name}.%(ext)s")
             
+            # 上次因签名地址过期或认证失败而失败的剧集，先刷新下载地址（shortlinetv通过凭证池换账号）再下载
+            # 旧数据库中没有错误类别的失败剧集同样刷新一次
+            needs_refresh = (episode.error_kind in (ERROR_EXPIRED_URL, ERROR_AUTH)
+                             or ((episode.retry_count or 0) > 0 and not episode.error_kind))
+            if needs_refresh:
+                self.refresh_download_urls(task_info)
+                refreshed_episode = self.db.get_episode_by_id(episode_id)
+                if refreshed_episode:
+                    episode = refreshed_episode
+            
             # 获取下载URL
-            download_url = episode.get('download_url') or episode.get('episode_url')
+            download_url = episode.download_url or episode.episode_url
             if not download_url:
                 raise Exception("缺少下载URL")
             
             # 创建进度钩子
-            def progress_hook(ep_id, progress, status, error_msg=None):
+            def progress_hook(ep_id, progress, status, error_msg=None,
+                              downloaded_bytes=None, total_bytes=None):
                 if status == 'completed':
                     # 获取实际下载的文件路径
                     actual_file = None
@@ -324,11 +577,13 @@ class DownloadManager:
                             break
                     
                     if actual_file:
-                        # 下载成功，重置重试次数
+                        # 下载成功，重置重试次数，并以实际文件大小作为最终字节数
+                        file_size = actual_file.stat().st_size
                         self.db.reset_episode_retry_count(ep_id)
                         self.db.update_episode_status(
                             ep_id, 'completed', 100.0, 
-                            storage_path=str(actual_file)
+                            storage_path=str(actual_file),
+                            downloaded_bytes=file_size, total_bytes=file_size
                         )
                     else:
                         # 如果找不到文件，仍然标记为完成，但记录警告
@@ -342,13 +597,18 @@ class DownloadManager:
                     # 下载失败，增加重试次数
                     retry_count = self.db.increment_episode_retry_count(ep_id)
                     self.db.update_episode_status(
-                        ep_id, 'error', 0.0, error_msg
+                        ep_id, 'error', 0.0, error_msg,
+                        error_kind=classify_error(error_msg or '')
                     )
                     logger.warning(
                         f"剧集 {ep_id} 下载失败，重试次数: {retry_count}/{config.MAX_RETRY_COUNT}"
                     )
                 else:
-                    self.db.update_episode_status(ep_id, 'downloading', progress)
+                    self.db.update_episode_status(
+                        ep_id, 'downloading', progress,
+                        downloaded_bytes=int(downloaded_bytes) if downloaded_bytes else None,
+                        total_bytes=int(total_bytes) if total_bytes else None
+                    )
                 
                 if self.progress_callback:
                     self.progress_callback(ep_id, progress, status, error_msg)
@@ -364,8 +624,16 @@ class DownloadManager:
                 'quiet': False,
                 'no_warnings': False,
             }
+            # reelshort的流地址（不是页面地址）需要带上站点的Referer
+            if task_info.source == 'reelshort' and download_url != episode.episode_url:
+                try:
+                    from src.api_clients import ReelShortClient
+                except ImportError:
+                    from .api_clients import ReelShortClient
+                ydl_opts['http_headers'] = {'Referer': f"{ReelShortClient.BASE_URL}/"}
             
             # 执行下载
+            import yt_dlp
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 ydl.download([download_url])
             
@@ -377,6 +645,12 @@ class DownloadManager:
                     actual_file = test_file
                     break
             
+            self._record_host_result(breaker, download_url)
+            metrics.record_finished(
+                threading.current_thread().name, True,
+                actual_file.stat().st_size if actual_file else None
+            )
+            
             if actual_file:
                 # 下载成功，确保重试次数已重置（progress_hook中已处理，这里作为双重保险）
                 self.db.reset_episode_retry_count(episode_id)
@@ -394,40 +668,44 @@ class DownloadManager:
         
         except Exception as e:
             error_msg = str(e)
-            logger.error(f"下载剧集 {episode_id} 失败: {error_msg}")
+            error_kind = classify_error(e)
+            logger.error(f"下载剧集 {episode_id} 失败 ({error_kind}): {error_msg}")
             
-            # 增加重试次数
-            retry_count = self.db.increment_episode_retry_count(episode_id)
-            self.db.update_episode_status(episode_id, 'error', 0.0, error_msg)
+            # 主机级错误（网络、超时、5xx）计入熔断器
+            self._record_host_result(breaker, download_url, e)
+            metrics.record_finished(threading.current_thread().name, False)
+            
+            if error_kind == ERROR_PERMANENT:
+                # 永久错误不再重试，直接用完重试次数
+                retry_count = config.MAX_RETRY_COUNT
+                self.db.update_episode_status(
+                    episode_id, 'error', 0.0, error_msg,
+                    retry_count=retry_count, error_kind=error_kind
+                )
+            else:
+                # 增加重试次数
+                retry_count = self.db.increment_episode_retry_count(episode_id)
+                self.db.update_episode_status(episode_id, 'error', 0.0, error_msg, error_kind=error_kind)
             
             # 检查是否达到最大重试次数
             if retry_count >= config.MAX_RETRY_COUNT:
                 logger.error(
-                    f"剧集 {episode_id} (Episode {episode.get('episode_num', 'Unknown')}) "
+                    f"剧集 {episode_id} (Episode {episode.episode_num}) "
                     f"已达到最大重试次数 ({retry_count}/{config.MAX_RETRY_COUNT})，将不再自动重试"
                 )
             
             # 清理下载过程中产生的临时文件（即使下载失败也要清理）
             try:
                 # 获取存储路径和文件名用于清理
-                task_episodes = self.db.get_task_episodes(episode.get('task_id', 0))
-                task_info = None
-                for ep in task_episodes:
-                    if ep['id'] == episode_id:
-                        tasks = self.db.get_all_tasks()
-                        for task in tasks:
-                            if task['id'] == episode.get('task_id', 0):
-                                task_info = task
-                                break
-                        break
+                task_info = self.db.get_task_by_id(episode.task_id)
                 
                 if task_info:
-                    base_storage_path = Path(task_info['storage_path'])
-                    drama_name = task_info.get('drama_name', 'Unknown')
+                    base_storage_path = Path(task_info.storage_path)
+                    drama_name = task_info.drama_name or 'Unknown'
                     safe_drama_name = config.sanitize_filename(drama_name)
                     storage_path = base_storage_path / safe_drama_name
                     
-                    episode_name = episode.get('episode_name', f"Episode_{episode.get('episode_num', 'Unknown')}")
+                    episode_name = episode.episode_name or f"Episode_{episode.episode_num}"
                     safe_name = config.sanitize_filename(episode_name)
                     
                     cleanup_temp_files(storage_path, safe_name)
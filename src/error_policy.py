@@ -0,0 +1,268 @@
+"""
+错误分类和按主机的熔断器：只把工作线程的时间花在可能成功的重试上
+"""
+import re
+import time
+import threading
+import logging
+from typing import Dict, Optional
+from urllib.parse import urlparse
+# 使用绝对导入，兼容打包后的exe
+try:
+    from src.config import config
+except ImportError:
+    from .config import config
+
+logger = logging.getLogger(__name__)
+
+# 错误类别
+ERROR_TRANSIENT = 'transient'      # 临时错误（网络、超时、5xx、限流），延迟后重试
+ERROR_AUTH = 'auth'                # 认证失败（凭证无效或被撤销），换凭证后重试
+ERROR_EXPIRED_URL = 'expired_url'  # 下载地址过期（签名失效），刷新地址后立即重试
+ERROR_PERMANENT = 'permanent'      # 永久错误（资源不存在、不支持的地址），不再重试
+
+# 从错误信息中提取HTTP状态码："HTTP Error 404: Not Found"、"403 Client Error: Forbidden"
+STATUS_PATTERNS = (
+    re.compile(r'HTTP Error (\d{3})'),
+    re.compile(r'\b(\d{3}) (?:Client|Server) Error'),
+    re.compile(r'\b(\d{3}),\s*message='),  # aiohttp.ClientResponseError
+)
+
+# 临时性网络错误的特征
+TRANSIENT_MARKERS = (
+    'timed out', 'timeout', 'connection reset', 'connection aborted', 'connection refused',
+    'remote end closed', 'temporary failure', 'name resolution', 'getaddrinfo',
+    'incompleteread', 'broken pipe', 'ssl', 'eof occurred', 'network is unreachable',
+)
+
+# 说明主机不可达的异常类型名（按类名匹配，避免导入requests/aiohttp；注意requests.HTTPError不在其中）
+HOST_FAILURE_TYPE_NAMES = (
+    'TimeoutError', 'Timeout', 'ConnectionError', 'ClientConnectionError',
+    'ServerDisconnectedError', 'ClientPayloadError',
+)
+
+# 下载地址过期的特征（CDN签名失效）
+EXPIRED_MARKERS = ('expired', 'signature', 'accessdenied', 'access denied', 'token invalid')
+
+# 永久错误的特征
+PERMANENT_MARKERS = (
+    'unsupported url', 'no video formats', 'is not a valid url', '缺少下载url', '无法找到任务信息',
+)
+
+
+class CircuitOpenError(Exception):
+    """主机处于熔断状态，请求未发出"""
+    
+    def __init__(self, host: str, retry_at: float):
+        super().__init__(f"主机 {host} 暂时不可用（熔断中），{max(0.0, retry_at - time.time()):.0f} 秒后重试")
+        self.host = host
+        self.retry_at = retry_at
+
+
+def extract_status_code(error) -> Optional[int]:
+    """从异常中提取HTTP状态码（requests、aiohttp、yt-dlp的错误信息），提取不到时返回None"""
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None) or getattr(error, 'status', None)
+    if isinstance(status, int):
+        return status
+    message = str(error)
+    for pattern in STATUS_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def classify_error(error, context: str = 'download') -> str:
+    """将错误分类为transient/auth/expired_url/permanent
+    
+    Args:
+        error: 异常对象或错误信息字符串
+        context: 'download'（下载CDN地址）或'api'（请求剧集信息API）；
+                 下载时403/410通常表示签名地址过期，API请求时403表示认证失败
+    
+    Returns:
+        错误类别
+    """
+    if isinstance(error, CircuitOpenError):
+        return ERROR_TRANSIENT
+    
+    message = str(error).lower()
+    status = extract_status_code(error)
+    
+    if status is not None:
+        if status == 401:
+            return ERROR_AUTH
+        if status in (403, 410):
+            if context == 'download':
+                return ERROR_EXPIRED_URL
+            return ERROR_AUTH
+        if status in (408, 425, 429) or status >= 500:
+            return ERROR_TRANSIENT
+        if status in (400, 404, 405, 451):
+            return ERROR_PERMANENT
+    
+    if context == 'download' and any(marker in message for marker in EXPIRED_MARKERS):
+        return ERROR_EXPIRED_URL
+    if any(marker in message for marker in PERMANENT_MARKERS):
+        return ERROR_PERMANENT
+    if any(marker in message for marker in TRANSIENT_MARKERS):
+        return ERROR_TRANSIENT
+    
+    # 无法识别的错误按临时错误处理，由重试次数上限兜底
+    return ERROR_TRANSIENT
+
+
+def is_host_failure(error) -> bool:
+    """错误是否说明主机本身不可用（计入熔断器）：网络错误、超时和5xx，不包括单个地址的问题"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    status = extract_status_code(error)
+    if status is not None:
+        return status >= 500
+    if any(cls.__name__ in HOST_FAILURE_TYPE_NAMES for cls in type(error).__mro__):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in TRANSIENT_MARKERS)
+
+
+def host_of(url: str) -> str:
+    """提取URL的主机名（小写），无法解析时返回空字符串"""
+    try:
+        return (urlparse(url).hostname or '').lower()
+    except ValueError:
+        return ''
+
+
+class CircuitBreaker:
+    """单个主机的熔断器
+    
+    连续失败达到阈值后熔断（open），期间不再向该主机发请求；熔断到期后进入半开（half_open），
+    只放行一个试探请求：成功则恢复（closed），失败则再次熔断且时间加倍（不超过上限）
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, host: str):
+        self.host = host
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trip_count = 0  # 连续熔断次数（用于加倍熔断时间）
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    def allow_request(self) -> bool:
+        """是否允许向该主机发请求（半开状态下只放行一个试探请求）"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.time() < self.open_until:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+    
+    def is_available(self) -> bool:
+        """是否可以调度请求（只查询状态，不占用半开状态的试探名额）"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.time() >= self.open_until
+            if self.state == self.HALF_OPEN:
+                return not self._probe_in_flight
+            return True
+    
+    def record_success(self):
+        """记录一次成功，恢复为关闭状态"""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"主机 {self.host} 已恢复，熔断解除")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.trip_count = 0
+            self._probe_in_flight = False
+    
+    def record_failure(self):
+        """记录一次主机级失败，达到阈值或半开试探失败时熔断"""
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= config.CIRCUIT_FAILURE_THRESHOLD:
+                self.trip_count += 1
+                open_seconds = min(
+                    config.CIRCUIT_OPEN_SECONDS * 2 ** (self.trip_count - 1),
+                    config.CIRCUIT_MAX_OPEN_SECONDS
+                )
+                self.state = self.OPEN
+                self.open_until = time.time() + open_seconds
+                logger.warning(
+                    f"主机 {self.host} 连续失败 {self.consecutive_failures} 次，熔断 {open_seconds:.0f} 秒"
+                )
+    
+    def release_probe(self):
+        """释放试探名额但不改变状态（占用名额的请求最终没有发往该主机时调用）"""
+        with self._lock:
+            self._probe_in_flight = False
+    
+    def check(self):
+        """不允许请求时抛出CircuitOpenError"""
+        if not self.allow_request():
+            raise CircuitOpenError(self.host, self.open_until)
+
+
+class CircuitBreakerRegistry:
+    """按主机管理熔断器"""
+    
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, host: str) -> CircuitBreaker:
+        """获取主机的熔断器（不存在时创建）"""
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(host)
+            return breaker
+    
+    def for_url(self, url: str) -> Optional[CircuitBreaker]:
+        """获取URL所属主机的熔断器，无法解析主机时返回None"""
+        host = host_of(url)
+        return self.get(host) if host else None
+    
+    def is_available(self, url: str) -> bool:
+        """URL所属主机当前是否可以调度请求"""
+        breaker = self.for_url(url)
+        return breaker is None or breaker.is_available()
+    
+    def record(self, url: str, error=None):
+        """记录一次请求结果
+        
+        error为None或非主机级错误（如404、403）时说明主机可达，按成功处理；网络错误、超时和5xx计入失败
+        """
+        if isinstance(error, CircuitOpenError):
+            return
+        breaker = self.for_url(url)
+        if breaker is None:
+            return
+        if error is not None and is_host_failure(error):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+    
+    def get_open_hosts(self) -> Dict[str, float]:
+        """获取当前熔断中的主机及其恢复时间"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.host: breaker.open_until for breaker in breakers
+                if breaker.state == CircuitBreaker.OPEN and breaker.open_until > time.time()}
+
+
+# 进程内共享的熔断器
+circuit_breakers = CircuitBreakerRegistry()
@@ -0,0 +1,171 @@
+"""
+追更：定期重新获取追更任务的剧集列表，只把新出现的剧集加入下载队列
+"""
+import time
+import threading
+import logging
+from typing import List, Dict, Tuple
+# 使用绝对导入，兼容打包后的exe
+try:
+    from src.database import Database
+    from src.config import config
+    from src.models import Task, OPEN_END_EPISODE
+except ImportError:
+    from .database import Database
+    from .config import config
+    from .models import Task, OPEN_END_EPISODE
+
+logger = logging.getLogger(__name__)
+
+
+def follow_range(task: Task) -> Tuple[int, int, bool]:
+    """追更时解析剧集列表使用的(start_episode, end_episode, is_default_range)
+    
+    "全部剧集"的任务保持默认区间（reelshort不包含预告片），其他任务从开始剧集号起不限结束剧集号
+    """
+    start_episode = task.start_episode or 0
+    end_episode = task.end_episode or 0
+    if task.source == 'shortlinetv':
+        if start_episode == 1 and end_episode == 0:
+            return 1, 0, True
+        return start_episode, 0, False
+    if start_episode == 0 and end_episode == 0:
+        return 0, 0, True
+    return start_episode, OPEN_END_EPISODE, False
+
+
+def next_follow_interval(interval: float, found_new: bool) -> float:
+    """根据本次检查结果计算下次检查间隔
+    
+    发现新剧集时间隔减半，没有新剧集时按FOLLOW_BACKOFF_FACTOR拉长，
+    检查间隔因此逐渐贴近剧集的实际更新节奏（日更的剧集稳定在较短间隔，停更的剧集很少检查）
+    """
+    interval = interval or config.FOLLOW_DEFAULT_INTERVAL
+    if found_new:
+        interval /= 2
+    else:
+        interval *= config.FOLLOW_BACKOFF_FACTOR
+    return min(max(interval, config.FOLLOW_MIN_INTERVAL), config.FOLLOW_MAX_INTERVAL)
+
+
+class FollowSyncer:
+    """追更线程：到期的追更任务依次重新获取剧集列表，按(task_id, episode_num)与已有剧集比较后只插入新剧集
+    
+    新剧集以pending状态写入数据库，由DownloadManager的队列扫描自动加入下载队列。
+    剧集列表请求复用API缓存（只接受不超过最小检查间隔一半的缓存），刚创建或刚刷新过的任务不会重复请求。
+    """
+    
+    def __init__(self, db: Database):
+        self.db = db
+        self.running = False
+        self._wakeup = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """启动追更线程"""
+        if self.running:
+            return
+        
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        logger.info("追更线程已启动")
+    
+    def stop(self):
+        """停止追更线程"""
+        self.running = False
+        self._wakeup.set()
+        logger.info("追更线程已停止")
+    
+    def sync_now(self):
+        """立即检查到期的追更任务（如刚开启追更时）"""
+        self._wakeup.set()
+    
+    def _run(self):
+        while self.running:
+            self._wakeup.clear()
+            try:
+                for task in self.db.get_due_follow_tasks(time.time()):
+                    if not self.running:
+                        break
+                    self.sync_task(task)
+            except Exception as e:
+                logger.error(f"检查追更任务时出错: {e}")
+            
+            self._wakeup.wait(config.FOLLOW_CHECK_INTERVAL)
+    
+    def fetch_episodes(self, task: Task) -> Tuple[List[Dict], Dict]:
+        """获取任务当前的剧集列表（按追更区间过滤）
+        
+        Returns:
+            (episodes, api_data)
+        """
+        # API客户端（及requests等HTTP库）在第一次追更检查时才导入，不拖慢程序启动
+        try:
+            from src.api_clients import ShortLineTVClient, ReelShortClient
+        except ImportError:
+            from .api_clients import ShortLineTVClient, ReelShortClient
+        
+        start_episode, end_episode, is_default_range = follow_range(task)
+        cache_max_age = config.FOLLOW_MIN_INTERVAL / 2
+        
+        if task.source == 'shortlinetv':
+            client = ShortLineTVClient(xtoken=task.xtoken, uid=task.uid, db=self.db)
+            video_id = client.extract_video_id(task.drama_url)
+            if not video_id:
+                raise Exception("无法从URL中提取video_id")
+            api_data = client.get_episodes(video_id, cache_max_age=cache_max_age)
+            episodes, _ = client.parse_episodes(api_data, start_episode, end_episode, is_default_range)
+        elif task.source == 'reelshort':
+            client = ReelShortClient(db=self.db)
+            slug = client.extract_slug(task.drama_url)
+            if not slug:
+                raise Exception("无法从URL中提取slug")
+            api_data = client.get_movie_data(slug, drama_url=task.drama_url, cache_max_age=cache_max_age)
+            episodes, _ = client.parse_episodes(api_data, slug, start_episode, end_episode, is_default_range)
+        else:
+            raise Exception(f"未知的来源: {task.source}")
+        return episodes, api_data
+    
+    def _resolve_new_streams(self, task: Task, api_data: Dict, new_episodes: List[Dict]):
+        """入库前为新的reelshort剧集解析流地址（原地更新download_url；解析失败的剧集以页面地址入库，不影响下载）"""
+        try:
+            from src.async_api_clients import resolve_reelshort_streams
+        except ImportError:
+            from .async_api_clients import resolve_reelshort_streams
+        
+        resolve_reelshort_streams(api_data, new_episodes, task.drama_url, db=self.db)
+    
+    def sync_task(self, task: Task) -> int:
+        """检查一个追更任务，返回新增的剧集数（出错时返回0，按当前间隔稍后重试）"""
+        now = time.time()
+        interval = task.follow_interval or config.FOLLOW_DEFAULT_INTERVAL
+        try:
+            episodes, api_data = self.fetch_episodes(task)
+            # 新剧集以pending状态入库后会立即被下载队列取走，所以先解析好下载地址再入库
+            existing_nums = self.db.get_task_episode_nums(task.id)
+            new_episodes = [episode for episode in episodes if episode['episode_num'] not in existing_nums]
+            if new_episodes and task.source == 'reelshort':
+                self._resolve_new_streams(task, api_data, new_episodes)
+            new_episode_nums = self.db.add_new_episodes(task.id, new_episodes)
+        except Exception as e:
+            logger.warning(f"追更任务 {task.task_name} 检查失败: {e}")
+            self.db.update_follow_schedule(task.id, interval, now + interval)
+            return 0
+        
+        found_new = bool(new_episode_nums)
+        interval = next_follow_interval(interval, found_new)
+        self.db.update_follow_schedule(
+            task.id, interval, now + interval,
+            last_synced_at=now,
+            last_new_episode_at=now if found_new else None
+        )
+        
+        if found_new:
+            logger.info(
+                f"追更任务 {task.task_name} 发现 {len(new_episode_nums)} 个新剧集: "
+                f"{new_episode_nums}，下次检查间隔 {interval / 60:.0f} 分钟"
+            )
+        else:
+            logger.debug(f"追更任务 {task.task_name} 没有新剧集，下次检查间隔 {interval / 60:.0f} 分钟")
+        return len(new_episode_nums)
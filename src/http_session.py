@@ -0,0 +1,173 @@
+"""
+共享HTTP会话，所有API请求和封面下载复用同一个连接池
+"""
+import threading
+import logging
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+# 使用绝对导入，兼容打包后的exe
+try:
+    from src.config import config
+    from src.error_policy import circuit_breakers, CircuitOpenError
+except ImportError:
+    from .config import config
+    from .error_policy import circuit_breakers, CircuitOpenError
+
+# 禁用urllib3的SSL警告（下载封面时跳过证书验证）
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+logger = logging.getLogger(__name__)
+
+
+class HostUnavailableError(CircuitOpenError, requests.exceptions.ConnectionError):
+    """目标主机熔断中，请求未发出（调用方按requests连接错误处理即可）"""
+    
+    def __init__(self, host: str, retry_at: float, request=None):
+        super().__init__(host, retry_at)
+        self.request = request
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """带连接复用统计的HTTPAdapter
+
+    urllib3的连接池会记录每个池新建的连接数（num_connections）和发出的请求数（num_requests），
+    两者之差即为复用已有keep-alive连接的请求数
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._pools_seen = []
+        self._pools_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def get_connection(self, url, proxies=None):
+        """获取连接池（requests<2.32使用此接口），记录下来用于统计"""
+        pool = super().get_connection(url, proxies)
+        self._remember_pool(pool)
+        return pool
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        """获取连接池（requests>=2.32使用此接口），记录下来用于统计"""
+        pool = super().get_connection_with_tls_context(request, verify, proxies, cert)
+        self._remember_pool(pool)
+        return pool
+
+    def send(self, request, **kwargs):
+        """发送前检查目标主机的熔断器，并把结果（网络错误、5xx或正常响应）计入熔断器"""
+        breaker = circuit_breakers.for_url(request.url)
+        if breaker is not None and not breaker.allow_request():
+            raise HostUnavailableError(breaker.host, breaker.open_until, request=request)
+        
+        try:
+            response = super().send(request, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        except BaseException:
+            # 其他异常（ChunkedEncodingError、InvalidURL等）不说明主机不可用，只归还半开状态的试探名额
+            if breaker is not None:
+                breaker.release_probe()
+            raise
+        
+        if breaker is not None:
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+        return response
+    
+    def _remember_pool(self, pool):
+        with self._pools_lock:
+            if not any(seen is pool for seen in self._pools_seen):
+                self._pools_seen.append(pool)
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取该adapter下所有连接池的请求数和新建连接数"""
+        with self._pools_lock:
+            pools = list(self._pools_seen)
+        requests_count = sum(pool.num_requests for pool in pools)
+        connections_count = sum(pool.num_connections for pool in pools)
+        return {
+            'requests': requests_count,
+            'connections': connections_count,
+            'reused': max(0, requests_count - connections_count),
+        }
+
+
+def _build_retry() -> Retry:
+    """构建连接/网关错误的自动重试策略"""
+    return Retry(
+        total=config.HTTP_MAX_RETRIES,
+        connect=config.HTTP_MAX_RETRIES,
+        read=config.HTTP_MAX_RETRIES,
+        status=config.HTTP_MAX_RETRIES,
+        backoff_factor=config.HTTP_RETRY_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD', 'POST']),
+        raise_on_status=False,  # 重试用尽后返回最后的响应，由调用方raise_for_status处理
+        respect_retry_after_header=False,  # 429由调用方处理（凭证池换账号并冷却），不在这里按Retry-After阻塞重试
+    )
+
+
+def _create_session() -> requests.Session:
+    """创建共享会话：按主机配置连接池大小，开启keep-alive和重试"""
+    session = requests.Session()
+    # 不在会话中保存服务端下发的cookie，避免不同xtoken/uid的请求之间互相串用（每次请求显式传入cookies）
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+    adapters = []
+    default_adapter = CountingHTTPAdapter(
+        pool_connections=config.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=config.HTTP_POOL_MAXSIZE,
+        max_retries=_build_retry(),
+    )
+    session.mount('https://', default_adapter)
+    session.mount('http://', default_adapter)
+    adapters.append(default_adapter)
+
+    # 为频繁访问的主机单独配置连接池大小（requests按最长前缀匹配adapter）
+    for host_prefix, pool_maxsize in config.HTTP_HOST_POOL_MAXSIZE.items():
+        adapter = CountingHTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_maxsize,
+            max_retries=_build_retry(),
+        )
+        session.mount(host_prefix, adapter)
+        adapters.append(adapter)
+
+    session._counting_adapters = adapters
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """获取进程内共享的requests.Session（首次调用时创建）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+                logger.debug("已创建共享HTTP会话")
+    return _session
+
+
+def get_connection_stats() -> Dict[str, int]:
+    """获取共享会话的连接复用统计
+
+    Returns:
+        {'requests': 请求总数, 'connections': 新建连接数, 'reused': 复用连接的请求数}
+    """
+    stats = {'requests': 0, 'connections': 0, 'reused': 0}
+    if _session is None:
+        return stats
+    for adapter in _session._counting_adapters:
+        for key, value in adapter.get_stats().items():
+            stats[key] += value
+    return stats
@@ -0,0 +1,198 @@
+"""
+下载指标：进度钩子上报的速度、字节数和分片信息保存在内存环形缓冲区中，供监控页面绘制曲线（不写数据库）
+"""
+import time
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+# 使用绝对导入，兼容打包后的exe
+try:
+    from src.config import config
+except ImportError:
+    from .config import config
+
+
+class RingBuffer:
+    """固定容量的(时间, 值)序列，写满后覆盖最早的采样"""
+    
+    def __init__(self, capacity: int):
+        self._items: Deque[Tuple[float, float]] = deque(maxlen=capacity)
+    
+    def append(self, timestamp: float, value: float):
+        self._items.append((timestamp, value))
+    
+    def values(self) -> List[float]:
+        """按时间顺序的采样值"""
+        return [value for _, value in list(self._items)]
+    
+    def latest(self) -> Optional[float]:
+        """最近一次采样值，没有采样时返回None"""
+        items = self._items
+        return items[-1][1] if items else None
+    
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class WorkerProgress:
+    """一个下载线程当前的进度（来自yt-dlp进度钩子）"""
+    
+    __slots__ = ('episode_id', 'speed', 'downloaded_bytes', 'total_bytes', 'eta',
+                 'fragment_index', 'fragment_count', 'updated_at')
+    
+    def __init__(self, episode_id: int):
+        self.episode_id = episode_id
+        self.speed = None
+        self.downloaded_bytes = None
+        self.total_bytes = None
+        self.eta = None
+        self.fragment_index = None
+        self.fragment_count = None
+        self.updated_at = 0.0
+    
+    def copy(self) -> 'WorkerProgress':
+        progress = WorkerProgress(self.episode_id)
+        for name in self.__slots__:
+            setattr(progress, name, getattr(self, name))
+        return progress
+    
+    @property
+    def remaining_bytes(self) -> Optional[int]:
+        if not self.total_bytes:
+            return None
+        return max(0, self.total_bytes - (self.downloaded_bytes or 0))
+
+
+class MetricsSnapshot:
+    """监控页面一次读取的指标（只读）"""
+    
+    __slots__ = ('total_speed', 'total_history', 'worker_history', 'workers', 'queue_depth',
+                 'queue_history', 'active_connections', 'error_rate', 'finished_count', 'backlog_eta')
+    
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+
+class DownloadMetrics:
+    """进程内的下载指标
+    
+    下载线程通过record_progress/record_finished上报，DownloadManager的采样线程每隔
+    METRICS_SAMPLE_INTERVAL调用sample()，把总速度、各线程速度和队列深度写入环形缓冲区；
+    超过METRICS_STALE_SECONDS没有上报的线程按速度0计算（卡住的下载不会一直显示旧速度）
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._capacity = max(1, int(config.METRICS_HISTORY_SECONDS / config.METRICS_SAMPLE_INTERVAL))
+        self._workers: Dict[str, WorkerProgress] = {}
+        self._total_history = RingBuffer(self._capacity)
+        self._worker_history: Dict[str, RingBuffer] = {}
+        self._queue_history = RingBuffer(self._capacity)
+        self._outcomes: Deque[Tuple[float, bool, Optional[int]]] = deque(maxlen=1000)  # (时间, 是否成功, 文件大小)
+        self._queue_depth = 0
+    
+    # ---------- 上报（下载线程） ----------
+    
+    def record_progress(self, worker: str, episode_id: int, speed: Optional[float] = None,
+                        downloaded_bytes: Optional[int] = None, total_bytes: Optional[int] = None,
+                        eta: Optional[float] = None, fragment_index: Optional[int] = None,
+                        fragment_count: Optional[int] = None):
+        """记录下载线程的一次进度"""
+        with self._lock:
+            progress = self._workers.get(worker)
+            if progress is None or progress.episode_id != episode_id:
+                progress = self._workers[worker] = WorkerProgress(episode_id)
+            progress.speed = speed
+            progress.downloaded_bytes = downloaded_bytes
+            progress.total_bytes = total_bytes
+            progress.eta = eta
+            progress.fragment_index = fragment_index
+            progress.fragment_count = fragment_count
+            progress.updated_at = time.time()
+    
+    def record_finished(self, worker: str, success: bool, size: Optional[int] = None):
+        """记录下载线程完成一集（成功或失败），清除该线程的进度"""
+        with self._lock:
+            self._workers.pop(worker, None)
+            self._outcomes.append((time.time(), success, size))
+    
+    # ---------- 采样（采样线程） ----------
+    
+    def sample(self, queue_depth: int, now: float = None):
+        """写入一个采样点"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._queue_depth = queue_depth
+            total = 0.0
+            for worker, progress in self._workers.items():
+                speed = self._current_speed(progress, now)
+                total += speed
+                history = self._worker_history.get(worker)
+                if history is None:
+                    history = self._worker_history[worker] = RingBuffer(self._capacity)
+                history.append(now, speed)
+            # 空闲的线程补0，曲线回落而不是停在最后的速度
+            for worker, history in self._worker_history.items():
+                if worker not in self._workers:
+                    history.append(now, 0.0)
+            self._total_history.append(now, total)
+            self._queue_history.append(now, queue_depth)
+    
+    @staticmethod
+    def _current_speed(progress: WorkerProgress, now: float) -> float:
+        if now - progress.updated_at > config.METRICS_STALE_SECONDS:
+            return 0.0
+        return progress.speed or 0.0
+    
+    # ---------- 读取（界面线程） ----------
+    
+    def snapshot(self, now: float = None) -> MetricsSnapshot:
+        """读取当前指标"""
+        now = time.time() if now is None else now
+        with self._lock:
+            # 复制一份，下载线程会继续原地更新进度
+            workers = {worker: progress.copy() for worker, progress in self._workers.items()}
+            active = sum(1 for progress in workers.values()
+                         if now - progress.updated_at <= config.METRICS_STALE_SECONDS)
+            recent = [outcome for outcome in self._outcomes if now - outcome[0] <= config.METRICS_ERROR_WINDOW]
+            failures = sum(1 for _, success, _ in recent if not success)
+            total_history = self._total_history.values()
+            snapshot = MetricsSnapshot(
+                total_speed=self._total_history.latest() or 0.0,
+                total_history=total_history,
+                worker_history={worker: history.values() for worker, history in self._worker_history.items()},
+                workers=workers,
+                queue_depth=self._queue_depth,
+                queue_history=self._queue_history.values(),
+                active_connections=active,
+                error_rate=failures / len(recent) if recent else 0.0,
+                finished_count=len(recent),
+                backlog_eta=self._backlog_eta(workers, total_history),
+            )
+        return snapshot
+    
+    def _backlog_eta(self, workers: Dict[str, WorkerProgress], total_history: List[float]) -> Optional[float]:
+        """估算整个队列的剩余时间
+        
+        剩余字节数 = 正在下载的剧集未下载的部分 + 队列中等待的剧集数 × 平均剧集大小
+        （平均大小取最近成功下载的剧集，没有时取正在下载的剧集的总大小）；
+        速度取最近一分钟采样的平均值，避免瞬时波动
+        """
+        window = max(1, int(60 / config.METRICS_SAMPLE_INTERVAL))
+        recent_speeds = total_history[-window:]
+        speed = sum(recent_speeds) / len(recent_speeds) if recent_speeds else 0.0
+        if speed <= 0:
+            return None
+        
+        sizes = [size for _, success, size in self._outcomes if success and size]
+        if not sizes:
+            sizes = [progress.total_bytes for progress in workers.values() if progress.total_bytes]
+        average_size = sum(sizes) / len(sizes) if sizes else 0
+        remaining = sum(progress.remaining_bytes or 0 for progress in workers.values())
+        remaining += self._queue_depth * average_size
+        return remaining / speed
+
+
+# 进程内共享的下载指标
+metrics = DownloadMetrics()
@@ -0,0 +1,138 @@
+"""
+数据记录类型，数据库读取接口返回的紧凑行对象
+"""
+from typing import Any, Dict, Optional
+
+# 开放区间（如"5-"）的结束剧集号：shortlinetv用0表示不限，reelshort按闭区间过滤，需要一个足够大的值
+OPEN_END_EPISODE = 100000
+
+
+class Record:
+    """基于__slots__的行记录基类
+
+    相比dict(row)，每行不再保存重复的字符串键和哈希表，只保存字段值本身。
+    记录按只读对象使用，读取方通过属性访问字段。
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_cursor(cls, cursor) -> list:
+        """将游标中剩余的所有行转换为记录列表
+
+        列名到字段的映射只根据cursor.description计算一次，结果中不在__slots__里的列会被忽略
+        """
+        slots = set(cls.__slots__)
+        columns = [(index, desc[0]) for index, desc in enumerate(cursor.description)
+                   if desc[0] in slots]
+        missing = [name for name in cls.__slots__
+                   if name not in {column for _, column in columns}]
+        records = []
+        for row in cursor.fetchall():
+            record = cls.__new__(cls)
+            for index, name in columns:
+                setattr(record, name, row[index])
+            for name in missing:
+                setattr(record, name, None)
+            records.append(record)
+        return records
+
+    @classmethod
+    def first_from_cursor(cls, cursor) -> Optional['Record']:
+        """将游标结果的第一行转换为记录，没有数据时返回None（用于按主键查询）"""
+        records = cls.from_cursor(cursor)
+        return records[0] if records else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（用于日志或序列化）"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={getattr(self, 'id', None)!r})"
+
+
+class Task(Record):
+    """任务记录（tasks表的一行）"""
+
+    __slots__ = (
+        'id', 'task_name', 'source', 'drama_name', 'drama_url',
+        'start_episode', 'end_episode', 'storage_path', 'xtoken', 'uid',
+        'follow', 'follow_interval', 'next_sync_at', 'last_synced_at', 'last_new_episode_at',
+        'created_at', 'updated_at',
+    )
+
+
+class Episode(Record):
+    """剧集记录（episodes表的一行）
+
+    task_name和task_storage_path只在与tasks表联合查询时才有值，否则为None
+    """
+
+    __slots__ = (
+        'id', 'task_id', 'episode_num', 'episode_name', 'episode_url',
+        'download_url', 'storage_path', 'status', 'progress', 'error_message',
+        'retry_count', 'downloaded_bytes', 'total_bytes', 'error_kind', 'created_at', 'updated_at',
+        'task_name', 'task_storage_path',
+    )
+
+
+class TaskStats(Record):
+    """任务统计记录（task_stats表的一行，附带任务名称、存储路径和是否追更）
+
+    计数和累计值由数据库触发器在每次剧集状态变化的同一事务内维护
+    """
+
+    __slots__ = (
+        'task_id', 'pending_count', 'downloading_count', 'completed_count',
+        'error_count', 'deleted_count', 'progress_sum', 'downloaded_bytes',
+        'total_bytes', 'updated_at', 'task_name', 'drama_name', 'storage_path', 'follow',
+    )
+
+    @property
+    def total_count(self) -> int:
+        """有效剧集数（不含已删除）"""
+        return ((self.pending_count or 0) + (self.downloading_count or 0)
+                + (self.completed_count or 0) + (self.error_count or 0))
+
+    @property
+    def active_count(self) -> int:
+        """尚未结束的剧集数（等待中+下载中）"""
+        return (self.pending_count or 0) + (self.downloading_count or 0)
+
+    @property
+    def percent(self) -> float:
+        """任务整体进度（0.0-100.0），按剧集进度平均"""
+        total = self.total_count
+        if total == 0:
+            return 0.0
+        return min(100.0, (self.progress_sum or 0.0) / total)
+
+    @property
+    def remaining_bytes(self) -> int:
+        """已知总大小中尚未下载的字节数（用于估算ETA）"""
+        return max(0, (self.total_bytes or 0) - (self.downloaded_bytes or 0))
+
+    @property
+    def is_finished(self) -> bool:
+        """任务是否已全部下载完成（没有等待、下载中或失败的剧集）"""
+        return self.total_count > 0 and self.completed_count == self.total_count
+
+
+class Credential(Record):
+    """凭证记录（credentials表的一行，shortlinetv的xtoken/uid）
+
+    CredentialPool持有并更新池内的记录（最近使用时间、冷却时间和健康计数），其他读取方按只读使用
+    """
+
+    __slots__ = (
+        'id', 'source', 'xtoken', 'uid', 'enabled', 'last_used_at', 'cooldown_until',
+        'success_count', 'failure_count', 'consecutive_failures', 'last_error', 'created_at',
+    )
+
+    def is_available(self, now: float) -> bool:
+        """当前是否可用（已启用且不在冷却中）"""
+        return bool(self.enabled) and (self.cooldown_until or 0) <= now
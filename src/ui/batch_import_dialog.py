@@ -0,0 +1,352 @@
+"""
+批量导入界面
+"""
+import logging
+from pathlib import Path
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
+                             QPlainTextEdit, QPushButton, QFileDialog, QTableWidget,
+                             QTableWidgetItem, QHeaderView)
+from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtGui import QColor
+# 使用绝对导入，兼容打包后的exe
+try:
+    from src.batch_import import parse_text, parse_file
+    from src.ui.message_box_helper import show_warning
+except ImportError:
+    from ..batch_import import parse_text, parse_file
+    from ..ui.message_box_helper import show_warning
+
+logger = logging.getLogger(__name__)
+
+# 结果表格的列
+COLUMN_LINE, COLUMN_SOURCE, COLUMN_NAME, COLUMN_RANGE, COLUMN_STATUS = range(5)
+
+STATUS_COLORS = {
+    'ok': QColor(76, 175, 80),
+    'error': QColor(244, 67, 54),
+    'running': QColor(33, 150, 243),
+}
+
+
+class BatchImportThread(QThread):
+    """批量导入线程：并发获取剧集信息，成功的行在同一个事务中写入数据库，再下载封面"""
+    
+    row_updated = pyqtSignal(int, str, str)  # (行索引, 状态: ok/error/running, 说明)
+    finished = pyqtSignal(int, int)  # 完成信号: (成功创建的任务数, 失败行数)
+    
+    def __init__(self, task_data_list: list, db):
+        super().__init__()
+        self.task_data_list = task_data_list
+        self.db = db
+    
+    def _on_resolved(self, index: int, result):
+        """单个剧集解析完成（在异步事件循环线程中调用，信号会排队到界面线程）"""
+        if isinstance(result, Exception):
+            self.row_updated.emit(index, 'error', f"获取剧集信息失败: {result}")
+            return
+        episodes, cover_url = result
+        if not episodes:
+            self.row_updated.emit(index, 'error', "未找到可下载的剧集")
+        else:
+            self.row_updated.emit(index, 'running', f"已获取 {len(episodes)} 个剧集，等待保存")
+    
+    def run(self):
+        """执行批量导入"""
+        created_count = 0
+        failed_count = 0
+        try:
+            # 异步API客户端（aiohttp）和封面下载（requests）在第一次批量导入时才导入，不拖慢程序启动
+            try:
+                from src.async_api_clients import get_runtime, resolve_dramas
+                from src.cover_downloader import download_drama_cover
+            except ImportError:
+                from ..async_api_clients import get_runtime, resolve_dramas
+                from ..cover_downloader import download_drama_cover
+            
+            results = get_runtime().run(
+                resolve_dramas(self.task_data_list, db=self.db, on_result=self._on_resolved)
+            )
+            
+            indexes = []
+            items = []
+            for index, result in enumerate(results):
+                if isinstance(result, Exception) or not result[0]:
+                    failed_count += 1
+                    continue
+                indexes.append(index)
+                items.append((self.task_data_list[index], result[0]))
+            
+            if not items:
+                return
+            
+            try:
+                self.db.create_tasks_with_episodes(items)
+            except Exception as e:
+                logger.error(f"批量保存任务失败: {e}")
+                for index in indexes:
+                    self.row_updated.emit(index, 'error', f"保存任务失败: {e}")
+                failed_count += len(indexes)
+                return
+            
+            created_count = len(indexes)
+            
+            # 任务已保存，下载队列会自动取到新的待下载剧集；封面下载失败不影响任务创建
+            for index, (task_data, episodes) in zip(indexes, items):
+                message = f"已创建任务，{len(episodes)} 个剧集"
+                cover_url = results[index][1]
+                if download_drama_cover(cover_url, task_data['storage_path'], task_data['drama_name']):
+                    message += "，封面已下载"
+                self.row_updated.emit(index, 'ok', message)
+        
+        except Exception as e:
+            logger.error(f"批量导入时出错: {e}")
+            failed_count = len(self.task_data_list) - created_count
+        
+        finally:
+            logger.info(f"批量导入完成: 成功 {created_count} 个，失败 {failed_count} 个")
+            self.finished.emit(created_count, failed_count)
+
+
+class BatchImportDialog(QDialog):
+    """批量导入对话框（非模态，导入过程中可以继续使用主窗口）"""
+    
+    tasks_created = pyqtSignal(int)  # 成功创建的任务数
+    
+    def __init__(self, parent=None, db=None):
+        super().__init__(parent)
+        self.db = db
+        self.import_thread = None
+        self.loaded_file = None  # 选择的导入文件
+        self.row_offsets = {}  # 导入线程中的索引 -> 结果表格中的行号
+        self.init_ui()
+    
+    def init_ui(self):
+        """初始化UI"""
+        self.setWindowTitle("批量导入")
+        self.setModal(False)
+        self.resize(900, 650)
+        
+        layout = QVBoxLayout()
+        layout.setSpacing(10)
+        
+        hint_label = QLabel(
+            "每行一个剧集：网址 [区间] [剧集名称]，也可用逗号或制表符分隔并带上来源和任务名称。\n"
+            "区间示例：all（全部）、5（只下载第5集）、1-10、5-（第5集及以后）。来源可根据网址自动识别。"
+        )
+        hint_label.setWordWrap(True)
+        layout.addWidget(hint_label)
+        
+        self.text_input = QPlainTextEdit()
+        self.text_input.setPlaceholderText(
+            "https://www.reelshort.com/movie/xxx 1-20 剧集名称\n"
+            "shortlinetv,https://shortlinetv.com/videos/xxx,all,剧集名称"
+        )
+        layout.addWidget(self.text_input, 1)
+        
+        # 存储地址
+        storage_layout = QHBoxLayout()
+        storage_layout.addWidget(QLabel("存储地址:"))
+        self.storage_input = QLineEdit()
+        if self.db:
+            self.storage_input.setText(self.db.get_setting('last_storage_path', '') or '')
+        storage_layout.addWidget(self.storage_input, 1)
+        storage_btn = QPushButton("选择文件夹")
+        storage_btn.clicked.connect(self.select_storage_path)
+        storage_layout.addWidget(storage_btn)
+        layout.addLayout(storage_layout)
+        
+        # shortlinetv的默认xtoken和uid（行内未指定时使用）
+        token_layout = QHBoxLayout()
+        token_layout.addWidget(QLabel("xtoken:"))
+        self.xtoken_input = QLineEdit()
+        self.xtoken_input.setPlaceholderText("shortlinetv默认access-token")
+        token_layout.addWidget(self.xtoken_input, 1)
+        token_layout.addWidget(QLabel("uid:"))
+        self.uid_input = QLineEdit()
+        self.uid_input.setPlaceholderText("shortlinetv默认uid-token")
+        token_layout.addWidget(self.uid_input, 1)
+        layout.addLayout(token_layout)
+        
+        # 按钮
+        button_layout = QHBoxLayout()
+        self.file_btn = QPushButton("从文件导入（CSV/JSON）")
+        self.file_btn.clicked.connect(self.load_file)
+        button_layout.addWidget(self.file_btn)
+        button_layout.addStretch()
+        self.summary_label = QLabel("")
+        button_layout.addWidget(self.summary_label)
+        self.import_btn = QPushButton("开始导入")
+        self.import_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #4CAF50;
+                color: white;
+                border: none;
+                padding: 8px 20px;
+                border-radius: 6px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #45a049;
+            }
+            QPushButton:disabled {
+                background-color: #9E9E9E;
+            }
+        """)
+        self.import_btn.clicked.connect(self.start_import)
+        button_layout.addWidget(self.import_btn)
+        layout.addLayout(button_layout)
+        
+        # 逐行结果
+        self.result_table = QTableWidget()
+        self.result_table.setColumnCount(5)
+        self.result_table.setHorizontalHeaderLabels(["行号", "来源", "剧集名称", "区间", "结果"])
+        header = self.result_table.horizontalHeader()
+        header.setSectionResizeMode(COLUMN_LINE, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(COLUMN_SOURCE, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(COLUMN_NAME, QHeaderView.Stretch)
+        header.setSectionResizeMode(COLUMN_RANGE, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(COLUMN_STATUS, QHeaderView.Stretch)
+        self.result_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.result_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.result_table.verticalHeader().setVisible(False)
+        layout.addWidget(self.result_table, 1)
+        
+        self.setLayout(layout)
+    
+    def get_defaults(self) -> dict:
+        """各行共用的默认值"""
+        return {
+            'storage_path': self.storage_input.text().strip(),
+            'xtoken': self.xtoken_input.text().strip(),
+            'uid': self.uid_input.text().strip(),
+        }
+    
+    def select_storage_path(self):
+        """选择存储路径"""
+        default_path = self.storage_input.text().strip() or str(Path.home())
+        path = QFileDialog.getExistingDirectory(self, "选择存储文件夹", default_path)
+        if path:
+            self.storage_input.setText(path)
+    
+    def load_file(self):
+        """从CSV/JSON文件读取剧集列表"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "选择导入文件", str(Path.home()),
+            "剧集列表 (*.csv *.json *.txt);;所有文件 (*)"
+        )
+        if not file_path:
+            return
+        try:
+            rows = parse_file(file_path, self.get_defaults())
+        except Exception as e:
+            show_warning(self, "读取失败", f"读取导入文件失败: {str(e)}")
+            return
+        # 清空粘贴的文本，开始导入时使用文件内容
+        self.loaded_file = file_path
+        self.text_input.clear()
+        self.text_input.setPlaceholderText(f"已读取文件: {file_path}（{len(rows)} 行）")
+        self.show_rows(rows)
+    
+    def show_rows(self, rows: list):
+        """在结果表格中列出解析后的行"""
+        self.result_table.setRowCount(len(rows))
+        for row_index, row in enumerate(rows):
+            task_data = row.task_data or {}
+            if task_data:
+                if task_data['is_default_range']:
+                    range_text = "全部"
+                elif task_data['start_episode'] == task_data['end_episode']:
+                    range_text = str(task_data['start_episode'])
+                else:
+                    range_text = f"{task_data['start_episode']}-{task_data['end_episode'] or ''}"
+            else:
+                range_text = ''
+            self.result_table.setItem(row_index, COLUMN_LINE, QTableWidgetItem(str(row.line)))
+            self.result_table.setItem(row_index, COLUMN_SOURCE, QTableWidgetItem(task_data.get('source', '')))
+            self.result_table.setItem(row_index, COLUMN_NAME, QTableWidgetItem(task_data.get('drama_name', row.raw)))
+            self.result_table.setItem(row_index, COLUMN_RANGE, QTableWidgetItem(range_text))
+            if row.ok:
+                self.set_row_status(row_index, 'running', "等待导入")
+            else:
+                self.set_row_status(row_index, 'error', row.error)
+    
+    def set_row_status(self, row_index: int, state: str, message: str):
+        """更新结果表格中一行的状态"""
+        item = QTableWidgetItem(message)
+        item.setForeground(STATUS_COLORS.get(state, QColor(0, 0, 0)))
+        item.setToolTip(message)
+        self.result_table.setItem(row_index, COLUMN_STATUS, item)
+    
+    def start_import(self):
+        """解析输入并开始批量导入"""
+        if self.import_thread and self.import_thread.isRunning():
+            return
+        
+        defaults = self.get_defaults()
+        if not defaults['storage_path']:
+            show_warning(self, "输入错误", "请选择存储地址！")
+            return
+        storage_path = Path(defaults['storage_path'])
+        try:
+            storage_path.mkdir(parents=True, exist_ok=True)
+        except Exception as e:
+            show_warning(self, "输入错误", f"无法创建存储目录: {str(e)}")
+            return
+        defaults['storage_path'] = str(storage_path.absolute())
+        
+        text = self.text_input.toPlainText()
+        rows = []
+        if text.strip():
+            rows = parse_text(text, defaults)
+        elif self.loaded_file:
+            # 按当前的默认值重新解析文件（存储地址、xtoken可能在读取文件后才填写）
+            try:
+                rows = parse_file(self.loaded_file, defaults)
+            except Exception as e:
+                show_warning(self, "读取失败", f"读取导入文件失败: {str(e)}")
+                return
+        if not rows:
+            show_warning(self, "输入错误", "请粘贴剧集列表或选择导入文件！")
+            return
+        
+        self.show_rows(rows)
+        
+        task_data_list = []
+        self.row_offsets = {}
+        for row_index, row in enumerate(rows):
+            if row.ok:
+                self.row_offsets[len(task_data_list)] = row_index
+                task_data_list.append(row.task_data)
+        
+        invalid_count = len(rows) - len(task_data_list)
+        if not task_data_list:
+            self.summary_label.setText(f"没有可导入的行（{invalid_count} 行格式错误）")
+            return
+        
+        if self.db:
+            self.db.set_setting('last_storage_path', defaults['storage_path'])
+        
+        self.import_btn.setEnabled(False)
+        self.file_btn.setEnabled(False)
+        self.summary_label.setText(f"正在导入 {len(task_data_list)} 个剧集...")
+        
+        self.import_thread = BatchImportThread(task_data_list, self.db)
+        self.import_thread.row_updated.connect(self.on_row_updated)
+        self.import_thread.finished.connect(
+            lambda created, failed: self.on_import_finished(created, failed + invalid_count)
+        )
+        self.import_thread.start()
+    
+    def on_row_updated(self, index: int, state: str, message: str):
+        """导入线程报告某一行的结果"""
+        row_index = self.row_offsets.get(index)
+        if row_index is not None:
+            self.set_row_status(row_index, state, message)
+    
+    def on_import_finished(self, created_count: int, failed_count: int):
+        """批量导入完成"""
+        self.import_btn.setEnabled(True)
+        self.file_btn.setEnabled(True)
+        self.summary_label.setText(f"导入完成：成功 {created_count} 个，失败 {failed_count} 个")
+        if created_count > 0:
+            self.tasks_created.emit(created_count)
@@ -0,0 +1,256 @@
+"""
+下载监控界面：总速度和各下载线程速度曲线、队列深度、活动连接数、错误率、整个队列的剩余时间、凭证池和熔断主机
+"""
+import logging
+import time
+from typing import Dict, List
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QFrame, QScrollArea
+from PyQt5.QtCore import Qt, QTimer, QPointF
+from PyQt5.QtGui import QColor, QFont, QPainter, QPen, QBrush, QPolygonF
+# 使用绝对导入，兼容打包后的exe
+try:
+    from src.config import config
+    from src.metrics import metrics, MetricsSnapshot
+    from src.credential_pool import credential_pool
+    from src.error_policy import circuit_breakers
+    from src.ui.task_tree_model import format_speed, format_eta
+except ImportError:
+    from ..config import config
+    from ..metrics import metrics, MetricsSnapshot
+    from ..credential_pool import credential_pool
+    from ..error_policy import circuit_breakers
+    from .task_tree_model import format_speed, format_eta
+
+logger = logging.getLogger(__name__)
+
+
+class Sparkline(QWidget):
+    """迷你曲线图：按最大值缩放绘制一段采样序列，左上角显示标题和当前值"""
+    
+    def __init__(self, title: str, color: QColor, parent=None):
+        super().__init__(parent)
+        self.title = title
+        self.color = color
+        self.values: List[float] = []
+        self.text = ""
+        self.setMinimumHeight(90)
+    
+    def set_values(self, values: List[float], text: str):
+        self.values = values
+        self.text = text
+        self.update()
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = self.rect().adjusted(1, 1, -1, -1)
+        painter.fillRect(rect, QColor(255, 255, 255))
+        painter.setPen(QPen(QColor(221, 221, 221)))
+        painter.drawRect(rect)
+        
+        plot = rect.adjusted(8, 28, -8, -8)
+        values = self.values
+        if len(values) >= 2 and plot.width() > 0 and plot.height() > 0:
+            peak = max(values) or 1.0
+            step = plot.width() / (len(values) - 1)
+            points = [
+                QPointF(plot.left() + i * step, plot.bottom() - value / peak * plot.height())
+                for i, value in enumerate(values)
+            ]
+            # 曲线下方填充半透明颜色
+            area = QPolygonF([QPointF(plot.left(), plot.bottom())] + points + [QPointF(plot.right(), plot.bottom())])
+            fill = QColor(self.color)
+            fill.setAlpha(50)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QBrush(fill))
+            painter.drawPolygon(area)
+            painter.setPen(QPen(self.color, 2))
+            painter.setBrush(Qt.NoBrush)
+            painter.drawPolyline(QPolygonF(points))
+        
+        painter.setPen(QColor(51, 51, 51))
+        painter.drawText(rect.adjusted(8, 4, -8, 0), Qt.AlignLeft | Qt.AlignTop, self.title)
+        painter.drawText(rect.adjusted(8, 4, -8, 0), Qt.AlignRight | Qt.AlignTop, self.text)
+        painter.end()
+
+
+class StatCard(QFrame):
+    """单个指标：标题和数值"""
+    
+    def __init__(self, title: str, parent=None):
+        super().__init__(parent)
+        self.setStyleSheet("""
+            QFrame {
+                background-color: white;
+                border: 1px solid #ddd;
+                border-radius: 8px;
+            }
+            QLabel {
+                border: none;
+            }
+        """)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(12, 8, 12, 8)
+        title_label = QLabel(title)
+        title_label.setStyleSheet("color: #666; font-size: 14px;")
+        self.value_label = QLabel("--")
+        self.value_label.setStyleSheet("color: #2196F3; font-size: 22px; font-weight: bold;")
+        layout.addWidget(title_label)
+        layout.addWidget(self.value_label)
+        self.setLayout(layout)
+    
+    def set_value(self, text: str):
+        self.value_label.setText(text)
+
+
+class DashboardWidget(QWidget):
+    """下载监控界面
+    
+    数据来自内存中的指标环形缓冲区（src.metrics），不查询数据库；只在界面显示时定时刷新
+    """
+    
+    WORKER_COLOR = QColor(76, 175, 80)
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.worker_lines: Dict[str, Sparkline] = {}
+        self.init_ui()
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(int(config.METRICS_SAMPLE_INTERVAL * 1000))
+        self.refresh_timer.timeout.connect(self.refresh)
+    
+    def init_ui(self):
+        """初始化UI"""
+        layout = QVBoxLayout()
+        layout.setSpacing(15)
+        layout.setContentsMargins(20, 20, 20, 20)
+        self.setStyleSheet("""
+            QWidget {
+                background-color: #f5f5f5;
+            }
+        """)
+        
+        font = QFont()
+        font.setPointSize(config.TABLE_FONT_SIZE)
+        self.setFont(font)
+        
+        # 指标卡片
+        cards_layout = QHBoxLayout()
+        cards_layout.setSpacing(10)
+        self.speed_card = StatCard("总速度")
+        self.queue_card = StatCard("队列深度")
+        self.connections_card = StatCard("活动连接")
+        self.error_card = StatCard("错误率")
+        self.eta_card = StatCard("全部剩余时间")
+        self.credential_card = StatCard("可用凭证")
+        self.circuit_card = StatCard("熔断主机")
+        for card in (self.speed_card, self.queue_card, self.connections_card, self.error_card, self.eta_card,
+                     self.credential_card, self.circuit_card):
+            cards_layout.addWidget(card)
+        layout.addLayout(cards_layout)
+        
+        # 总速度和队列深度曲线
+        self.total_line = Sparkline("总速度", QColor(33, 150, 243))
+        self.total_line.setMinimumHeight(160)
+        layout.addWidget(self.total_line)
+        self.queue_line = Sparkline("队列深度", QColor(255, 152, 0))
+        layout.addWidget(self.queue_line)
+        
+        # 各下载线程的速度曲线（按线程出现的顺序动态添加）
+        worker_title = QLabel("各下载线程速度")
+        worker_title.setStyleSheet("font-size: 16px; font-weight: bold; color: #333;")
+        layout.addWidget(worker_title)
+        self.worker_container = QWidget()
+        self.worker_grid = QGridLayout()
+        self.worker_grid.setSpacing(10)
+        self.worker_grid.setContentsMargins(0, 0, 0, 0)
+        self.worker_container.setLayout(self.worker_grid)
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setFrameShape(QFrame.NoFrame)
+        scroll.setWidget(self.worker_container)
+        layout.addWidget(scroll, 1)
+        
+        self.setLayout(layout)
+    
+    def showEvent(self, event):
+        """界面显示时立即刷新并开始定时刷新"""
+        super().showEvent(event)
+        self.refresh()
+        self.refresh_timer.start()
+    
+    def hideEvent(self, event):
+        """界面隐藏时停止定时刷新"""
+        super().hideEvent(event)
+        self.refresh_timer.stop()
+    
+    def refresh(self):
+        """读取指标并更新界面"""
+        snapshot = metrics.snapshot()
+        
+        self.speed_card.set_value(format_speed(snapshot.total_speed) or "0 B/s")
+        self.queue_card.set_value(str(snapshot.queue_depth))
+        self.connections_card.set_value(str(snapshot.active_connections))
+        if snapshot.finished_count:
+            self.error_card.set_value(f"{snapshot.error_rate * 100:.1f}%（{snapshot.finished_count} 集）")
+        else:
+            self.error_card.set_value("--")
+        self.eta_card.set_value(format_eta(snapshot.backlog_eta))
+        self.refresh_credentials()
+        self.refresh_open_hosts()
+        
+        self.total_line.set_values(snapshot.total_history, format_speed(snapshot.total_speed) or "0 B/s")
+        self.queue_line.set_values(snapshot.queue_history, str(snapshot.queue_depth))
+        self.refresh_workers(snapshot)
+    
+    def refresh_credentials(self):
+        """更新凭证池状态（可用数/总数，悬停显示每个凭证的状态）"""
+        credentials = credential_pool.get_all()
+        if not credentials:
+            self.credential_card.set_value("--")
+            self.credential_card.setToolTip("")
+            return
+        self.credential_card.set_value(f"{credential_pool.available_count()}/{len(credentials)}")
+        now = time.time()
+        lines = []
+        for credential in credentials:
+            if not credential.enabled:
+                state = "已停用"
+            elif (credential.cooldown_until or 0) > now:
+                state = f"冷却中，{format_eta(credential.cooldown_until - now)}后恢复"
+            else:
+                state = "可用"
+            if credential.last_error:
+                state += f"（最近错误: {credential.last_error}）"
+            lines.append(f"uid={credential.uid}: {state}")
+        self.credential_card.setToolTip("\n".join(lines))
+    
+    def refresh_open_hosts(self):
+        """更新熔断中的主机数（悬停显示各主机的恢复时间）"""
+        open_hosts = circuit_breakers.get_open_hosts()
+        self.circuit_card.set_value(str(len(open_hosts)))
+        now = time.time()
+        self.circuit_card.setToolTip("\n".join(
+            f"{host}: {format_eta(retry_at - now)}后重试" for host, retry_at in sorted(open_hosts.items())
+        ))
+    
+    def refresh_workers(self, snapshot: MetricsSnapshot):
+        """更新各下载线程的曲线"""
+        for worker in sorted(snapshot.worker_history):
+            line = self.worker_lines.get(worker)
+            if line is None:
+                line = self.worker_lines[worker] = Sparkline(worker, self.WORKER_COLOR)
+                index = len(self.worker_lines) - 1
+                self.worker_grid.addWidget(line, index // 2, index % 2)
+            
+            history = snapshot.worker_history[worker]
+            progress = snapshot.workers.get(worker)
+            if progress is None:
+                text = "空闲"
+            else:
+                text = format_speed(history[-1] if history else 0) or "0 B/s"
+                if progress.fragment_count:
+                    text += f"  分片 {progress.fragment_index or 0}/{progress.fragment_count}"
+                if progress.eta is not None:
+                    text += f"  剩余 {format_eta(progress.eta)}"
+            line.set_values(history, text)
@@ -0,0 +1,312 @@
+"""
+剧集表格的数据模型和进度条委托（下载中、已完成两个列表共用）
+"""
+from typing import Callable, List, Optional, Sequence, Set, Tuple
+from PyQt5.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionProgressBar
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
+from PyQt5.QtGui import QColor, QPalette
+# 使用绝对导入，兼容打包后的exe
+try:
+    from src.models import Episode
+    from src.ui.row_sync import (RowIndex, remove_rows, insert_rows, sync_rows, history_key,
+                                 history_page_rows, history_stale_rows, history_missing_rows, history_new_rows)
+except ImportError:
+    from ..models import Episode
+    from .row_sync import (RowIndex, remove_rows, insert_rows, sync_rows, history_key,
+                           history_page_rows, history_stale_rows, history_missing_rows, history_new_rows)
+
+# 自定义数据角色：下载进度列返回(progress, status)，由ProgressBarDelegate绘制
+ProgressRole = Qt.UserRole + 1
+
+STATUS_TEXTS = {
+    'pending': '等待中',
+    'downloading': '下载中',
+    'error': '错误',
+    'deleted': '已删除',
+}
+
+
+def progress_level_color(progress: float) -> QColor:
+    """按进度区分颜色：低于30%红色，低于70%橙色，其余绿色"""
+    if progress < 30:
+        return QColor(255, 0, 0)
+    if progress < 70:
+        return QColor(255, 165, 0)
+    return QColor(0, 128, 0)
+
+
+def episode_progress_text(episode: Episode) -> str:
+    """剧集下载进度的文字（下载中的剧集由ProgressBarDelegate绘制为进度条）"""
+    status = episode.status or 'pending'
+    if status == 'downloading':
+        return f"{episode.progress or 0.0:.1f}%"
+    if status == 'error':
+        return "错误"
+    return "等待中"
+
+
+def episode_progress_color(episode: Episode) -> QColor:
+    """剧集下载进度的颜色：下载中按进度区分，错误为红色，等待中为灰色"""
+    status = episode.status or 'pending'
+    if status == 'downloading':
+        return progress_level_color(episode.progress or 0.0)
+    if status == 'error':
+        return QColor(255, 0, 0)
+    return QColor(128, 128, 128)
+
+
+class EpisodeColumn:
+    """表格的一列：表头、取值函数和可选的提示/颜色函数"""
+    
+    __slots__ = ('header', 'value', 'tooltip', 'foreground')
+    
+    def __init__(self, header: str, value: Callable[[Episode], str],
+                 tooltip: bool = False, foreground: Optional[Callable[[Episode], Optional[QColor]]] = None):
+        self.header = header
+        self.value = value
+        self.tooltip = tooltip
+        self.foreground = foreground
+
+
+class EpisodeTableModel(QAbstractTableModel):
+    """剧集列表模型
+    
+    第0列为选择列（使用项的勾选状态，不再为每行创建QCheckBox）；勾选状态按episode_id保存，刷新后保持不变。
+    set_episodes()与当前行比较后只发出必要的增删行和dataChanged信号，没有变化的行不会重绘。
+    """
+    
+    def __init__(self, columns: Sequence[EpisodeColumn],
+                 checkable: Callable[[Episode], bool] = None, parent=None):
+        super().__init__(parent)
+        self.columns = list(columns)
+        self.checkable = checkable or (lambda episode: True)
+        self.episodes: List[Episode] = []
+        self._signatures: List[Tuple] = []
+        self._checked = set()
+    
+    # ---------- QAbstractTableModel接口 ----------
+    
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.episodes)
+    
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.columns) + 1
+    
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return "选择" if section == 0 else self.columns[section - 1].header
+        return QVariant()
+    
+    def flags(self, index: QModelIndex):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if index.column() == 0:
+            episode = self.episodes[index.row()]
+            if not self.checkable(episode):
+                return Qt.ItemIsSelectable
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+    
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        episode = self.episodes[index.row()]
+        column = index.column()
+        
+        if column == 0:
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if episode.id in self._checked else Qt.Unchecked
+            return QVariant()
+        
+        spec = self.columns[column - 1]
+        if role == Qt.DisplayRole:
+            return spec.value(episode)
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if role == Qt.ToolTipRole and spec.tooltip:
+            return spec.value(episode)
+        if role == Qt.ForegroundRole and spec.foreground is not None:
+            color = spec.foreground(episode)
+            return color if color is not None else QVariant()
+        if role == ProgressRole:
+            return (episode.progress or 0.0, episode.status or 'pending')
+        return QVariant()
+    
+    def setData(self, index: QModelIndex, value, role=Qt.EditRole) -> bool:
+        if not index.isValid() or index.column() != 0 or role != Qt.CheckStateRole:
+            return False
+        episode = self.episodes[index.row()]
+        if not self.checkable(episode):
+            return False
+        if value == Qt.Checked:
+            self._checked.add(episode.id)
+        else:
+            self._checked.discard(episode.id)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+    
+    # ---------- 勾选状态 ----------
+    
+    def checked_episodes(self) -> List[Episode]:
+        """当前勾选的剧集（只包括可勾选的行）"""
+        return [episode for episode in self.episodes
+                if episode.id in self._checked and self.checkable(episode)]
+    
+    def checked_ids(self) -> List[int]:
+        """当前勾选的剧集ID"""
+        return [episode.id for episode in self.checked_episodes()]
+    
+    def set_all_checked(self, checked: bool):
+        """全选/全不选（不可勾选的行保持不变）"""
+        if checked:
+            self._checked.update(episode.id for episode in self.episodes if self.checkable(episode))
+        else:
+            self._checked.clear()
+        if self.episodes:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.episodes) - 1, 0),
+                                  [Qt.CheckStateRole])
+    
+    # ---------- 增量更新 ----------
+    
+    @staticmethod
+    def _signature(episode: Episode) -> Tuple:
+        """行内容的签名（字段值元组），用于判断行是否需要重绘"""
+        return tuple(getattr(episode, name) for name in episode.__slots__)
+    
+    def _remove_rows(self, rows: List[int]):
+        """删除指定的行（升序行号）"""
+        remove_rows(self, QModelIndex(), self.episodes, self._signatures, rows)
+    
+    def _insert_rows(self, row: int, episodes: List[Episode]):
+        """在row处插入一段连续的行"""
+        insert_rows(self, QModelIndex(), self.episodes, self._signatures, row, episodes, self._signature)
+    
+    def set_episodes(self, episodes: List[Episode]):
+        """用新的剧集列表更新模型（增量更新，见sync_rows）"""
+        self._checked &= {episode.id for episode in episodes}
+        sync_rows(self, QModelIndex(), self.episodes, self._signatures, episodes,
+                  key=lambda episode: episode.id, signature=self._signature, last_column=len(self.columns))
+
+
+class CompletedHistoryModel(EpisodeTableModel):
+    """已完成剧集的虚拟化模型
+    
+    行按完成时间倒序排列，只保存已加载的部分：视图滚动到底部时通过canFetchMore/fetchMore
+    请求下一页（由request_page在后台线程中读取，结果交给append_page）。
+    刷新时不重新读取已加载的行，只在顶部插入新完成的剧集、删除已移出完成状态的剧集（apply_changes）。
+    episode_id到行号的索引（RowIndex）随增删行更新，row_of不扫描已加载的行
+    """
+    
+    def __init__(self, columns: Sequence[EpisodeColumn],
+                 request_page: Callable[[Optional[Tuple[str, int]]], None],
+                 page_size: int, parent=None):
+        super().__init__(columns, parent=parent)
+        self.request_page = request_page
+        self.page_size = page_size
+        self.removal_seq: Optional[int] = None  # 已应用到的移出日志序号（Database.get_completed_removals）
+        self._exhausted = False  # 是否已加载到最早的剧集
+        self._loading = False  # 是否有未完成的分页请求
+        self._row_index = RowIndex(key=lambda episode: episode.id)
+    
+    def top_key(self) -> Optional[Tuple[str, int]]:
+        """已加载的最新一行的排序键，没有行时返回None"""
+        return history_key(self.episodes[0]) if self.episodes else None
+    
+    def bottom_key(self) -> Optional[Tuple[str, int]]:
+        """已加载的最早一行的排序键，没有行时返回None"""
+        return history_key(self.episodes[-1]) if self.episodes else None
+    
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and not self._exhausted and not self._loading
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._loading = True
+        self.request_page(self.bottom_key())
+    
+    def append_page(self, before: Optional[Tuple[str, int]], episodes: Sequence[Episode]):
+        """追加一页较早完成的剧集
+        
+        Args:
+            before: 请求这一页时的bottom_key（与当前不一致说明期间最后的行被删除了，按排序键过滤即可）
+            episodes: 按完成时间倒序排列的剧集
+        """
+        self._loading = False
+        if len(episodes) < self.page_size:
+            self._exhausted = True
+        self._insert_rows(len(self.episodes), history_page_rows(self.episodes, episodes))
+    
+    def page_failed(self):
+        """分页请求失败，允许视图稍后重新请求"""
+        self._loading = False
+    
+    def apply_changes(self, new_episodes: Sequence[Episode], removal_seq: int,
+                      removed_ids: Optional[Set[int]], live_ids: Optional[Set[int]],
+                      floor: Optional[Tuple[str, int]]):
+        """应用一次刷新的结果
+        
+        Args:
+            new_episodes: 排在请求时top_key之前（新完成）的剧集，按完成时间倒序排列
+            removal_seq: 读取移出日志时的序号
+            removed_ids: 请求时的removal_seq之后移出完成状态的剧集ID；None表示无法从日志得知
+            live_ids: removed_ids为None时，排序键不早于floor的已完成剧集ID（全量检查）；否则为None
+            floor: 请求时的bottom_key；之后追加的行不在检查范围内
+        """
+        changed_ids = [episode.id for episode in new_episodes]
+        changed_ids.extend(removed_ids or ())
+        stale = history_stale_rows(self.row_of, changed_ids)
+        if live_ids is not None and floor is not None:
+            stale = sorted(set(stale).union(history_missing_rows(self.episodes, live_ids, floor)))
+        self._checked.difference_update(self.episodes[row].id for row in stale)
+        self._remove_rows(stale)
+        self.removal_seq = removal_seq
+        
+        if not self.episodes and len(new_episodes) >= self.page_size:
+            # 列表为空时新剧集只取了第一页，更早的剧集由fetchMore继续加载
+            self._exhausted = False
+        self._insert_rows(0, history_new_rows(self.episodes, new_episodes))
+    
+    def row_of(self, episode_id: int) -> int:
+        """episode_id所在的行号，未加载时返回-1"""
+        return self._row_index.row_of(episode_id)
+    
+    def _insert_rows(self, row: int, episodes: List[Episode]):
+        if not episodes:
+            return
+        super()._insert_rows(row, episodes)
+        self._row_index.inserted(self.episodes, row, len(episodes))
+    
+    def _remove_rows(self, rows: List[int]):
+        if not rows:
+            return
+        removed_ids = [self.episodes[row].id for row in rows]
+        super()._remove_rows(rows)
+        self._row_index.removed(self.episodes, rows, removed_ids)
+
+
+class ProgressBarDelegate(QStyledItemDelegate):
+    """下载进度列：下载中的剧集绘制进度条（颜色取自ForegroundRole），其他状态显示文字"""
+    
+    def paint(self, painter, option, index):
+        value = index.data(ProgressRole)
+        if not value or value[1] != 'downloading':
+            super().paint(painter, option, index)
+            return
+        
+        progress, _ = value
+        bar = QStyleOptionProgressBar()
+        bar.rect = option.rect.adjusted(6, 6, -6, -6)
+        bar.minimum = 0
+        bar.maximum = 1000
+        bar.progress = int(max(0.0, min(progress, 100.0)) * 10)
+        bar.text = f"{progress:.1f}%"
+        bar.textVisible = True
+        bar.textAlignment = Qt.AlignCenter
+        bar.state = option.state
+        bar.palette = option.palette
+        color = index.data(Qt.ForegroundRole)
+        if isinstance(color, QColor):
+            bar.palette.setColor(QPalette.Highlight, color)
+        style = option.widget.style() if option.widget is not None else QApplication.style()
+        style.drawControl(QStyle.CE_ProgressBar, bar, painter)
@@ -0,0 +1,106 @@
+"""
+追更管理界面：为已有任务开启或关闭追更
+"""
+import logging
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QTableWidget, QTableWidgetItem, QHeaderView)
+from PyQt5.QtCore import Qt, pyqtSignal
+# 使用绝对导入，兼容打包后的exe
+try:
+    from src.database import Database
+    from src.ui.message_box_helper import show_warning
+except ImportError:
+    from ..database import Database
+    from ..ui.message_box_helper import show_warning
+
+logger = logging.getLogger(__name__)
+
+HEADERS = ["任务名称", "剧集名称", "剧集数", "已完成", "追更"]
+COLUMN_TASK, COLUMN_DRAMA, COLUMN_TOTAL, COLUMN_COMPLETED, COLUMN_FOLLOW = range(len(HEADERS))
+
+
+class FollowTasksDialog(QDialog):
+    """追更管理对话框：列出所有任务，勾选"追更"列即开启追更（开启后立即检查一次）"""
+    
+    follow_changed = pyqtSignal(int, bool)  # (task_id, 是否追更)
+    
+    def __init__(self, db: Database, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.init_ui()
+        self.load_tasks()
+    
+    def init_ui(self):
+        """初始化UI"""
+        self.setWindowTitle("追更管理")
+        self.resize(800, 500)
+        
+        layout = QVBoxLayout()
+        layout.setSpacing(10)
+        
+        hint_label = QLabel("开启追更的任务会定期检查新剧集并自动下载（从开始剧集号起，不限结束剧集号）")
+        hint_label.setWordWrap(True)
+        layout.addWidget(hint_label)
+        
+        self.table = QTableWidget(0, len(HEADERS))
+        self.table.setHorizontalHeaderLabels(HEADERS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(COLUMN_TASK, QHeaderView.Stretch)
+        header.setSectionResizeMode(COLUMN_DRAMA, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+        
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        close_btn = QPushButton("关闭")
+        close_btn.clicked.connect(self.accept)
+        button_layout.addWidget(close_btn)
+        layout.addLayout(button_layout)
+        
+        self.setLayout(layout)
+    
+    def load_tasks(self):
+        """读取所有任务的统计信息并填充表格"""
+        try:
+            task_stats = self.db.get_all_task_stats()
+        except Exception as e:
+            logger.error(f"读取任务列表失败: {e}")
+            show_warning(self, "错误", f"读取任务列表失败: {e}")
+            return
+        
+        # 填充期间不处理勾选变化
+        self.table.blockSignals(True)
+        self.table.setRowCount(len(task_stats))
+        for row, stats in enumerate(task_stats):
+            name_item = QTableWidgetItem(stats.task_name or '')
+            name_item.setData(Qt.UserRole, stats.task_id)
+            self.table.setItem(row, COLUMN_TASK, name_item)
+            self.table.setItem(row, COLUMN_DRAMA, QTableWidgetItem(stats.drama_name or ''))
+            self.table.setItem(row, COLUMN_TOTAL, QTableWidgetItem(str(stats.total_count)))
+            self.table.setItem(row, COLUMN_COMPLETED, QTableWidgetItem(str(stats.completed_count or 0)))
+            follow_item = QTableWidgetItem()
+            follow_item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
+            follow_item.setCheckState(Qt.Checked if stats.follow else Qt.Unchecked)
+            self.table.setItem(row, COLUMN_FOLLOW, follow_item)
+        self.table.blockSignals(False)
+        self.table.itemChanged.connect(self.on_item_changed)
+    
+    def on_item_changed(self, item: QTableWidgetItem):
+        """勾选或取消勾选"追更"列"""
+        if item.column() != COLUMN_FOLLOW:
+            return
+        task_id = self.table.item(item.row(), COLUMN_TASK).data(Qt.UserRole)
+        follow = item.checkState() == Qt.Checked
+        try:
+            self.db.set_task_follow(task_id, follow)
+        except Exception as e:
+            logger.error(f"设置追更失败: {e}")
+            show_warning(self, "错误", f"设置追更失败: {e}")
+            self.table.blockSignals(True)
+            item.setCheckState(Qt.Unchecked if follow else Qt.Checked)
+            self.table.blockSignals(False)
+            return
+        self.follow_changed.emit(task_id, follow)
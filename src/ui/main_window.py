@@ -3,35 +3,34 @@
 """
 import logging
 import sys
-import re
-import requests
-import urllib3
-from urllib.parse import urlparse, urlunparse
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                             QPushButton, QStackedWidget, QMessageBox, QApplication)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+                             QPushButton, QStackedWidget, QMessageBox)
+from PyQt5.QtCore import Qt
 from pathlib import Path
-
-# 禁用urllib3的SSL警告（用于下载封面时跳过证书验证）
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 # 使用绝对导入，兼容打包后的exe
 try:
     from src.database import Database
-    from src.api_clients import ShortLineTVClient, ReelShortClient
     from src.download_manager import DownloadManager
+    from src.follow_syncer import FollowSyncer
     from src.config import config
     from src.ui.new_task_widget import NewTaskWidget
     from src.ui.task_progress_widget import TaskProgressWidget
-    from src.ui.message_box_helper import show_information, show_warning, show_critical, show_question
+    from src.ui.dashboard_widget import DashboardWidget
+    from src.ui.batch_import_dialog import BatchImportDialog
+    from src.ui.task_creation_queue import TaskCreationQueue, PendingJobsPanel
+    from src.ui.message_box_helper import show_warning, show_question
 except ImportError:
     # 如果绝对导入失败，使用相对导入（开发模式）
     from ..database import Database
-    from ..api_clients import ShortLineTVClient, ReelShortClient
     from ..download_manager import DownloadManager
+    from ..follow_syncer import FollowSyncer
     from ..config import config
     from .new_task_widget import NewTaskWidget
     from .task_progress_widget import TaskProgressWidget
-    from .message_box_helper import show_information, show_warning, show_critical, show_question
+    from .dashboard_widget import DashboardWidget
+    from .batch_import_dialog import BatchImportDialog
+    from .task_creation_queue import TaskCreationQueue, PendingJobsPanel
+    from .message_box_helper import show_warning, show_question
 
 # 配置日志
 logging.basicConfig(
@@ -41,130 +40,6 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def download_cover_image(cover_url: str, save_path: Path) -> bool:
-    """下载封面图片
-    
-    Args:
-        cover_url: 封面图片URL
-        save_path: 保存路径（包含文件名）
-        
-    Returns:
-        bool: 是否下载成功
-    """
-    if not cover_url:
-        return False
-    
-    try:
-        # 处理URL中的多余斜杠
-        # 将URL解析为组件，然后重新组合以去除多余的斜杠
-        parsed = urlparse(cover_url)
-        # 清理path中的多余斜杠
-        clean_path = re.sub(r'/+', '/', parsed.path)
-        # 重新组合URL
-        clean_url = urlunparse((
-            parsed.scheme,
-            parsed.netloc,
-            clean_path,
-            parsed.params,
-            parsed.query,
-            parsed.fragment
-        ))
-        
-        # 使用基本的headers下载图片
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36',
-            'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9',
-        }
-        
-        # 下载图片（跳过SSL证书验证，与视频下载保持一致）
-        response = requests.get(clean_url, headers=headers, timeout=config.API_TIMEOUT, stream=True, verify=False)
-        response.raise_for_status()
-        
-        # 确保目录存在
-        save_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # 保存文件
-        with open(save_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        logger.info(f"封面图片下载成功: {save_path}")
-        return True
-    
-    except Exception as e:
-        logger.error(f"下载封面图片失败: {e}")
-        return False
-
-
-class TaskCreationThread(QThread):
-    """任务创建线程，用于异步获取剧集信息"""
-    
-    finished = pyqtSignal(bool, str, list, str)  # 完成信号: (success, message, episodes, cover_url)
-    
-    def __init__(self, task_data: dict):
-        super().__init__()
-        self.task_data = task_data
-    
-    def run(self):
-        """执行任务创建"""
-        try:
-            source = self.task_data['source']
-            drama_url = self.task_data['drama_url']
-            start_episode = self.task_data['start_episode']
-            end_episode = self.task_data['end_episode']
-            
-            cover_url = None
-            
-            if source == 'shortlinetv':
-                # 获取xtoken和uid（如果提供）
-                xtoken = self.task_data.get('xtoken')
-                uid = self.task_data.get('uid')
-                client = ShortLineTVClient(xtoken=xtoken, uid=uid)
-                video_id = client.extract_video_id(drama_url)
-                if not video_id:
-                    self.finished.emit(False, "无法从URL中提取video_id", [], "")
-                    return
-                
-                api_data = client.get_episodes(video_id)
-                # 传递is_default_range参数
-                is_default_range = self.task_data.get('is_default_range', False)
-                episodes, cover_url = client.parse_episodes(api_data, start_episode, end_episode, is_default_range)
-            
-            elif source == 'reelshort':
-                client = ReelShortClient()
-                slug = client.extract_slug(drama_url)
-                if not slug:
-                    self.finished.emit(False, "无法从URL中提取slug", [], "")
-                    return
-                
-                # 传递drama_url以动态获取buildId
-                api_data = client.get_movie_data(slug, drama_url=drama_url)
-                # 传递is_default_range参数
-                is_default_range = self.task_data.get('is_default_range', False)
-                episodes, cover_url = client.parse_episodes(api_data, slug, start_episode, end_episode, is_default_range)
-            
-            else:
-                self.finished.emit(False, f"未知的来源: {source}", [], "")
-                return
-            
-            if not episodes:
-                self.finished.emit(False, "未找到可下载的剧集", [], "")
-                return
-            
-            # 构建成功消息（只显示剧集数量，封面数量在用户确认创建任务后显示）
-            message = f"成功获取 {len(episodes)} 个剧集"
-            if cover_url:
-                message += "，检测到1个封面"
-            
-            # 只传递封面URL，不下载封面（在用户确认创建任务后再下载）
-            self.finished.emit(True, message, episodes, cover_url or "")
-        
-        except Exception as e:
-            logger.error(f"创建任务时出错: {e}")
-            self.finished.emit(False, f"创建任务失败: {str(e)}", [], "")
-
-
 class MainWindow(QMainWindow):
     """主窗口"""
     
@@ -172,9 +47,13 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.db = Database()
         self.download_manager = None
-        self.task_creation_thread = None
-        self.init_ui()
+        self.follow_syncer = None
+        self.batch_import_dialog = None
         self.init_download_manager()
+        # 新建任务队列（在有限大小的线程池中获取剧集信息和保存任务）
+        self.creation_queue = TaskCreationQueue(self.db, self.download_manager, parent=self)
+        self.creation_queue.task_committed.connect(self.on_task_committed)
+        self.init_ui()
     
     def init_ui(self):
         """初始化UI"""
@@ -251,28 +130,18 @@ class MainWindow(QMainWindow):
         
         self.progress_btn = QPushButton("任务进度")
         self.progress_btn.setCheckable(True)
-        self.progress_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #2196F3;
-                color: white;
-                border: none;
-                padding: 10px 20px;
-                border-radius: 6px;
-                font-size: 17px;
-                font-weight: bold;
-            }
-            QPushButton:checked {
-                background-color: #1976D2;
-            }
-            QPushButton:hover {
-                background-color: #42A5F5;
-            }
-        """)
+        self.progress_btn.setStyleSheet(self.new_task_btn.styleSheet())
         self.progress_btn.clicked.connect(lambda: self.switch_page(1))
         
+        self.dashboard_btn = QPushButton("下载监控")
+        self.dashboard_btn.setCheckable(True)
+        self.dashboard_btn.setStyleSheet(self.new_task_btn.styleSheet())
+        self.dashboard_btn.clicked.connect(lambda: self.switch_page(2))
+        
         button_layout.addStretch()
         button_layout.addWidget(self.new_task_btn)
         button_layout.addWidget(self.progress_btn)
+        button_layout.addWidget(self.dashboard_btn)
         
         main_layout.addLayout(button_layout)
         
@@ -282,14 +151,24 @@ class MainWindow(QMainWindow):
         # 新建任务页面
         self.new_task_widget = NewTaskWidget(db=self.db)
         self.new_task_widget.task_created.connect(self.on_task_created)
+        self.new_task_widget.batch_import_requested.connect(self.open_batch_import)
         self.stacked_widget.addWidget(self.new_task_widget)
         
         # 任务进度页面
         self.progress_widget = TaskProgressWidget(self.db)
+        self.progress_widget.follow_changed.connect(self.on_follow_changed)
         self.stacked_widget.addWidget(self.progress_widget)
         
+        # 下载监控页面
+        self.dashboard_widget = DashboardWidget()
+        self.stacked_widget.addWidget(self.dashboard_widget)
+        
         main_layout.addWidget(self.stacked_widget)
         
+        # 新建任务队列面板（有任务时显示，不阻塞其他操作）
+        self.pending_jobs_panel = PendingJobsPanel(self.creation_queue)
+        main_layout.addWidget(self.pending_jobs_panel)
+        
         central_widget.setLayout(main_layout)
         
         # 设置样式
@@ -305,7 +184,7 @@ class MainWindow(QMainWindow):
         """)
     
     def init_download_manager(self):
-        """初始化下载管理器"""
+        """初始化下载管理器和追更线程"""
         def progress_callback(episode_id, progress, status, error_msg=None):
             """进度回调"""
             # 进度更新会通过数据库刷新自动显示
@@ -317,297 +196,75 @@ class MainWindow(QMainWindow):
             progress_callback=progress_callback
         )
         self.download_manager.start()
+        
+        # 追更线程：新剧集写入数据库后由下载管理器的队列扫描自动下载
+        self.follow_syncer = FollowSyncer(self.db)
+        self.follow_syncer.start()
     
     def switch_page(self, index: int):
         """切换页面"""
         self.stacked_widget.setCurrentIndex(index)
-        if index == 0:
-            self.new_task_btn.setChecked(True)
-            self.progress_btn.setChecked(False)
-        else:
-            self.new_task_btn.setChecked(False)
-            self.progress_btn.setChecked(True)
+        self.new_task_btn.setChecked(index == 0)
+        self.progress_btn.setChecked(index == 1)
+        self.dashboard_btn.setChecked(index == 2)
+    
+    def open_batch_import(self):
+        """打开批量导入对话框（非模态，重复打开时复用同一个对话框）"""
+        if self.batch_import_dialog is None:
+            self.batch_import_dialog = BatchImportDialog(self, db=self.db)
+            self.batch_import_dialog.tasks_created.connect(
+                lambda count: self.progress_widget.refresh_data()
+            )
+        self.batch_import_dialog.show()
+        self.batch_import_dialog.raise_()
+        self.batch_import_dialog.activateWindow()
     
     def on_task_created(self, task_data: dict):
-        """处理任务创建"""
-        # 检查任务名称是否重复
-        if self.db.task_name_exists(task_data['task_name']):
+        """处理任务创建：加入新建任务队列后立即返回，可以继续提交其他任务"""
+        # 检查任务名称是否重复（包括队列中尚未完成的任务）
+        task_name = task_data['task_name']
+        if self.db.task_name_exists(task_name) or task_name in self.creation_queue.pending_task_names():
             reply = show_question(
                 self,
                 "任务名称重复",
-                f"任务名称 '{task_data['task_name']}' 已存在，是否继续创建？",
+                f"任务名称 '{task_name}' 已存在，是否继续创建？",
                 QMessageBox.Yes | QMessageBox.No,
                 QMessageBox.No
             )
             if reply == QMessageBox.No:
                 return
         
-        # 显示加载提示
-        try:
-            from src.ui.message_box_helper import create_message_box
-        except ImportError:
-            from ..ui.message_box_helper import create_message_box
-        loading_msg = create_message_box(
-            self, 
-            "提示", 
-            "正在获取剧集信息，请稍候...",
-            QMessageBox.Information,
-            QMessageBox.NoButton
-        )
-        loading_msg.show()
-        QApplication.processEvents()  # 确保消息框显示
-        
-        # 创建任务创建线程
-        self.task_creation_thread = TaskCreationThread(task_data)
-        self.task_creation_thread.finished.connect(
-            lambda success, msg, episodes, cover_url: self.on_task_creation_finished(
-                success, msg, episodes, cover_url, task_data, loading_msg
-            )
-        )
-        self.task_creation_thread.start()
+        self.creation_queue.submit(task_data)
+        self.statusBar().showMessage(f"已加入新建任务队列: {task_name}", 5000)
     
-    def on_task_creation_finished(self, success: bool, message: str, 
-                                  episodes: list, cover_url: str, task_data: dict, loading_msg=None):
-        """任务创建完成回调"""
-        # 确保关闭加载提示（在所有情况下）
-        try:
-            if loading_msg:
-                loading_msg.close()
-                loading_msg.deleteLater()  # 确保完全释放
-        except Exception as e:
-            logger.debug(f"关闭loading_msg时出错: {e}")
-        
-        if not success:
-            show_critical(self, "错误", message)
-            return
-        
-        # 显示获取到的剧集信息
-        reply = show_question(
-            self,
-            "获取剧集信息成功",
-            f"{message}\n\n是否创建任务并开始下载？",
-            QMessageBox.Yes | QMessageBox.No,
-            QMessageBox.Yes
-        )
-        
-        if reply == QMessageBox.No:
-            return
-        
-        try:
-            # 创建任务记录
-            task_id = self.db.create_task(
-                task_name=task_data['task_name'],
-                source=task_data['source'],
-                drama_name=task_data['drama_name'],
-                drama_url=task_data['drama_url'],
-                start_episode=task_data['start_episode'],
-                end_episode=task_data['end_episode'],
-                storage_path=task_data['storage_path'],
-                xtoken=task_data.get('xtoken'),  # shortlinetv的access-token
-                uid=task_data.get('uid')  # shortlinetv的uid-token
-            )
-            
-            # 添加剧集
-            self.db.add_episodes(task_id, episodes)
-            
-            # 下载封面图片（在用户确认创建任务后）
-            cover_count = 0
-            if cover_url and task_data.get('storage_path'):
-                try:
-                    storage_path = task_data.get('storage_path')
-                    drama_name = task_data.get('drama_name', 'Unknown')
-                    
-                    # 构建保存路径
-                    base_storage_path = Path(storage_path)
-                    # 清理文件夹名中的非法字符和控制字符
-                    safe_drama_name = config.sanitize_filename(drama_name)
-                    
-                    # 创建剧集名称文件夹
-                    drama_storage_path = base_storage_path / safe_drama_name
-                    drama_storage_path.mkdir(parents=True, exist_ok=True)
-                    
-                    # 确定封面文件扩展名
-                    parsed_url = urlparse(cover_url)
-                    path = parsed_url.path
-                    # 尝试从URL中提取扩展名
-                    if '.' in path:
-                        ext = path.split('.')[-1].split('?')[0].lower()
-                        # 验证扩展名是否合理（常见图片格式）
-                        if ext not in ['jpg', 'jpeg', 'png', 'webp', 'gif']:
-                            ext = 'jpg'  # 默认使用jpg
-                    else:
-                        ext = 'jpg'  # 默认使用jpg
-                    
-                    cover_filename = f"cover.{ext}"
-                    cover_save_path = drama_storage_path / cover_filename
-                    
-                    # 下载封面
-                    if download_cover_image(cover_url, cover_save_path):
-                        cover_count = 1
-                        logger.info(f"封面图片下载成功: {cover_save_path}")
-                except Exception as e:
-                    logger.error(f"下载封面时出错: {e}")
-                    # 封面下载失败不影响任务创建
-            
-            # 将剧集添加到下载队列
-            # 使用改进的匹配逻辑，优先使用 episode_num 匹配，URL 作为辅助验证
-            task_episodes = self.db.get_task_episodes(task_id)
-            added_count = 0
-            failed_count = 0
-            failed_episodes = []
-            
-            logger.info(f"开始将 {len(episodes)} 个剧集添加到下载队列（任务ID: {task_id}）")
-            
-            for episode in episodes:
-                episode_num = episode.get('episode_num')
-                episode_url = episode.get('episode_url', '')
-                matched = False
-                matched_ep = None
-                
-                try:
-                    # 优先使用 episode_num 匹配（更可靠）
-                    for ep in task_episodes:
-                        if ep['episode_num'] == episode_num:
-                            # episode_num 匹配，检查 URL（作为辅助验证）
-                            ep_url = ep.get('episode_url', '')
-                            if ep_url == episode_url:
-                                # 完全匹配（episode_num + URL）
-                                matched_ep = ep
-                                matched = True
-                                logger.debug(
-                                    f"剧集匹配成功（完全匹配）: Episode {episode_num}, "
-                                    f"episode_id={ep['id']}, URL匹配"
-                                )
-                                break
-                            elif not matched_ep:
-                                # episode_num 匹配但 URL 不匹配，先记录（作为备选）
-                                matched_ep = ep
-                                logger.warning(
-                                    f"剧集匹配（部分匹配）: Episode {episode_num}, "
-                                    f"episode_id={ep['id']}, URL不匹配 "
-                                    f"(API: {episode_url[:50]}... vs DB: {ep_url[:50]}...)"
-                                )
-                    
-                    # 如果找到了匹配的剧集（即使URL不完全匹配，也使用episode_num匹配的结果）
-                    if matched_ep:
-                        try:
-                            self.download_manager.add_episode(matched_ep['id'])
-                            added_count += 1
-                            if not matched:
-                                # URL不匹配但episode_num匹配，记录警告但继续
-                                logger.warning(
-                                    f"剧集 Episode {episode_num} (episode_id={matched_ep['id']}) "
-                                    f"已添加到队列，但URL不完全匹配"
-                                )
-                            else:
-                                logger.debug(
-                                    f"剧集 Episode {episode_num} (episode_id={matched_ep['id']}) 已添加到队列"
-                                )
-                        except Exception as e:
-                            logger.error(
-                                f"添加剧集 Episode {episode_num} (episode_id={matched_ep['id']}) 到队列时出错: {e}"
-                            )
-                            failed_count += 1
-                            failed_episodes.append({
-                                'episode_num': episode_num,
-                                'episode_name': episode.get('episode_name', f'Episode {episode_num}'),
-                                'reason': f'添加到队列失败: {str(e)}'
-                            })
-                    else:
-                        # 没有找到匹配的剧集
-                        logger.error(
-                            f"未找到匹配的剧集: Episode {episode_num}, "
-                            f"episode_url={episode_url[:50]}..."
-                        )
-                        failed_count += 1
-                        failed_episodes.append({
-                            'episode_num': episode_num,
-                            'episode_name': episode.get('episode_name', f'Episode {episode_num}'),
-                            'reason': '未在数据库中找到匹配的剧集记录'
-                        })
-                
-                except Exception as e:
-                    logger.error(
-                        f"处理剧集 Episode {episode_num} 时发生异常: {e}",
-                        exc_info=True
-                    )
-                    failed_count += 1
-                    failed_episodes.append({
-                        'episode_num': episode_num,
-                        'episode_name': episode.get('episode_name', f'Episode {episode_num}'),
-                        'reason': f'处理异常: {str(e)}'
-                    })
-            
-            # 记录匹配结果
-            logger.info(
-                f"剧集匹配完成: 成功添加 {added_count} 个，失败 {failed_count} 个，"
-                f"总计 {len(episodes)} 个剧集"
-            )
-            
-            # 兜底检查：确保所有数据库中的剧集都被检查
-            if failed_count > 0:
-                logger.warning(f"有 {failed_count} 个剧集未能添加到下载队列:")
-                for failed_ep in failed_episodes:
-                    logger.warning(
-                        f"  - Episode {failed_ep['episode_num']} ({failed_ep['episode_name']}): "
-                        f"{failed_ep['reason']}"
-                    )
-                
-                # 尝试通过 episode_num 直接查找并添加（兜底机制）
-                logger.info("执行兜底检查：尝试通过 episode_num 直接匹配...")
-                for failed_ep in failed_episodes:
-                    episode_num = failed_ep['episode_num']
-                    for ep in task_episodes:
-                        if ep['episode_num'] == episode_num:
-                            try:
-                                # 检查是否已经在队列中
-                                episode_status = ep.get('status', '')
-                                if episode_status in ['pending', 'error']:
-                                    self.download_manager.add_episode(ep['id'])
-                                    logger.info(
-                                        f"兜底检查成功: Episode {episode_num} "
-                                        f"(episode_id={ep['id']}) 已通过兜底机制添加到队列"
-                                    )
-                                    added_count += 1
-                                    failed_count -= 1
-                                    break
-                                else:
-                                    logger.debug(
-                                        f"兜底检查跳过: Episode {episode_num} "
-                                        f"(episode_id={ep['id']}) 状态为 {episode_status}"
-                                    )
-                            except Exception as e:
-                                logger.error(
-                                    f"兜底检查时添加剧集 Episode {episode_num} 失败: {e}"
-                                )
-                            break
-                
-                if failed_count > 0:
-                    logger.error(
-                        f"兜底检查后仍有 {failed_count} 个剧集未能添加到下载队列，"
-                        f"请检查数据库和日志"
-                    )
-            
-            # 显示成功消息（包含封面下载结果）
-            if cover_count > 0:
-                show_information(self, "任务创建成功", f"已创建任务并开始下载，封面已下载")
-            else:
-                show_information(self, "任务创建成功", "已创建任务并开始下载")
-            
-            # 切换到任务进度页面
-            self.switch_page(1)
-        
-        except Exception as e:
-            logger.error(f"保存任务时出错: {e}")
-            show_critical(
-                self,
-                "错误",
-                f"保存任务失败: {str(e)}"
-            )
+    def on_follow_changed(self, task_id: int, follow: bool):
+        """追更管理中开启追更后立即检查一次（set_task_follow已把下次检查时间设为当前）"""
+        if follow and self.follow_syncer:
+            self.follow_syncer.sync_now()
+    
+    def on_task_committed(self, task_id: int, message: str):
+        """队列中的任务创建成功"""
+        self.statusBar().showMessage(message, 5000)
+        self.progress_widget.refresh_data()
     
     def closeEvent(self, event):
         """窗口关闭事件"""
         if self.download_manager:
             self.download_manager.stop()
+        if self.follow_syncer:
+            self.follow_syncer.stop()
+        self.creation_queue.shutdown()
+        # 异步HTTP运行时（aiohttp）同样在第一次使用时才导入；导入过时关闭共享会话和事件循环线程
+        async_api_clients = sys.modules.get('src.async_api_clients')
+        if async_api_clients is not None:
+            async_api_clients.get_runtime().close()
+        # HTTP会话（requests）在第一次请求时才导入，没有导入过说明没有发出请求，不必为了统计再导入
+        http_session = sys.modules.get('src.http_session')
+        if http_session is not None:
+            stats = http_session.get_connection_stats()
+            logger.info(
+                f"HTTP连接统计: 请求 {stats['requests']} 次，新建连接 {stats['connections']} 个，"
+                f"复用连接 {stats['reused']} 次"
+            )
         event.accept()
 
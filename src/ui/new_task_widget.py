@@ -4,16 +4,19 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QLineEdit, QComboBox, QPushButton, QFileDialog,
                              QMessageBox, QSpinBox, QProxyStyle, QStyleOption, QStyle, QApplication,
-                             QStyleOptionComboBox, QStyleOptionSpinBox, QStylePainter, QSizePolicy)
+                             QStyleOptionComboBox, QStyleOptionSpinBox, QStylePainter, QSizePolicy,
+                             QCheckBox)
 from PyQt5.QtCore import Qt, pyqtSignal, QRect, QSize, QPoint
 from PyQt5.QtGui import QFont, QPainter, QPolygon, QPen, QBrush, QColor
 from pathlib import Path
 # 使用绝对导入，兼容打包后的exe
 try:
     from src.config import config
+    from src.models import OPEN_END_EPISODE
     from src.ui.message_box_helper import show_warning, show_critical
 except ImportError:
     from ..config import config
+    from ..models import OPEN_END_EPISODE
     from ..ui.message_box_helper import show_warning, show_critical
 
 
@@ -106,6 +109,7 @@ class NewTaskWidget(QWidget):
     """新建任务界面"""
     
     task_created = pyqtSignal(dict)  # 任务创建信号
+    batch_import_requested = pyqtSignal()  # 批量导入信号
     
     def __init__(self, parent=None, db=None):
         super().__init__(parent)
@@ -448,6 +452,14 @@ class NewTaskWidget(QWidget):
         # 移除自动同步逻辑，让左右独立
         episode_range_layout.addWidget(self.end_episode_spin)
         
+        # 追更：定期检查新剧集并自动下载，结束剧集号不限
+        self.follow_checkbox = QCheckBox("追更")
+        self.follow_checkbox.setFont(range_label_font)
+        self.follow_checkbox.setToolTip("定期检查新剧集并自动下载（从开始剧集号起，不限结束剧集号）")
+        self.follow_checkbox.toggled.connect(lambda checked: self.end_episode_spin.setEnabled(not checked))
+        episode_range_layout.addSpacing(20)
+        episode_range_layout.addWidget(self.follow_checkbox)
+        
         # 提示语已注释掉，不再显示
         # tip_label = QLabel("(0-0表示下载所有剧集，手动选择0-0表示只下载第0集)")
         # tip_font = QFont()
@@ -507,6 +519,28 @@ class NewTaskWidget(QWidget):
         # 按钮
         button_layout = QHBoxLayout()
         button_layout.addStretch()
+        self.batch_import_btn = QPushButton("批量导入")
+        self.batch_import_btn.setFont(input_font)
+        self.batch_import_btn.setFixedHeight(50)
+        self.batch_import_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #2196F3;
+                color: white;
+                border: none;
+                padding: 12px 24px;
+                border-radius: 8px;
+                font-weight: bold;
+                font-size: 17px;
+            }
+            QPushButton:hover {
+                background-color: #1976D2;
+            }
+            QPushButton:pressed {
+                background-color: #1565C0;
+            }
+        """)
+        self.batch_import_btn.clicked.connect(self.batch_import_requested.emit)
+        button_layout.addWidget(self.batch_import_btn)
         self.create_btn = QPushButton("创建任务")
         self.create_btn.setFont(input_font)
         # 不设置固定宽度，让按钮根据内容自动调整，与其他按钮一致
@@ -663,7 +697,7 @@ class NewTaskWidget(QWidget):
         # 验证剧集区间
         start_ep = self.start_episode_spin.value()
         end_ep = self.end_episode_spin.value()
-        if end_ep > 0 and end_ep < start_ep:
+        if not self.follow_checkbox.isChecked() and end_ep > 0 and end_ep < start_ep:
             show_warning(
                 self, 
                 "输入错误", 
@@ -690,6 +724,12 @@ class NewTaskWidget(QWidget):
                            start_ep == self.start_episode_default and 
                            end_ep == self.end_episode_default)
         
+        # 追更任务从开始剧集号起不限结束剧集号（shortlinetv用0表示不限，reelshort按闭区间过滤）
+        follow = self.follow_checkbox.isChecked()
+        if follow:
+            end_ep = 0 if source == "shortlinetv" else OPEN_END_EPISODE
+            is_default_range = False
+        
         # 保存存储路径到数据库（用于下次默认填充）
         if self.db:
             self.db.set_setting('last_storage_path', str(storage_path.absolute()))
@@ -705,7 +745,8 @@ class NewTaskWidget(QWidget):
             "storage_path": str(storage_path.absolute()),
             "is_default_range": is_default_range,  # 传递是否是默认值
             "xtoken": xtoken,  # shortlinetv的access-token
-            "uid": uid  # shortlinetv的uid-token
+            "uid": uid,  # shortlinetv的uid-token
+            "follow": follow  # 是否追更
         }
         
         # 发送信号（不再在这里显示成功消息，由主窗口统一处理）
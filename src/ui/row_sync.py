@@ -0,0 +1,162 @@
+"""
+列表模型的增量更新：按主键比较新旧行，只发出必要的增删行和dataChanged信号
+
+不依赖Qt：model只需提供beginInsertRows/endInsertRows、beginRemoveRows/endRemoveRows、index()和dataChanged，
+parent原样传给这些方法（QModelIndex）
+"""
+from typing import Callable, Dict, Iterable, List, Sequence, Set, Tuple
+# 使用绝对导入，兼容打包后的exe
+try:
+    from src.models import Episode
+except ImportError:
+    from ..models import Episode
+
+
+def _contiguous_ranges(rows: List[int]) -> List[Tuple[int, int]]:
+    """把升序的行号列表合并为连续区间[(first, last), ...]"""
+    ranges = []
+    for row in rows:
+        if ranges and ranges[-1][1] == row - 1:
+            ranges[-1] = (ranges[-1][0], row)
+        else:
+            ranges.append((row, row))
+    return ranges
+
+
+def remove_rows(model, parent, items: list, signatures: list, rows: List[int]):
+    """删除parent下的指定行（升序行号；从后往前按连续区间删除，行号不受影响）"""
+    for first, last in reversed(_contiguous_ranges(rows)):
+        model.beginRemoveRows(parent, first, last)
+        del items[first:last + 1]
+        del signatures[first:last + 1]
+        model.endRemoveRows()
+
+
+def insert_rows(model, parent, items: list, signatures: list,
+                row: int, new_items: Sequence, signature: Callable[[object], Tuple]):
+    """在parent下的row处插入一段连续的行"""
+    if not new_items:
+        return
+    model.beginInsertRows(parent, row, row + len(new_items) - 1)
+    items[row:row] = new_items
+    signatures[row:row] = [signature(item) for item in new_items]
+    model.endInsertRows()
+
+
+def sync_rows(model, parent, items: list, signatures: list, new_items: Sequence,
+              key: Callable[[object], object], signature: Callable[[object], Tuple], last_column: int):
+    """把parent下的行（items及其签名signatures，原地修改）更新为new_items
+    
+    先删除消失的行，再在对应位置插入新行；剩余行顺序不变时只对内容变化的行发出dataChanged，
+    顺序发生变化时删除全部行后重新插入
+    """
+    new_keys = [key(item) for item in new_items]
+    new_key_set = set(new_keys)
+    remove_rows(model, parent, items, signatures,
+                [row for row, item in enumerate(items) if key(item) not in new_key_set])
+    
+    # 剩余行的相对顺序与新列表不一致时全部重建
+    old_keys = [key(item) for item in items]
+    old_key_set = set(old_keys)
+    if old_keys != [item_key for item_key in new_keys if item_key in old_key_set]:
+        remove_rows(model, parent, items, signatures, list(range(len(items))))
+        insert_rows(model, parent, items, signatures, 0, list(new_items), signature)
+        return
+    
+    # 插入新行（按新列表中的位置从前往后插入）
+    inserted_rows = [row for row, item_key in enumerate(new_keys) if item_key not in old_key_set]
+    for first, last in _contiguous_ranges(inserted_rows):
+        insert_rows(model, parent, items, signatures, first, list(new_items[first:last + 1]), signature)
+    
+    # 内容变化的行发出dataChanged（连续的行合并为一个区间）
+    inserted = set(inserted_rows)
+    changed_rows = []
+    for row, item in enumerate(new_items):
+        item_signature = signature(item)
+        items[row] = item
+        if row not in inserted and item_signature != signatures[row]:
+            signatures[row] = item_signature
+            changed_rows.append(row)
+    for first, last in _contiguous_ranges(changed_rows):
+        model.dataChanged.emit(model.index(first, 0, parent), model.index(last, last_column, parent))
+
+
+class RowIndex:
+    """主键到行号的索引，随增删行更新
+    
+    保存的是行号加基准值：在顶部插入或删除顶部的行只调整基准值，在末尾追加只登记新行，
+    其余位置的增删才重新登记受影响的行
+    """
+    
+    def __init__(self, key: Callable[[object], object]):
+        self.key = key
+        self._positions: Dict[object, int] = {}
+        self._base = 0
+    
+    def row_of(self, item_key) -> int:
+        """item_key所在的行号，不存在时返回-1"""
+        position = self._positions.get(item_key)
+        return -1 if position is None else position - self._base
+    
+    def inserted(self, items: list, row: int, count: int):
+        """items的row处插入了count行之后调用"""
+        if row == 0:
+            self._base -= count
+            self._register(items, 0, count)
+        else:
+            self._register(items, row, len(items))
+    
+    def removed(self, items: list, rows: List[int], keys: Iterable):
+        """items中删除了rows（升序行号，对应的主键为keys）之后调用"""
+        for item_key in keys:
+            self._positions.pop(item_key, None)
+        if not rows:
+            return
+        if rows[-1] == len(rows) - 1:
+            # 只删除了顶部的行：其余行的行号统一减少
+            self._base += len(rows)
+        else:
+            self._register(items, rows[0], len(items))
+    
+    def _register(self, items: list, first: int, end: int):
+        for row in range(first, end):
+            self._positions[self.key(items[row])] = row + self._base
+
+
+# ---------- 已完成列表（按完成时间倒序、分页加载） ----------
+
+def history_key(episode: Episode) -> Tuple[str, int]:
+    """已完成剧集的排序键(updated_at, id)，与Database.get_completed_episodes_page的分页条件一致"""
+    return (episode.updated_at or '', episode.id)
+
+
+def history_page_rows(loaded: Sequence[Episode], episodes: Sequence[Episode]) -> List[Episode]:
+    """一页较早完成的剧集中可以追加到已加载行末尾的部分（去掉已加载的和不早于最后一行的）"""
+    bottom = history_key(loaded[-1]) if loaded else None
+    loaded_ids = {episode.id for episode in loaded}
+    return [episode for episode in episodes
+            if episode.id not in loaded_ids and (bottom is None or history_key(episode) < bottom)]
+
+
+def history_stale_rows(row_of: Callable[[int], int], changed_ids: Iterable[int]) -> List[int]:
+    """刷新后需要删除的已加载行号（升序）：changed_ids中已加载的剧集
+    
+    changed_ids为重新完成的剧集（排序键变了，会作为新剧集插入顶部）和已移出完成状态的剧集；
+    row_of返回剧集ID所在的行号（未加载时为-1），只按变化的剧集查找，不扫描已加载的行
+    """
+    return sorted(row for row in map(row_of, set(changed_ids)) if row >= 0)
+
+
+def history_missing_rows(loaded: Sequence[Episode], live_ids: Set[int],
+                         floor: Tuple[str, int]) -> List[int]:
+    """检查范围内（排序键不早于floor）已不存在的已加载行号（升序），用于无法得知变化时的全量检查"""
+    return [
+        row for row, episode in enumerate(loaded)
+        if history_key(episode) >= floor and episode.id not in live_ids
+    ]
+
+
+def history_new_rows(loaded: Sequence[Episode], new_episodes: Sequence[Episode]) -> List[Episode]:
+    """新完成的剧集中应插入顶部的部分（排在已加载的第一行之前）"""
+    top = history_key(loaded[0]) if loaded else None
+    return [episode for episode in new_episodes if top is None or history_key(episode) > top]
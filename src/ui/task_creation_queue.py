@@ -0,0 +1,452 @@
+"""
+新建任务队列：多个任务在有限大小的线程池中并发获取剧集信息和保存，待处理任务显示在非模态面板中
+"""
+import itertools
+import logging
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QCheckBox, QTableWidget, QTableWidgetItem, QHeaderView)
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QColor
+# 使用绝对导入，兼容打包后的exe
+try:
+    from src.config import config
+    from src.database import Database
+except ImportError:
+    from ..config import config
+    from ..database import Database
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+STATE_QUEUED = 'queued'        # 排队等待获取剧集信息
+STATE_RESOLVING = 'resolving'  # 正在获取剧集信息
+STATE_RESOLVED = 'resolved'    # 已获取剧集信息，等待确认
+STATE_SAVING = 'saving'        # 正在保存任务
+STATE_DONE = 'done'            # 已创建
+STATE_FAILED = 'failed'        # 失败
+STATE_DISCARDED = 'discarded'  # 已放弃
+
+# 已结束的状态（可以从面板中清除）
+FINISHED_STATES = (STATE_DONE, STATE_FAILED, STATE_DISCARDED)
+
+STATE_TEXTS = {
+    STATE_QUEUED: "排队中",
+    STATE_RESOLVING: "正在获取剧集信息",
+    STATE_RESOLVED: "待确认",
+    STATE_SAVING: "正在保存",
+    STATE_DONE: "已创建",
+    STATE_FAILED: "失败",
+    STATE_DISCARDED: "已放弃",
+}
+
+STATE_COLORS = {
+    STATE_RESOLVED: QColor(255, 152, 0),
+    STATE_DONE: QColor(76, 175, 80),
+    STATE_FAILED: QColor(244, 67, 54),
+    STATE_DISCARDED: QColor(158, 158, 158),
+}
+
+
+class TaskJobSignals(QObject):
+    """任务线程的信号（QRunnable不是QObject，信号需要单独的对象承载）"""
+    
+    started = pyqtSignal()  # 开始执行（离开线程池的等待队列）
+    resolved = pyqtSignal(bool, str, list, str)  # 获取剧集信息完成: (success, message, episodes, cover_url)
+    progress = pyqtSignal(str, int, int)  # 保存进度: (阶段说明, 已完成数, 总数)
+    committed = pyqtSignal(int, int, int, bool)  # 保存完成: (task_id, 加入队列的剧集数, 失败数, 封面是否下载成功)
+    failed = pyqtSignal(str)  # 保存失败: 错误信息
+
+
+class TaskResolveJob(QRunnable):
+    """获取剧集信息"""
+    
+    def __init__(self, task_data: dict, db: Database = None):
+        super().__init__()
+        self.task_data = task_data
+        self.db = db
+        self.signals = TaskJobSignals()
+    
+    def run(self):
+        """执行剧集信息获取"""
+        self.signals.started.emit()
+        try:
+            # API客户端（及requests、aiohttp等HTTP库）在第一次创建任务时才导入，不拖慢程序启动
+            try:
+                from src.api_clients import ShortLineTVClient, ReelShortClient
+                from src.async_api_clients import resolve_reelshort_streams
+            except ImportError:
+                from ..api_clients import ShortLineTVClient, ReelShortClient
+                from ..async_api_clients import resolve_reelshort_streams
+            
+            source = self.task_data['source']
+            drama_url = self.task_data['drama_url']
+            start_episode = self.task_data['start_episode']
+            end_episode = self.task_data['end_episode']
+            is_default_range = self.task_data.get('is_default_range', False)
+            
+            if source == 'shortlinetv':
+                client = ShortLineTVClient(xtoken=self.task_data.get('xtoken'),
+                                           uid=self.task_data.get('uid'), db=self.db)
+                video_id = client.extract_video_id(drama_url)
+                if not video_id:
+                    self.signals.resolved.emit(False, "无法从URL中提取video_id", [], "")
+                    return
+                api_data = client.get_episodes(video_id)
+                episodes, cover_url = client.parse_episodes(api_data, start_episode, end_episode, is_default_range)
+            
+            elif source == 'reelshort':
+                client = ReelShortClient(db=self.db)
+                slug = client.extract_slug(drama_url)
+                if not slug:
+                    self.signals.resolved.emit(False, "无法从URL中提取slug", [], "")
+                    return
+                # 传递drama_url以动态获取buildId
+                api_data = client.get_movie_data(slug, drama_url=drama_url)
+                episodes, cover_url = client.parse_episodes(api_data, slug, start_episode, end_episode, is_default_range)
+                # 并发解析各集的流地址，下载时直接使用m3u8
+                resolve_reelshort_streams(api_data, episodes, drama_url, db=self.db)
+            
+            else:
+                self.signals.resolved.emit(False, f"未知的来源: {source}", [], "")
+                return
+            
+            if not episodes:
+                self.signals.resolved.emit(False, "未找到可下载的剧集", [], "")
+                return
+            
+            message = f"{len(episodes)} 个剧集"
+            if cover_url:
+                message += "，1个封面"
+            self.signals.resolved.emit(True, message, episodes, cover_url or "")
+        
+        except Exception as e:
+            logger.error(f"获取剧集信息时出错: {e}")
+            self.signals.resolved.emit(False, f"获取剧集信息失败: {str(e)}", [], "")
+
+
+class TaskCommitJob(QRunnable):
+    """保存已确认的任务：写入任务和剧集、加入下载队列、下载封面
+    
+    这些操作（尤其是封面下载）可能阻塞数秒，放在主线程执行会冻结界面
+    """
+    
+    # 每加入多少个剧集报告一次进度（避免信号过多）
+    PROGRESS_STEP = 20
+    
+    def __init__(self, task_data: dict, episodes: list, cover_url: str, db: Database, download_manager):
+        super().__init__()
+        self.task_data = task_data
+        self.episodes = episodes
+        self.cover_url = cover_url
+        self.db = db
+        self.download_manager = download_manager
+        self.signals = TaskJobSignals()
+    
+    def run(self):
+        """执行任务保存"""
+        try:
+            total = len(self.episodes)
+            self.signals.progress.emit("正在保存任务", 0, total)
+            
+            # 任务和剧集在同一个事务中写入
+            task_id = self.db.create_tasks_with_episodes([(self.task_data, self.episodes)])[0]
+            
+            added_count, failed_count = self._enqueue_episodes(task_id)
+            
+            # 下载封面图片（在用户确认创建任务后），失败不影响任务创建
+            cover_ok = False
+            if self.cover_url:
+                try:
+                    from src.cover_downloader import download_drama_cover
+                except ImportError:
+                    from ..cover_downloader import download_drama_cover
+                self.signals.progress.emit("正在下载封面", 0, 0)
+                cover_ok = download_drama_cover(self.cover_url, self.task_data.get('storage_path'),
+                                                self.task_data.get('drama_name', 'Unknown')) is not None
+            
+            self.signals.committed.emit(task_id, added_count, failed_count, cover_ok)
+        
+        except Exception as e:
+            logger.error(f"保存任务时出错: {e}")
+            self.signals.failed.emit(str(e))
+    
+    def _enqueue_episodes(self, task_id: int):
+        """将新任务的剧集加入下载队列，返回(加入数, 失败数)
+        
+        按episode_num建立索引后逐个匹配（episode_num在任务内唯一），URL只用于记录不一致的警告；
+        未能加入的剧集保持pending状态，由下载管理器的队列扫描兜底
+        """
+        total = len(self.episodes)
+        task_episodes = {ep.episode_num: ep for ep in self.db.get_task_episodes(task_id)}
+        added_count = 0
+        failed_count = 0
+        
+        logger.info(f"开始将 {total} 个剧集添加到下载队列（任务ID: {task_id}）")
+        
+        for index, episode in enumerate(self.episodes, start=1):
+            episode_num = episode.get('episode_num')
+            matched_ep = task_episodes.get(episode_num)
+            if matched_ep is None:
+                logger.error(f"未找到匹配的剧集: Episode {episode_num}")
+                failed_count += 1
+                continue
+            
+            episode_url = episode.get('episode_url', '')
+            if (matched_ep.episode_url or '') != episode_url:
+                logger.warning(
+                    f"剧集匹配（部分匹配）: Episode {episode_num}, episode_id={matched_ep.id}, URL不匹配 "
+                    f"(API: {episode_url[:50]}... vs DB: {(matched_ep.episode_url or '')[:50]}...)"
+                )
+            
+            try:
+                self.download_manager.add_episode(matched_ep.id)
+                added_count += 1
+            except Exception as e:
+                logger.error(f"添加剧集 Episode {episode_num} (episode_id={matched_ep.id}) 到队列时出错: {e}")
+                failed_count += 1
+            
+            if index % self.PROGRESS_STEP == 0 or index == total:
+                self.signals.progress.emit("正在加入下载队列", index, total)
+        
+        logger.info(f"剧集匹配完成: 成功添加 {added_count} 个，失败 {failed_count} 个，总计 {total} 个剧集")
+        return added_count, failed_count
+
+
+class CreationJob:
+    """队列中的一个新建任务"""
+    
+    __slots__ = ('id', 'task_data', 'state', 'message', 'episodes', 'cover_url', 'runnable')
+    
+    def __init__(self, job_id: int, task_data: dict):
+        self.id = job_id
+        self.task_data = task_data
+        self.state = STATE_QUEUED
+        self.message = ''
+        self.episodes = []
+        self.cover_url = ''
+        self.runnable = None  # 正在执行的QRunnable（保持引用直到信号处理完）
+
+
+class TaskCreationQueue(QObject):
+    """新建任务队列
+    
+    每个提交的任务先在线程池中获取剧集信息，得到结果后等待确认（或自动创建），
+    确认后在同一个线程池中保存。线程池大小由TASK_CREATION_MAX_PARALLEL限制，多余的任务排队等待。
+    """
+    
+    job_changed = pyqtSignal(int)  # 任务状态变化: job_id
+    task_committed = pyqtSignal(int, str)  # 任务创建成功: (task_id, 说明)
+    
+    def __init__(self, db: Database, download_manager=None, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.download_manager = download_manager
+        self.auto_commit = False  # 获取剧集信息后是否不经确认直接创建
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(config.TASK_CREATION_MAX_PARALLEL)
+    
+    def submit(self, task_data: dict) -> int:
+        """提交新建任务，返回队列中的任务ID"""
+        job = CreationJob(next(self._ids), task_data)
+        self.jobs[job.id] = job
+        
+        runnable = TaskResolveJob(task_data, db=self.db)
+        runnable.signals.resolved.connect(
+            lambda success, message, episodes, cover_url: self._on_resolved(
+                job, success, message, episodes, cover_url
+            )
+        )
+        runnable.signals.started.connect(lambda: self._set_state(job, STATE_RESOLVING))
+        job.runnable = runnable
+        self.job_changed.emit(job.id)
+        self.pool.start(runnable)
+        logger.info(f"新建任务已加入队列: {task_data['task_name']}")
+        return job.id
+    
+    def pending_task_names(self) -> set:
+        """队列中尚未结束的任务名称（用于检查重名）"""
+        return {job.task_data['task_name'] for job in self.jobs.values() if job.state not in FINISHED_STATES}
+    
+    def active_count(self) -> int:
+        """尚未结束的任务数"""
+        return sum(1 for job in self.jobs.values() if job.state not in FINISHED_STATES)
+    
+    def confirm(self, job_id: int):
+        """确认创建已获取剧集信息的任务"""
+        job = self.jobs.get(job_id)
+        if job is None or job.state != STATE_RESOLVED:
+            return
+        
+        runnable = TaskCommitJob(job.task_data, job.episodes, job.cover_url, self.db, self.download_manager)
+        runnable.signals.progress.connect(
+            lambda message, done, total: self._set_state(
+                job, STATE_SAVING, f"{message} ({done}/{total})" if total > 0 else message
+            )
+        )
+        runnable.signals.committed.connect(
+            lambda task_id, added_count, failed_count, cover_ok: self._on_committed(
+                job, task_id, added_count, failed_count, cover_ok
+            )
+        )
+        runnable.signals.failed.connect(lambda message: self._finish(job, STATE_FAILED, f"保存任务失败: {message}"))
+        job.runnable = runnable
+        self._set_state(job, STATE_SAVING, "正在保存任务")
+        # 保存优先于排队中的获取任务
+        self.pool.start(runnable, 1)
+    
+    def discard(self, job_id: int):
+        """放弃已获取剧集信息的任务"""
+        job = self.jobs.get(job_id)
+        if job is not None and job.state == STATE_RESOLVED:
+            self._finish(job, STATE_DISCARDED, "")
+    
+    def clear_finished(self):
+        """从队列中移除已结束的任务"""
+        for job_id in [job.id for job in self.jobs.values() if job.state in FINISHED_STATES]:
+            del self.jobs[job_id]
+            self.job_changed.emit(job_id)
+    
+    def shutdown(self):
+        """退出前丢弃线程池中尚未开始的任务（已开始的任务会在线程池销毁时等待完成）"""
+        self.pool.clear()
+    
+    def _set_state(self, job: CreationJob, state: str, message: str = None):
+        job.state = state
+        if message is not None:
+            job.message = message
+        self.job_changed.emit(job.id)
+    
+    def _finish(self, job: CreationJob, state: str, message: str):
+        job.runnable = None
+        job.episodes = []
+        self._set_state(job, state, message)
+    
+    def _on_resolved(self, job: CreationJob, success: bool, message: str, episodes: list, cover_url: str):
+        job.runnable = None
+        if not success:
+            self._finish(job, STATE_FAILED, message)
+            return
+        job.episodes = episodes
+        job.cover_url = cover_url
+        self._set_state(job, STATE_RESOLVED, message)
+        if self.auto_commit:
+            self.confirm(job.id)
+    
+    def _on_committed(self, job: CreationJob, task_id: int, added_count: int, failed_count: int, cover_ok: bool):
+        message = f"{added_count} 个剧集已加入下载队列"
+        if failed_count > 0:
+            message += f"，{failed_count} 个稍后由队列扫描重试"
+        if cover_ok:
+            message += "，封面已下载"
+        self._finish(job, STATE_DONE, message)
+        self.task_committed.emit(task_id, f"任务 {job.task_data['task_name']} 已创建，{message}")
+
+
+class PendingJobsPanel(QWidget):
+    """待处理任务面板（非模态）：列出队列中的新建任务，已获取剧集信息的任务在这里确认或放弃"""
+    
+    COLUMN_NAME, COLUMN_SOURCE, COLUMN_STATE, COLUMN_ACTIONS = range(4)
+    
+    def __init__(self, creation_queue: TaskCreationQueue, parent=None):
+        super().__init__(parent)
+        self.creation_queue = creation_queue
+        self.rows = {}  # job_id -> 行号
+        self.init_ui()
+        self.creation_queue.job_changed.connect(self.on_job_changed)
+        self.setVisible(False)
+    
+    def init_ui(self):
+        """初始化UI"""
+        layout = QVBoxLayout()
+        layout.setContentsMargins(50, 5, 50, 10)
+        layout.setSpacing(5)
+        
+        header_layout = QHBoxLayout()
+        self.title_label = QLabel("新建任务队列")
+        self.title_label.setStyleSheet("font-size: 15px; font-weight: bold;")
+        header_layout.addWidget(self.title_label)
+        header_layout.addStretch()
+        self.auto_commit_checkbox = QCheckBox("获取后自动创建")
+        self.auto_commit_checkbox.toggled.connect(self.on_auto_commit_toggled)
+        header_layout.addWidget(self.auto_commit_checkbox)
+        clear_btn = QPushButton("清除已结束")
+        clear_btn.clicked.connect(self.creation_queue.clear_finished)
+        header_layout.addWidget(clear_btn)
+        layout.addLayout(header_layout)
+        
+        self.table = QTableWidget()
+        self.table.setColumnCount(4)
+        self.table.setHorizontalHeaderLabels(["任务名称", "来源", "状态", "操作"])
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(self.COLUMN_NAME, QHeaderView.Stretch)
+        header.setSectionResizeMode(self.COLUMN_SOURCE, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(self.COLUMN_STATE, QHeaderView.Stretch)
+        header.setSectionResizeMode(self.COLUMN_ACTIONS, QHeaderView.ResizeToContents)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionMode(QTableWidget.NoSelection)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setMaximumHeight(200)
+        layout.addWidget(self.table)
+        
+        self.setLayout(layout)
+    
+    def on_auto_commit_toggled(self, checked: bool):
+        """切换自动创建（打开时立即创建所有待确认的任务）"""
+        self.creation_queue.auto_commit = checked
+        if checked:
+            for job in list(self.creation_queue.jobs.values()):
+                if job.state == STATE_RESOLVED:
+                    self.creation_queue.confirm(job.id)
+    
+    def on_job_changed(self, job_id: int):
+        """队列中的任务变化：只更新对应的行（任务被清除时重建表格）"""
+        job = self.creation_queue.jobs.get(job_id)
+        if job is None or job_id not in self.rows:
+            self.rebuild()
+            return
+        self.update_row(self.rows[job_id], job)
+        self.update_title()
+    
+    def rebuild(self):
+        """按队列内容重建表格"""
+        jobs = list(self.creation_queue.jobs.values())
+        self.rows = {job.id: row for row, job in enumerate(jobs)}
+        self.table.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            self.table.setItem(row, self.COLUMN_NAME, QTableWidgetItem(job.task_data['task_name']))
+            self.table.setItem(row, self.COLUMN_SOURCE, QTableWidgetItem(job.task_data['source']))
+            self.update_row(row, job)
+        self.update_title()
+        self.setVisible(bool(jobs))
+    
+    def update_title(self):
+        active_count = self.creation_queue.active_count()
+        self.title_label.setText(f"新建任务队列（进行中 {active_count} 个）" if active_count else "新建任务队列")
+    
+    def update_row(self, row: int, job: CreationJob):
+        """更新一行的状态和操作按钮"""
+        text = STATE_TEXTS.get(job.state, job.state)
+        if job.message:
+            text = f"{text}：{job.message}"
+        item = QTableWidgetItem(text)
+        item.setToolTip(text)
+        if job.state in STATE_COLORS:
+            item.setForeground(STATE_COLORS[job.state])
+        self.table.setItem(row, self.COLUMN_STATE, item)
+        
+        if job.state == STATE_RESOLVED:
+            actions = QWidget()
+            actions_layout = QHBoxLayout()
+            actions_layout.setContentsMargins(2, 0, 2, 0)
+            confirm_btn = QPushButton("创建")
+            confirm_btn.clicked.connect(lambda: self.creation_queue.confirm(job.id))
+            discard_btn = QPushButton("放弃")
+            discard_btn.clicked.connect(lambda: self.creation_queue.discard(job.id))
+            actions_layout.addWidget(confirm_btn)
+            actions_layout.addWidget(discard_btn)
+            actions.setLayout(actions_layout)
+            self.table.setCellWidget(row, self.COLUMN_ACTIONS, actions)
+        elif self.table.cellWidget(row, self.COLUMN_ACTIONS) is not None:
+            self.table.removeCellWidget(row, self.COLUMN_ACTIONS)
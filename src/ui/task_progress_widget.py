@@ -1,24 +1,32 @@
 """
 任务进度界面
 """
-import os
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                             QPushButton, QTableWidget, QTableWidgetItem,
-                             QCheckBox, QHeaderView, QMessageBox, QTabWidget)
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal
-from PyQt5.QtGui import QColor, QFont
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
+                             QPushButton, QTableView, QTreeView, QHeaderView, QMessageBox, QTabWidget,
+                             QProgressDialog)
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from PyQt5.QtGui import QFont
 # 使用绝对导入，兼容打包后的exe
 try:
     from src.database import Database
     from src.config import config
-    from src.ui.message_box_helper import show_information, show_critical, show_question
+    from src.ui.message_box_helper import show_information, show_warning, show_critical, show_question
+    from src.ui.episode_table_model import EpisodeColumn, CompletedHistoryModel, ProgressBarDelegate
+    from src.ui.task_tree_model import TaskTreeModel, PROGRESS_COLUMN
+    from src.ui.follow_tasks_dialog import FollowTasksDialog
 except ImportError:
     from ..database import Database
     from ..config import config
-    from ..ui.message_box_helper import show_information, show_critical, show_question
+    from ..ui.message_box_helper import show_information, show_warning, show_critical, show_question
+    from ..ui.episode_table_model import EpisodeColumn, CompletedHistoryModel, ProgressBarDelegate
+    from ..ui.task_tree_model import TaskTreeModel, PROGRESS_COLUMN
+    from ..ui.follow_tasks_dialog import FollowTasksDialog
 
 logger = logging.getLogger(__name__)
 
@@ -69,14 +77,264 @@ def utc_to_beijing_time(utc_time_str: str) -> str:
         return utc_time_str
 
 
+# 已完成列表的列
+COMPLETED_COLUMNS = [
+    EpisodeColumn("任务名称", lambda e: e.task_name or ''),
+    EpisodeColumn("剧集网址", lambda e: e.episode_url or '', tooltip=True),
+    EpisodeColumn("剧集名称", lambda e: e.episode_name or '', tooltip=True),
+    EpisodeColumn("存储路径", lambda e: e.storage_path or e.task_storage_path or ''),
+    EpisodeColumn("完成时间", lambda e: utc_to_beijing_time(e.updated_at or '')),
+]
+
+
+class ProgressSnapshot:
+    """一次刷新读取到的数据（只读快照，在后台线程中生成后整体交给界面线程）
+    
+    只读取当前显示的标签页，另一个列表对应的字段为None。
+    下载中为进行中任务的统计（task_stats）和已展开任务的剧集；已完成列表只包含增量：completed_new为新完成的剧集，
+    completed_removed为移出日志中completed_removal_seq之前新增的剧集ID；
+    日志无法覆盖上次刷新以来的变化时completed_removed为None，改由completed_live_ids给出
+    已加载范围（排序键不早于completed_floor）内仍然存在的剧集ID
+    """
+    
+    __slots__ = ('version', 'task_stats', 'task_episodes', 'completed_new', 'completed_removal_seq',
+                 'completed_removed', 'completed_live_ids', 'completed_floor')
+    
+    def __init__(self, version: int, task_stats: Optional[tuple], task_episodes: Optional[Dict[int, tuple]],
+                 completed_new: Optional[tuple], completed_removal_seq: Optional[int],
+                 completed_removed: Optional[frozenset], completed_live_ids: Optional[frozenset],
+                 completed_floor: Optional[Tuple[str, int]]):
+        self.version = version
+        self.task_stats = task_stats
+        self.task_episodes = task_episodes
+        self.completed_new = completed_new
+        self.completed_removal_seq = completed_removal_seq
+        self.completed_removed = completed_removed
+        self.completed_live_ids = completed_live_ids
+        self.completed_floor = completed_floor
+
+
+class SnapshotSignals(QObject):
+    """快照读取线程的信号"""
+    
+    loaded = pyqtSignal(object)  # 读取完成: ProgressSnapshot、(task_id, 剧集元组)或(before, 剧集元组)
+    failed = pyqtSignal(str)  # 读取失败: 错误信息
+
+
+class ProgressSnapshotJob(QRunnable):
+    """在后台线程中读取下载中剧集和已完成列表的变化，避免数据库被下载线程的写入锁住时卡住界面"""
+    
+    def __init__(self, db: Database, include_downloading: bool, include_completed: bool,
+                 expanded_task_ids: Tuple[int, ...] = (),
+                 completed_top: Optional[Tuple[str, int]] = None,
+                 completed_floor: Optional[Tuple[str, int]] = None,
+                 completed_since: Optional[int] = None):
+        super().__init__()
+        self.db = db
+        self.include_downloading = include_downloading
+        self.expanded_task_ids = expanded_task_ids
+        self.include_completed = include_completed
+        self.completed_top = completed_top
+        self.completed_floor = completed_floor
+        self.completed_since = completed_since
+        self.signals = SnapshotSignals()
+    
+    def run(self):
+        try:
+            # 先读版本号再查询：查询期间发生的写入会让下一次定时刷新重新读取
+            version = self.db.get_data_version()
+            task_stats = task_episodes = completed_new = removal_seq = removed = live_ids = None
+            if self.include_downloading:
+                task_stats = tuple(self.db.get_active_task_stats())
+                task_episodes = {
+                    task_id: tuple(episodes)
+                    for task_id, episodes in self.db.get_active_episodes_for_tasks(list(self.expanded_task_ids)).items()
+                }
+            if self.include_completed:
+                # 先读移出日志再读新剧集：两次查询之间的变化会在下一次刷新时重新应用
+                removal_seq, removed = self.db.get_completed_removals(self.completed_since)
+                if self.completed_top is None:
+                    # 已完成列表为空：只取第一页，其余由视图滚动时分页加载
+                    completed_new = tuple(self.db.get_completed_episodes_page(limit=config.COMPLETED_PAGE_SIZE))
+                else:
+                    completed_new = tuple(self.db.get_completed_episodes_page(after=self.completed_top))
+                if removed is not None:
+                    removed = frozenset(removed)
+                elif self.completed_floor is not None:
+                    # 日志无法覆盖上次刷新以来的变化（首次刷新前已分页加载，或日志已被清理）：全量检查已加载范围
+                    live_ids = frozenset(self.db.get_completed_episode_ids(self.completed_floor))
+            snapshot = ProgressSnapshot(version, task_stats, task_episodes, completed_new, removal_seq,
+                                        removed, live_ids, self.completed_floor)
+        except Exception as e:
+            logger.error(f"读取任务进度失败: {e}")
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.loaded.emit(snapshot)
+
+
+class TaskEpisodesJob(QRunnable):
+    """在后台线程中读取展开的任务的剧集"""
+    
+    def __init__(self, db: Database, task_id: int):
+        super().__init__()
+        self.db = db
+        self.task_id = task_id
+        self.signals = SnapshotSignals()
+    
+    def run(self):
+        try:
+            episodes = self.db.get_active_episodes_for_tasks([self.task_id])[self.task_id]
+        except Exception as e:
+            logger.error(f"读取任务剧集失败: {e}")
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.loaded.emit((self.task_id, tuple(episodes)))
+
+
+class CompletedPageJob(QRunnable):
+    """在后台线程中读取已完成列表的下一页"""
+    
+    def __init__(self, db: Database, before: Optional[Tuple[str, int]]):
+        super().__init__()
+        self.db = db
+        self.before = before
+        self.signals = SnapshotSignals()
+    
+    def run(self):
+        try:
+            episodes = self.db.get_completed_episodes_page(limit=config.COMPLETED_PAGE_SIZE, before=self.before)
+        except Exception as e:
+            logger.error(f"读取已完成剧集失败: {e}")
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.loaded.emit((self.before, tuple(episodes)))
+
+
+def remove_episode_file(storage_path: str) -> bool:
+    """删除剧集的视频文件
+    
+    Returns:
+        是否删除了文件（路径为空、文件不存在或不是文件时返回False）；删除失败时抛出异常
+    """
+    if not storage_path:
+        return False
+    file_path = Path(storage_path)
+    if not file_path.is_file():
+        return False
+    file_path.unlink()
+    return True
+
+
+class DeleteResult:
+    """批量删除的结果"""
+    
+    __slots__ = ('deleted_count', 'file_deleted_count', 'errors', 'cancelled')
+    
+    def __init__(self):
+        self.deleted_count = 0
+        self.file_deleted_count = 0
+        self.errors: List[Tuple[str, str]] = []  # 删除失败的文件: (路径, 错误信息)
+        self.cancelled = False
+
+
+class DeleteSignals(QObject):
+    """批量删除线程的信号"""
+    
+    progress = pyqtSignal(int, int)  # 已处理数量, 总数
+    finished = pyqtSignal(object)  # DeleteResult
+    failed = pyqtSignal(str)  # 删除数据库记录失败: 错误信息
+
+
+class CompletedDeleteJob(QRunnable):
+    """在后台线程中删除已完成剧集的视频文件和数据库记录
+    
+    按DELETE_BATCH_SIZE分批：每批文件由DELETE_FILE_WORKERS个线程并发删除，随后删除这一批的数据库记录。
+    文件删除失败的剧集保留记录（可以处理后重新删除）；取消时已处理的批次保持删除，尚未开始的文件不再处理
+    """
+    
+    def __init__(self, db: Database, items: List[Tuple[int, str]], delete_files: bool):
+        super().__init__()
+        self.db = db
+        self.items = items  # (剧集ID, 视频文件路径)
+        self.delete_files = delete_files
+        self.signals = DeleteSignals()
+        self._cancel_event = threading.Event()
+    
+    def cancel(self):
+        """请求取消（在界面线程中调用）"""
+        self._cancel_event.set()
+    
+    def run(self):
+        result = DeleteResult()
+        total = len(self.items)
+        done = 0
+        try:
+            with ThreadPoolExecutor(max_workers=config.DELETE_FILE_WORKERS,
+                                    thread_name_prefix="删除文件") as executor:
+                for start in range(0, total, config.DELETE_BATCH_SIZE):
+                    if self._cancel_event.is_set():
+                        result.cancelled = True
+                        break
+                    batch = self.items[start:start + config.DELETE_BATCH_SIZE]
+                    if self.delete_files:
+                        episode_ids = self.delete_batch_files(executor, batch, result)
+                    else:
+                        episode_ids = [episode_id for episode_id, _ in batch]
+                    self.db.delete_completed_episodes(episode_ids)
+                    result.deleted_count += len(episode_ids)
+                    done += len(batch)
+                    self.signals.progress.emit(done, total)
+        except Exception as e:
+            logger.error(f"删除记录失败: {e}")
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(result)
+    
+    def delete_batch_files(self, executor: ThreadPoolExecutor, batch: List[Tuple[int, str]],
+                           result: DeleteResult) -> List[int]:
+        """并发删除一批文件，返回可以删除记录的剧集ID（文件已删除或本来就不存在）"""
+        futures = {
+            executor.submit(remove_episode_file, storage_path): (episode_id, storage_path)
+            for episode_id, storage_path in batch
+        }
+        episode_ids = []
+        for future in as_completed(futures):
+            episode_id, storage_path = futures[future]
+            if self._cancel_event.is_set():
+                # 尚未开始的删除直接取消；已经开始的会执行完，结果照常记录
+                for pending in futures:
+                    pending.cancel()
+            if future.cancelled():
+                result.cancelled = True
+                continue
+            try:
+                if future.result():
+                    result.file_deleted_count += 1
+                episode_ids.append(episode_id)
+            except Exception as e:
+                logger.error(f"删除文件失败 {storage_path}: {e}")
+                result.errors.append((storage_path, str(e)))
+        return episode_ids
+
+
 class TaskProgressWidget(QWidget):
     """任务进度界面"""
     
     refresh_requested = pyqtSignal()  # 刷新请求信号
+    follow_changed = pyqtSignal(int, bool)  # 追更管理中开启或关闭了追更: (task_id, 是否追更)
     
     def __init__(self, db: Database, parent=None):
         super().__init__(parent)
         self.db = db
+        self._downloading_version = None  # 下载中列表上次刷新时的数据版本号，None表示尚未刷新过
+        self._completed_version = None  # 已完成列表上次刷新时的数据版本号
+        self._refresh_job = None  # 正在执行的快照读取，None表示没有
+        self._page_job = None  # 正在执行的已完成列表分页读取
+        self._children_jobs = {}  # 正在执行的任务剧集读取: task_id -> job
+        self._delete_job = None  # 正在执行的批量删除
+        self._delete_dialog = None  # 批量删除的进度对话框
+        self._refresh_pool = QThreadPool(self)
+        self._refresh_pool.setMaxThreadCount(1)
         self.init_ui()
         self.setup_refresh_timer()
     
@@ -94,17 +352,17 @@ class TaskProgressWidget(QWidget):
             QMessageBox {
                 /* 弹窗使用默认样式，不继承自定义样式 */
             }
-            QTableWidget {
+            QTableView, QTreeView {
                 background-color: white;
                 border: 1px solid #ddd;
                 border-radius: 8px;
                 gridline-color: #e0e0e0;
                 font-size: 17px;
             }
-            QTableWidget::item {
+            QTableView::item, QTreeView::item {
                 padding: 8px;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected, QTreeView::item:selected {
                 background-color: #E3F2FD;
             }
             QHeaderView::section {
@@ -199,25 +457,20 @@ class TaskProgressWidget(QWidget):
         downloading_layout = QVBoxLayout()
         downloading_layout.setContentsMargins(0, 0, 0, 0)
         
-        # 下载中表格
-        self.downloading_table = QTableWidget()
-        self.downloading_table.setColumnCount(7)
-        self.downloading_table.setHorizontalHeaderLabels([
-            "选择", "任务名称", "剧集网址", "剧集名称", "下载进度", "存储路径", "状态"
-        ])
-        # 设置列宽：选择列较窄，其他列自适应
-        header = self.downloading_table.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.Fixed)  # 选择列固定宽度
-        header.setSectionResizeMode(1, QHeaderView.Stretch)
-        header.setSectionResizeMode(2, QHeaderView.Stretch)
-        header.setSectionResizeMode(3, QHeaderView.Stretch)
-        header.setSectionResizeMode(4, QHeaderView.Stretch)
-        header.setSectionResizeMode(5, QHeaderView.Stretch)
-        header.setSectionResizeMode(6, QHeaderView.Stretch)
-        self.downloading_table.setColumnWidth(0, 60)  # 选择列宽度设为60
-        self.downloading_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.downloading_table.setFont(font)
-        downloading_layout.addWidget(self.downloading_table)
+        # 下载中任务树（每个任务一行，展开时才加载剧集）
+        self.downloading_model = TaskTreeModel(self.load_task_episodes, parent=self)
+        self.downloading_tree = QTreeView()
+        self.downloading_tree.setModel(self.downloading_model)
+        self.downloading_tree.setItemDelegateForColumn(
+            PROGRESS_COLUMN, ProgressBarDelegate(self.downloading_tree)
+        )
+        self.downloading_tree.setUniformRowHeights(True)
+        self.downloading_tree.setSelectionBehavior(QTreeView.SelectRows)
+        self.downloading_tree.header().setSectionResizeMode(QHeaderView.Stretch)
+        self.downloading_tree.header().setDefaultAlignment(Qt.AlignCenter)
+        self.downloading_tree.setFont(font)
+        self.downloading_tree.collapsed.connect(self.on_task_collapsed)
+        downloading_layout.addWidget(self.downloading_tree)
         
         # 按钮区域
         delete_btn_layout = QHBoxLayout()
@@ -252,8 +505,14 @@ class TaskProgressWidget(QWidget):
             }
         """)
         self.select_none_btn.clicked.connect(lambda: self.select_all_downloading(False))
+        self.follow_btn = QPushButton("追更管理")
+        self.follow_btn.setFont(font)
+        self.follow_btn.setFixedHeight(40)
+        self.follow_btn.setStyleSheet(self.select_all_btn.styleSheet())
+        self.follow_btn.clicked.connect(self.open_follow_dialog)
         delete_btn_layout.addWidget(self.select_all_btn)
         delete_btn_layout.addWidget(self.select_none_btn)
+        delete_btn_layout.addWidget(self.follow_btn)
         delete_btn_layout.addStretch()
         self.delete_btn = QPushButton("删除选中")
         self.delete_btn.setFont(font)
@@ -285,22 +544,13 @@ class TaskProgressWidget(QWidget):
         completed_layout.setContentsMargins(0, 0, 0, 0)
         
         # 已完成表格
-        self.completed_table = QTableWidget()
-        self.completed_table.setColumnCount(6)
-        self.completed_table.setHorizontalHeaderLabels([
-            "选择", "任务名称", "剧集网址", "剧集名称", "存储路径", "完成时间"
-        ])
-        # 设置列宽：选择列较窄，其他列自适应
-        completed_header = self.completed_table.horizontalHeader()
-        completed_header.setSectionResizeMode(0, QHeaderView.Fixed)  # 选择列固定宽度
-        completed_header.setSectionResizeMode(1, QHeaderView.Stretch)
-        completed_header.setSectionResizeMode(2, QHeaderView.Stretch)
-        completed_header.setSectionResizeMode(3, QHeaderView.Stretch)
-        completed_header.setSectionResizeMode(4, QHeaderView.Stretch)
-        completed_header.setSectionResizeMode(5, QHeaderView.Stretch)
-        self.completed_table.setColumnWidth(0, 60)  # 选择列宽度设为60
-        self.completed_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.completed_table.setFont(font)
+        # 已完成列表可能有十万条以上，只加载滚动到的页
+        self.completed_model = CompletedHistoryModel(
+            COMPLETED_COLUMNS, self.load_completed_page, config.COMPLETED_PAGE_SIZE, parent=self
+        )
+        self.completed_table = QTableView()
+        self.completed_table.setModel(self.completed_model)
+        self.setup_table_view(self.completed_table, font)
         completed_layout.addWidget(self.completed_table)
         
         # 已完成按钮区域
@@ -363,184 +613,161 @@ class TaskProgressWidget(QWidget):
         self.completed_tab.setLayout(completed_layout)
         self.tab_widget.addTab(self.completed_tab, "已完成")
         
+        # 切换标签页时立即刷新新显示的列表（只在数据有变化时查询）
+        self.tab_widget.currentChanged.connect(lambda index: self.refresh_data())
+        
         layout.addWidget(self.tab_widget)
         self.setLayout(layout)
     
+    def setup_table_view(self, table: QTableView, font: QFont):
+        """表格视图的通用设置：选择列较窄，其他列自适应"""
+        header = table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Stretch)
+        header.setSectionResizeMode(0, QHeaderView.Fixed)  # 选择列固定宽度
+        table.setColumnWidth(0, 60)  # 选择列宽度设为60
+        table.verticalHeader().setDefaultSectionSize(40)
+        table.setSelectionBehavior(QTableView.SelectRows)
+        table.setFont(font)
+    
     def setup_refresh_timer(self):
-        """设置刷新定时器"""
-        self.refresh_timer = QTimer()
+        """设置刷新定时器（界面显示时才运行，见showEvent/hideEvent）"""
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(config.UI_REFRESH_INTERVAL)
         self.refresh_timer.timeout.connect(self.refresh_data)
-        self.refresh_timer.start(config.UI_REFRESH_INTERVAL)
     
-    def refresh_data(self):
-        """刷新数据"""
-        self.refresh_downloading()
-        self.refresh_completed()
+    def showEvent(self, event):
+        """界面显示（切换到进度页、窗口从最小化恢复）时立即刷新并开始定时刷新"""
+        super().showEvent(event)
+        self.refresh_timer.start()
+        self.refresh_data()
+    
+    def hideEvent(self, event):
+        """界面隐藏（切换到新建任务页、窗口最小化）时停止定时刷新"""
+        super().hideEvent(event)
+        self.refresh_timer.stop()
+    
+    def is_completed_tab_current(self) -> bool:
+        """当前显示的是否为已完成标签页"""
+        return self.tab_widget.currentWidget() is self.completed_tab
+    
+    def refresh_data(self, force: bool = False):
+        """刷新当前显示的列表
+        
+        界面不可见时不刷新（重新显示时会补上）；只有数据版本号在该列表上次刷新后变化时才重新查询数据库。
+        查询在后台线程中执行，结果以快照形式通过信号交回界面线程；
+        上一次查询尚未完成时直接丢弃本次刷新（不排队），遗漏的变化由下一次定时刷新补上
+        
+        Args:
+            force: 是否忽略版本号强制刷新
+        """
+        if self._refresh_job is not None:
+            return
+        if not self.isVisible() or self.window().isMinimized():
+            return
+        
+        completed = self.is_completed_tab_current()
+        last_version = self._completed_version if completed else self._downloading_version
+        if not force and not self.db.has_changed_since(last_version):
+            return
+        
+        if completed:
+            job = ProgressSnapshotJob(self.db, False, True,
+                                      completed_top=self.completed_model.top_key(),
+                                      completed_floor=self.completed_model.bottom_key(),
+                                      completed_since=self.completed_model.removal_seq)
+        else:
+            job = ProgressSnapshotJob(self.db, True, False,
+                                      expanded_task_ids=tuple(self.downloading_model.loaded_task_ids()))
+        job.signals.loaded.connect(self.on_snapshot_loaded)
+        job.signals.failed.connect(self.on_snapshot_failed)
+        self._refresh_job = job
+        self._refresh_pool.start(job)
+    
+    def on_snapshot_loaded(self, snapshot: ProgressSnapshot):
+        """用后台读取的快照更新对应的列表"""
+        self._refresh_job = None
+        if snapshot.task_stats is not None:
+            self.downloading_model.apply_snapshot(snapshot.task_stats, snapshot.task_episodes)
+            self._downloading_version = snapshot.version
+        if snapshot.completed_new is not None:
+            self.apply_completed_changes(snapshot)
+            self._completed_version = snapshot.version
+    
+    def apply_completed_changes(self, snapshot: ProgressSnapshot):
+        """更新已完成列表，并按episode_id保持滚动位置
+        
+        停在顶部时显示新完成的剧集；否则在变化后滚回原来位于顶部的剧集
+        """
+        anchor_row = self.completed_table.rowAt(0)
+        anchor_id = self.completed_model.episodes[anchor_row].id if anchor_row > 0 else None
+        
+        self.completed_model.apply_changes(
+            snapshot.completed_new, snapshot.completed_removal_seq, snapshot.completed_removed,
+            snapshot.completed_live_ids, snapshot.completed_floor
+        )
+        
+        if anchor_id is not None:
+            row = self.completed_model.row_of(anchor_id)
+            if row >= 0 and row != anchor_row:
+                self.completed_table.scrollTo(self.completed_model.index(row, 0), QTableView.PositionAtTop)
+    
+    def load_task_episodes(self, task_id: int):
+        """在后台读取展开的任务的剧集（由TaskTreeModel.fetchMore调用）"""
+        job = TaskEpisodesJob(self.db, task_id)
+        job.signals.loaded.connect(self.on_task_episodes_loaded)
+        job.signals.failed.connect(lambda message: self.downloading_model.children_failed(task_id))
+        self._children_jobs[task_id] = job
+        self._refresh_pool.start(job)
+    
+    def on_task_episodes_loaded(self, result: tuple):
+        task_id, episodes = result
+        self._children_jobs.pop(task_id, None)
+        self.downloading_model.set_children(task_id, episodes)
+    
+    def on_task_collapsed(self, index):
+        """任务折叠后释放其剧集行"""
+        task_id = self.downloading_model.task_id_of(index)
+        if task_id is not None:
+            self.downloading_model.release_children(task_id)
+    
+    def load_completed_page(self, before: Optional[Tuple[str, int]]):
+        """在后台读取已完成列表的下一页（由CompletedHistoryModel.fetchMore调用）"""
+        job = CompletedPageJob(self.db, before)
+        job.signals.loaded.connect(self.on_completed_page_loaded)
+        job.signals.failed.connect(self.on_completed_page_failed)
+        self._page_job = job
+        self._refresh_pool.start(job)
+    
+    def on_completed_page_loaded(self, result: tuple):
+        self._page_job = None
+        before, episodes = result
+        self.completed_model.append_page(before, episodes)
+    
+    def on_completed_page_failed(self, message: str):
+        self._page_job = None
+        self.completed_model.page_failed()
+    
+    def on_snapshot_failed(self, message: str):
+        """快照读取失败，保留当前显示，下一次定时刷新时重试"""
+        self._refresh_job = None
     
     def refresh_downloading(self):
-        """刷新下载中列表"""
-        # 保存当前选中的episode_id
-        selected_ids = set()
-        for row in range(self.downloading_table.rowCount()):
-            checkbox = self.downloading_table.cellWidget(row, 0)
-            if checkbox and checkbox.isChecked():
-                episode_id = checkbox.property("episode_id")
-                if episode_id:
-                    selected_ids.add(episode_id)
-        
-        episodes = self.db.get_downloading_episodes()
-        
-        self.downloading_table.setRowCount(len(episodes))
-        
-        for row, episode in enumerate(episodes):
-            # 选择框
-            checkbox = QCheckBox()
-            episode_id = episode['id']
-            checkbox.setProperty("episode_id", episode_id)
-            # 恢复之前选中的状态
-            if episode_id in selected_ids:
-                checkbox.setChecked(True)
-            # 只有pending状态的可以删除
-            if episode['status'] == 'pending':
-                checkbox.setEnabled(True)
-            else:
-                checkbox.setEnabled(False)
-            self.downloading_table.setCellWidget(row, 0, checkbox)
-            
-            # 任务名称
-            task_name_item = QTableWidgetItem(episode.get('task_name', ''))
-            task_name_item.setTextAlignment(Qt.AlignCenter)
-            self.downloading_table.setItem(row, 1, task_name_item)
-            
-            # 剧集网址
-            episode_url = episode.get('episode_url', '')
-            episode_url_item = QTableWidgetItem(episode_url)
-            episode_url_item.setTextAlignment(Qt.AlignCenter)
-            episode_url_item.setToolTip(episode_url)  # 设置tooltip显示完整内容
-            self.downloading_table.setItem(row, 2, episode_url_item)
-            
-            # 剧集名称
-            episode_name = episode.get('episode_name', '')
-            episode_name_item = QTableWidgetItem(episode_name)
-            episode_name_item.setTextAlignment(Qt.AlignCenter)
-            episode_name_item.setToolTip(episode_name)  # 设置tooltip显示完整内容
-            self.downloading_table.setItem(row, 3, episode_name_item)
-            
-            # 下载进度
-            progress = episode.get('progress', 0.0)
-            status = episode.get('status', 'pending')
-            if status == 'downloading':
-                progress_text = f"{progress:.1f}%"
-                progress_item = QTableWidgetItem(progress_text)
-                # 根据进度设置颜色
-                if progress < 30:
-                    progress_item.setForeground(QColor(255, 0, 0))
-                elif progress < 70:
-                    progress_item.setForeground(QColor(255, 165, 0))
-                else:
-                    progress_item.setForeground(QColor(0, 128, 0))
-            elif status == 'error':
-                progress_item = QTableWidgetItem("错误")
-                progress_item.setForeground(QColor(255, 0, 0))
-            else:
-                progress_item = QTableWidgetItem("等待中")
-                progress_item.setForeground(QColor(128, 128, 128))
-            progress_item.setTextAlignment(Qt.AlignCenter)
-            self.downloading_table.setItem(row, 4, progress_item)
-            
-            # 存储路径
-            storage_path = episode.get('task_storage_path', '') or episode.get('storage_path', '')
-            storage_path_item = QTableWidgetItem(storage_path)
-            storage_path_item.setTextAlignment(Qt.AlignCenter)
-            self.downloading_table.setItem(row, 5, storage_path_item)
-            
-            # 状态
-            status_text = {
-                'pending': '等待中',
-                'downloading': '下载中',
-                'error': '错误',
-                'deleted': '已删除'
-            }.get(status, status)
-            status_item = QTableWidgetItem(status_text)
-            status_item.setTextAlignment(Qt.AlignCenter)
-            self.downloading_table.setItem(row, 6, status_item)
+        """刷新下载中任务树（勾选状态按task_id/episode_id保留）"""
+        self.refresh_data(force=True)
     
     def refresh_completed(self):
-        """刷新已完成列表"""
-        # 保存当前选中的episode_id
-        selected_ids = set()
-        for row in range(self.completed_table.rowCount()):
-            checkbox = self.completed_table.cellWidget(row, 0)
-            if checkbox and checkbox.isChecked():
-                episode_id = checkbox.property("episode_id")
-                if episode_id:
-                    selected_ids.add(episode_id)
-        
-        episodes = self.db.get_completed_episodes()
-        
-        self.completed_table.setRowCount(len(episodes))
-        
-        for row, episode in enumerate(episodes):
-            # 选择框
-            checkbox = QCheckBox()
-            episode_id = episode['id']
-            checkbox.setProperty("episode_id", episode_id)
-            checkbox.setProperty("storage_path", episode.get('storage_path', '') or episode.get('task_storage_path', ''))
-            # 恢复之前选中的状态
-            if episode_id in selected_ids:
-                checkbox.setChecked(True)
-            checkbox.setEnabled(True)
-            self.completed_table.setCellWidget(row, 0, checkbox)
-            
-            # 任务名称
-            task_name_item = QTableWidgetItem(episode.get('task_name', ''))
-            task_name_item.setTextAlignment(Qt.AlignCenter)
-            self.completed_table.setItem(row, 1, task_name_item)
-            
-            # 剧集网址
-            episode_url = episode.get('episode_url', '')
-            episode_url_item = QTableWidgetItem(episode_url)
-            episode_url_item.setTextAlignment(Qt.AlignCenter)
-            episode_url_item.setToolTip(episode_url)  # 设置tooltip显示完整内容
-            self.completed_table.setItem(row, 2, episode_url_item)
-            
-            # 剧集名称
-            episode_name = episode.get('episode_name', '')
-            episode_name_item = QTableWidgetItem(episode_name)
-            episode_name_item.setTextAlignment(Qt.AlignCenter)
-            episode_name_item.setToolTip(episode_name)  # 设置tooltip显示完整内容
-            self.completed_table.setItem(row, 3, episode_name_item)
-            
-            # 存储路径
-            storage_path = episode.get('storage_path', '') or episode.get('task_storage_path', '')
-            storage_path_item = QTableWidgetItem(storage_path)
-            storage_path_item.setTextAlignment(Qt.AlignCenter)
-            self.completed_table.setItem(row, 4, storage_path_item)
-            
-            # 完成时间（转换为北京时间）
-            updated_at = episode.get('updated_at', '')
-            beijing_time = utc_to_beijing_time(updated_at)
-            updated_at_item = QTableWidgetItem(beijing_time)
-            updated_at_item.setTextAlignment(Qt.AlignCenter)
-            self.completed_table.setItem(row, 5, updated_at_item)
+        """刷新已完成列表（勾选状态按episode_id保留）"""
+        self.refresh_data(force=True)
     
     def select_all_downloading(self, checked: bool):
         """全选/全不选下载中的剧集"""
-        for row in range(self.downloading_table.rowCount()):
-            checkbox = self.downloading_table.cellWidget(row, 0)
-            if checkbox and checkbox.isEnabled():
-                checkbox.setChecked(checked)
+        self.downloading_model.set_all_checked(checked)
     
     def delete_selected_episodes(self):
-        """删除选中的剧集"""
-        selected_ids = []
-        
-        for row in range(self.downloading_table.rowCount()):
-            checkbox = self.downloading_table.cellWidget(row, 0)
-            if checkbox and checkbox.isChecked() and checkbox.isEnabled():
-                episode_id = checkbox.property("episode_id")
-                if episode_id:
-                    selected_ids.append(episode_id)
+        """删除选中的剧集（勾选任务行时删除该任务全部等待中的剧集）"""
+        selected_ids = set(self.downloading_model.checked_episode_ids())
+        for task_id in self.downloading_model.checked_task_ids():
+            selected_ids.update(episode.id for episode in self.db.get_task_episodes(task_id, 'pending'))
         
         if not selected_ids:
             show_information(self, "提示", "请先选择要删除的剧集！")
@@ -555,31 +782,29 @@ class TaskProgressWidget(QWidget):
         )
         
         if reply == QMessageBox.Yes:
-            self.db.delete_episodes(selected_ids)
+            self.db.delete_episodes(list(selected_ids))
             self.refresh_downloading()
             show_information(self, "成功", "已删除选中的剧集！")
     
+    def open_follow_dialog(self):
+        """打开追更管理对话框"""
+        dialog = FollowTasksDialog(self.db, parent=self)
+        dialog.follow_changed.connect(self.follow_changed)
+        dialog.exec_()
+    
     def select_all_completed(self, checked: bool):
         """全选/全不选已完成的剧集"""
-        for row in range(self.completed_table.rowCount()):
-            checkbox = self.completed_table.cellWidget(row, 0)
-            if checkbox:
-                checkbox.setChecked(checked)
+        self.completed_model.set_all_checked(checked)
     
     def delete_selected_completed(self):
         """删除选中的已完成剧集"""
-        selected_items = []
-        
-        for row in range(self.completed_table.rowCount()):
-            checkbox = self.completed_table.cellWidget(row, 0)
-            if checkbox and checkbox.isChecked():
-                episode_id = checkbox.property("episode_id")
-                storage_path = checkbox.property("storage_path")
-                if episode_id:
-                    selected_items.append({
-                        'episode_id': episode_id,
-                        'storage_path': storage_path
-                    })
+        selected_items = [
+            {
+                'episode_id': episode.id,
+                'storage_path': episode.storage_path or episode.task_storage_path or ''
+            }
+            for episode in self.completed_model.checked_episodes()
+        ]
         
         if not selected_items:
             show_information(self, "提示", "请先选择要删除的剧集！")
@@ -599,37 +824,67 @@ class TaskProgressWidget(QWidget):
         
         delete_files = (reply == QMessageBox.Yes)
         
-        # 删除文件和记录
-        episode_ids = [item['episode_id'] for item in selected_items]
-        deleted_count = 0
-        file_deleted_count = 0
+        # 文件和记录在后台线程中分批删除，界面显示进度并可以取消
+        items = [(item['episode_id'], item['storage_path']) for item in selected_items]
+        job = CompletedDeleteJob(self.db, items, delete_files)
+        job.signals.progress.connect(self.on_delete_progress)
+        job.signals.finished.connect(self.on_delete_finished)
+        job.signals.failed.connect(self.on_delete_failed)
+        
+        dialog = QProgressDialog("正在删除选中的剧集...", "取消", 0, len(items), self)
+        dialog.setWindowTitle("删除")
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(500)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        dialog.setValue(0)
+        dialog.canceled.connect(job.cancel)
+        
+        self._delete_job = job
+        self._delete_dialog = dialog
+        self.completed_delete_btn.setEnabled(False)
+        QThreadPool.globalInstance().start(job)
+    
+    def on_delete_progress(self, done: int, total: int):
+        """更新批量删除的进度"""
+        if self._delete_dialog is not None:
+            self._delete_dialog.setValue(done)
+            self._delete_dialog.setLabelText(f"正在删除选中的剧集... {done}/{total}")
+    
+    def finish_delete(self):
+        """批量删除结束后关闭进度对话框并刷新已完成列表"""
+        self._delete_job = None
+        if self._delete_dialog is not None:
+            self._delete_dialog.close()
+            self._delete_dialog.deleteLater()
+            self._delete_dialog = None
+        self.completed_delete_btn.setEnabled(True)
+        self.refresh_completed()
+    
+    def on_delete_finished(self, result: DeleteResult):
+        """显示批量删除的结果，列出删除失败的文件"""
+        delete_files = self._delete_job.delete_files if self._delete_job else False
+        self.finish_delete()
         
-        # 删除文件
+        msg = f"已删除 {result.deleted_count} 条记录"
         if delete_files:
-            for item in selected_items:
-                storage_path = item['storage_path']
-                if storage_path:
-                    try:
-                        file_path = Path(storage_path)
-                        if file_path.exists() and file_path.is_file():
-                            file_path.unlink()
-                            file_deleted_count += 1
-                    except Exception as e:
-                        logger.error(f"删除文件失败 {storage_path}: {e}")
-        
-        # 批量删除数据库记录
-        try:
-            self.db.delete_completed_episodes(episode_ids)
-            deleted_count = len(episode_ids)
-        except Exception as e:
-            logger.error(f"删除记录失败: {e}")
-            show_critical(self, "错误", f"删除记录失败: {str(e)}")
+            msg += f"，已删除 {result.file_deleted_count} 个文件"
+        if result.cancelled:
+            msg = "删除已取消，" + msg
+        if not result.errors:
+            show_information(self, "成功", msg)
             return
         
-        self.refresh_completed()
-        
-        msg = f"已删除 {deleted_count} 条记录"
-        if delete_files:
-            msg += f"，已删除 {file_deleted_count} 个文件"
-        show_information(self, "成功", msg)
+        # 只列出前若干个失败的文件，完整列表见日志
+        max_listed = 10
+        lines = [f"{path}: {error}" for path, error in result.errors[:max_listed]]
+        if len(result.errors) > max_listed:
+            lines.append(f"... 另有 {len(result.errors) - max_listed} 个文件删除失败，详见日志")
+        msg += f"\n\n以下 {len(result.errors)} 个文件删除失败，对应记录已保留：\n" + "\n".join(lines)
+        show_warning(self, "部分删除失败", msg)
+    
+    def on_delete_failed(self, error: str):
+        """删除数据库记录失败"""
+        self.finish_delete()
+        show_critical(self, "错误", f"删除记录失败: {error}")
 
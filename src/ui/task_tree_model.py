@@ -0,0 +1,431 @@
+"""
+下载中任务的树形模型：每个任务一行（来自task_stats的汇总进度、速度和剩余时间），展开后才加载该任务的剧集
+"""
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex, QVariant
+# 使用绝对导入，兼容打包后的exe
+try:
+    from src.models import Episode, TaskStats
+    from src.ui.episode_table_model import (ProgressRole, STATUS_TEXTS, progress_level_color,
+                                            episode_progress_text, episode_progress_color)
+    from src.ui.row_sync import remove_rows, insert_rows, sync_rows
+except ImportError:
+    from ..models import Episode, TaskStats
+    from .episode_table_model import (ProgressRole, STATUS_TEXTS, progress_level_color,
+                                      episode_progress_text, episode_progress_color)
+    from .row_sync import remove_rows, insert_rows, sync_rows
+
+HEADERS = ["任务/剧集", "下载进度", "速度", "剩余时间", "状态", "存储路径"]
+NAME_COLUMN, PROGRESS_COLUMN, SPEED_COLUMN, ETA_COLUMN, STATUS_COLUMN, PATH_COLUMN = range(len(HEADERS))
+
+
+def format_speed(speed: Optional[float]) -> str:
+    """格式化下载速度（字节/秒）"""
+    if not speed:
+        return ""
+    for unit in ("B/s", "KB/s", "MB/s"):
+        if speed < 1024:
+            return f"{speed:.1f} {unit}"
+        speed /= 1024
+    return f"{speed:.1f} GB/s"
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    """格式化剩余时间，无法估算时返回"--\""""
+    if seconds is None:
+        return "--"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}小时{seconds % 3600 // 60}分"
+    if seconds >= 60:
+        return f"{seconds // 60}分{seconds % 60}秒"
+    return f"{seconds}秒"
+
+
+class SpeedTracker:
+    """根据累计下载字节数的变化估算速度（指数加权平均，平滑进度写入的节流抖动）
+    
+    两次采样间隔超过max_gap（如界面隐藏了一段时间）或字节数减少（剧集被删除）时重新开始采样
+    """
+    
+    def __init__(self, alpha: float = 0.3, max_gap: float = 30.0):
+        self.alpha = alpha
+        self.max_gap = max_gap
+        self._samples: Dict[object, Tuple[float, int]] = {}  # key -> (采样时间, 字节数)
+        self._speeds: Dict[object, float] = {}
+    
+    def update(self, key, done_bytes: int, now: float = None):
+        """记录一次采样"""
+        now = time.time() if now is None else now
+        done_bytes = done_bytes or 0
+        previous = self._samples.get(key)
+        self._samples[key] = (now, done_bytes)
+        if previous is None:
+            return
+        elapsed = now - previous[0]
+        delta = done_bytes - previous[1]
+        if elapsed <= 0:
+            return
+        if elapsed > self.max_gap or delta < 0:
+            self._speeds.pop(key, None)
+            return
+        rate = delta / elapsed
+        speed = self._speeds.get(key)
+        self._speeds[key] = rate if speed is None else self.alpha * rate + (1 - self.alpha) * speed
+    
+    def get(self, key) -> Optional[float]:
+        """当前速度估算（字节/秒），没有足够采样时返回None"""
+        return self._speeds.get(key)
+    
+    def retain(self, keys):
+        """只保留指定key的采样（清理已结束的任务和剧集）"""
+        keys = set(keys)
+        for store in (self._samples, self._speeds):
+            for key in [key for key in store if key not in keys]:
+                del store[key]
+
+
+def task_eta(stats: TaskStats, speed: Optional[float]) -> Optional[float]:
+    """估算任务剩余时间
+    
+    剩余字节数 = 已知大小中未下载的部分 + 等待中剧集数 × 已知剧集的平均大小（尚未开始的剧集大小未知）
+    """
+    if not speed:
+        return None
+    known = (stats.completed_count or 0) + (stats.downloading_count or 0)
+    average_size = (stats.total_bytes or 0) / known if known else 0
+    remaining = stats.remaining_bytes + (stats.pending_count or 0) * average_size
+    return remaining / speed
+
+
+class TaskKey:
+    """子行索引的internalPointer：指向所属任务（模型持有引用，保证指针在任务行存在期间有效）"""
+    
+    __slots__ = ('task_id',)
+    
+    def __init__(self, task_id: int):
+        self.task_id = task_id
+
+
+class TaskTreeModel(QAbstractItemModel):
+    """下载中任务树
+    
+    顶层为有等待中/下载中剧集的任务（TaskStats），子行为该任务的剧集。子行只在任务展开时
+    通过canFetchMore/fetchMore加载（由request_children在后台读取，结果交给set_children），
+    折叠时释放（release_children）；刷新时只读取已展开任务的剧集。
+    勾选任务行表示该任务全部等待中的剧集，勾选剧集行只对等待中的剧集有效。
+    """
+    
+    def __init__(self, request_children: Callable[[int], None], parent=None):
+        super().__init__(parent)
+        self.request_children = request_children
+        self.tasks: List[TaskStats] = []
+        self._task_signatures: List[Tuple] = []
+        self._keys: Dict[int, TaskKey] = {}
+        self.children: Dict[int, List[Episode]] = {}
+        self._child_signatures: Dict[int, List[Tuple]] = {}
+        self._loading = set()
+        self.checked_tasks = set()
+        self.checked_episodes = set()
+        self.speeds = SpeedTracker()
+    
+    # ---------- 索引 ----------
+    
+    def _task_row(self, task_id: int) -> int:
+        for row, stats in enumerate(self.tasks):
+            if stats.task_id == task_id:
+                return row
+        return -1
+    
+    def _task_index(self, task_id: int, column: int = 0) -> QModelIndex:
+        row = self._task_row(task_id)
+        return self.createIndex(row, column) if row >= 0 else QModelIndex()
+    
+    def index(self, row: int, column: int, parent=QModelIndex()) -> QModelIndex:
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column)
+        task_id = self.tasks[parent.row()].task_id
+        return self.createIndex(row, column, self._keys[task_id])
+    
+    def parent(self, index: QModelIndex) -> QModelIndex:
+        if not index.isValid():
+            return QModelIndex()
+        key = index.internalPointer()
+        if key is None:
+            return QModelIndex()
+        return self._task_index(key.task_id)
+    
+    def _item(self, index: QModelIndex):
+        """索引对应的(TaskStats, None)或(None, Episode)"""
+        key = index.internalPointer()
+        if key is None:
+            return self.tasks[index.row()], None
+        return None, self.children[key.task_id][index.row()]
+    
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if not parent.isValid():
+            return len(self.tasks)
+        if parent.internalPointer() is None:
+            return len(self.children.get(self.tasks[parent.row()].task_id, ()))
+        return 0
+    
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return len(HEADERS)
+    
+    def hasChildren(self, parent=QModelIndex()) -> bool:
+        if not parent.isValid():
+            return bool(self.tasks)
+        return parent.internalPointer() is None
+    
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        if not parent.isValid() or parent.internalPointer() is not None:
+            return False
+        task_id = self.tasks[parent.row()].task_id
+        return task_id not in self.children and task_id not in self._loading
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        task_id = self.tasks[parent.row()].task_id
+        self._loading.add(task_id)
+        self.request_children(task_id)
+    
+    # ---------- 数据 ----------
+    
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return HEADERS[section]
+        return QVariant()
+    
+    def flags(self, index: QModelIndex):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == NAME_COLUMN:
+            stats, episode = self._item(index)
+            if stats is not None or episode.status == 'pending':
+                flags |= Qt.ItemIsUserCheckable
+        return flags
+    
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        stats, episode = self._item(index)
+        column = index.column()
+        
+        if role == Qt.TextAlignmentRole:
+            return (Qt.AlignLeft | Qt.AlignVCenter) if column == NAME_COLUMN else Qt.AlignCenter
+        if column == NAME_COLUMN and role == Qt.CheckStateRole:
+            return Qt.Checked if self._is_checked(stats, episode) else Qt.Unchecked
+        if stats is not None:
+            return self._task_data(stats, column, role)
+        return self._episode_data(episode, column, role)
+    
+    def _task_data(self, stats: TaskStats, column: int, role):
+        percent = stats.percent
+        if role == Qt.DisplayRole:
+            if column == NAME_COLUMN:
+                return stats.task_name or ''
+            if column == PROGRESS_COLUMN:
+                return f"{percent:.1f}%"
+            if column == SPEED_COLUMN:
+                return format_speed(self.speeds.get(('task', stats.task_id)))
+            if column == ETA_COLUMN:
+                return format_eta(task_eta(stats, self.speeds.get(('task', stats.task_id))))
+            if column == STATUS_COLUMN:
+                text = (f"完成 {stats.completed_count or 0}/{stats.total_count}，"
+                        f"下载中 {stats.downloading_count or 0}，等待 {stats.pending_count or 0}")
+                if stats.error_count:
+                    text += f"，错误 {stats.error_count}"
+                return text
+            if column == PATH_COLUMN:
+                return stats.storage_path or ''
+        if role == Qt.ToolTipRole and column == NAME_COLUMN:
+            return stats.drama_name or stats.task_name or ''
+        if role == Qt.ForegroundRole and column == PROGRESS_COLUMN:
+            return progress_level_color(percent)
+        if role == ProgressRole and column == PROGRESS_COLUMN:
+            return (percent, 'downloading')
+        return QVariant()
+    
+    def _episode_data(self, episode: Episode, column: int, role):
+        if role == Qt.DisplayRole:
+            if column == NAME_COLUMN:
+                return episode.episode_name or ''
+            if column == PROGRESS_COLUMN:
+                return episode_progress_text(episode)
+            if column == SPEED_COLUMN:
+                return format_speed(self.speeds.get(episode.id))
+            if column == ETA_COLUMN:
+                speed = self.speeds.get(episode.id)
+                if episode.status != 'downloading' or not speed or not episode.total_bytes:
+                    return ""
+                return format_eta(max(0, episode.total_bytes - (episode.downloaded_bytes or 0)) / speed)
+            if column == STATUS_COLUMN:
+                status = episode.status or 'pending'
+                return STATUS_TEXTS.get(status, status)
+            if column == PATH_COLUMN:
+                return episode.task_storage_path or episode.storage_path or ''
+        if role == Qt.ToolTipRole and column == NAME_COLUMN:
+            return episode.episode_url or ''
+        if role == Qt.ForegroundRole and column == PROGRESS_COLUMN:
+            return episode_progress_color(episode)
+        if role == ProgressRole and column == PROGRESS_COLUMN:
+            return (episode.progress or 0.0, episode.status or 'pending')
+        return QVariant()
+    
+    # ---------- 勾选状态 ----------
+    
+    def _is_checked(self, stats: Optional[TaskStats], episode: Optional[Episode]) -> bool:
+        if stats is not None:
+            return stats.task_id in self.checked_tasks
+        if episode.status != 'pending':
+            return False
+        return episode.id in self.checked_episodes or episode.task_id in self.checked_tasks
+    
+    def setData(self, index: QModelIndex, value, role=Qt.EditRole) -> bool:
+        if not index.isValid() or index.column() != NAME_COLUMN or role != Qt.CheckStateRole:
+            return False
+        if not self.flags(index) & Qt.ItemIsUserCheckable:
+            return False
+        stats, episode = self._item(index)
+        checked = value == Qt.Checked
+        if stats is not None:
+            if checked:
+                self.checked_tasks.add(stats.task_id)
+            else:
+                self.checked_tasks.discard(stats.task_id)
+                # 取消任务勾选时同时取消其剧集的单独勾选
+                self.checked_episodes -= {child.id for child in self.children.get(stats.task_id, ())}
+            self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+            self._emit_children_changed(stats.task_id, [Qt.CheckStateRole])
+        else:
+            if checked:
+                self.checked_episodes.add(episode.id)
+            else:
+                self.checked_episodes.discard(episode.id)
+                if episode.task_id in self.checked_tasks:
+                    # 取消任务中的一个剧集：任务改为逐个勾选其余已加载的等待中剧集
+                    self.checked_tasks.discard(episode.task_id)
+                    self.checked_episodes.update(
+                        child.id for child in self.children.get(episode.task_id, ())
+                        if child.status == 'pending' and child.id != episode.id
+                    )
+                    self.dataChanged.emit(self._task_index(episode.task_id), self._task_index(episode.task_id),
+                                          [Qt.CheckStateRole])
+            self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+    
+    def _emit_children_changed(self, task_id: int, roles=None):
+        children = self.children.get(task_id)
+        if not children:
+            return
+        parent = self._task_index(task_id)
+        self.dataChanged.emit(self.index(0, 0, parent), self.index(len(children) - 1, len(HEADERS) - 1, parent),
+                              roles or [])
+    
+    def set_all_checked(self, checked: bool):
+        """全选/全不选（全选即勾选所有任务，代表其全部等待中的剧集）"""
+        if checked:
+            self.checked_tasks = {stats.task_id for stats in self.tasks}
+        else:
+            self.checked_tasks.clear()
+            self.checked_episodes.clear()
+        if self.tasks:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.tasks) - 1, 0), [Qt.CheckStateRole])
+        for task_id in self.children:
+            self._emit_children_changed(task_id, [Qt.CheckStateRole])
+    
+    def checked_task_ids(self) -> List[int]:
+        """整个任务被勾选的task_id"""
+        return [stats.task_id for stats in self.tasks if stats.task_id in self.checked_tasks]
+    
+    def checked_episode_ids(self) -> List[int]:
+        """单独勾选的等待中剧集ID（不含整个任务被勾选的剧集）"""
+        return [episode.id for task_id, episodes in self.children.items() if task_id not in self.checked_tasks
+                for episode in episodes if episode.id in self.checked_episodes and episode.status == 'pending']
+    
+    # ---------- 增量更新 ----------
+    
+    @staticmethod
+    def _signature(record) -> Tuple:
+        return tuple(getattr(record, name) for name in record.__slots__)
+    
+    def loaded_task_ids(self) -> List[int]:
+        """已加载剧集的任务（刷新时需要一并读取它们的剧集）"""
+        return list(self.children)
+    
+    def apply_snapshot(self, task_stats: Sequence[TaskStats], task_episodes: Dict[int, Sequence[Episode]],
+                       now: float = None):
+        """应用一次刷新的结果：更新任务行，并更新已展开任务的剧集行"""
+        now = time.time() if now is None else now
+        for stats in task_stats:
+            self.speeds.update(('task', stats.task_id), stats.downloaded_bytes, now)
+        for episodes in task_episodes.values():
+            for episode in episodes:
+                if episode.status == 'downloading':
+                    self.speeds.update(episode.id, episode.downloaded_bytes, now)
+        
+        for stats in task_stats:
+            self._keys.setdefault(stats.task_id, TaskKey(stats.task_id))
+        sync_rows(self, QModelIndex(), self.tasks, self._task_signatures, list(task_stats),
+                  key=lambda stats: stats.task_id, signature=self._signature, last_column=len(HEADERS) - 1)
+        
+        task_ids = {stats.task_id for stats in self.tasks}
+        for task_id in [task_id for task_id in self.children if task_id not in task_ids]:
+            del self.children[task_id]
+            del self._child_signatures[task_id]
+        for task_id in [task_id for task_id in self._keys if task_id not in task_ids]:
+            del self._keys[task_id]
+        self._loading &= task_ids
+        self.checked_tasks &= task_ids
+        
+        for task_id, episodes in task_episodes.items():
+            if task_id in self.children:
+                self._sync_children(task_id, episodes)
+        
+        episode_ids = {episode.id for episodes in self.children.values() for episode in episodes}
+        self.checked_episodes &= episode_ids
+        self.speeds.retain({('task', task_id) for task_id in task_ids} | episode_ids)
+    
+    def _sync_children(self, task_id: int, episodes: Sequence[Episode]):
+        sync_rows(self, self._task_index(task_id), self.children[task_id], self._child_signatures[task_id],
+                  list(episodes), key=lambda episode: episode.id, signature=self._signature,
+                  last_column=len(HEADERS) - 1)
+    
+    def set_children(self, task_id: int, episodes: Sequence[Episode]):
+        """展开任务时读取到的剧集（请求期间任务已折叠或已结束时忽略）"""
+        if task_id not in self._loading:
+            return
+        self._loading.discard(task_id)
+        parent = self._task_index(task_id)
+        if not parent.isValid():
+            return
+        self.children[task_id] = []
+        self._child_signatures[task_id] = []
+        insert_rows(self, parent, self.children[task_id], self._child_signatures[task_id],
+                    0, list(episodes), self._signature)
+    
+    def children_failed(self, task_id: int):
+        """读取剧集失败，允许再次展开时重试"""
+        self._loading.discard(task_id)
+    
+    def release_children(self, task_id: int):
+        """任务折叠后释放其剧集行"""
+        self._loading.discard(task_id)
+        children = self.children.get(task_id)
+        if children is None:
+            return
+        remove_rows(self, self._task_index(task_id), children, self._child_signatures[task_id],
+                    list(range(len(children))))
+        del self.children[task_id]
+        del self._child_signatures[task_id]
+    
+    def task_id_of(self, index: QModelIndex) -> Optional[int]:
+        """任务行对应的task_id，剧集行返回None"""
+        if not index.isValid() or index.internalPointer() is not None:
+            return None
+        return self.tasks[index.row()].task_id
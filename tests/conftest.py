@@ -0,0 +1,17 @@
+"""
+测试公共配置：把项目根目录加入导入路径，提供临时数据库
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    """临时目录中的数据库（Database每次操作都新建连接，:memory:数据库无法在连接之间共享）"""
+    return Database(str(tmp_path / "test.db"))
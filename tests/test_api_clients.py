@@ -0,0 +1,107 @@
+"""
+shortlinetv剧集接口的凭证轮换（用假的HTTP会话代替requests）
+"""
+import pytest
+import requests
+
+from src import api_clients
+from src.api_clients import ShortLineTVClient
+from src.config import config
+from src.credential_pool import CredentialPool
+from src.models import Credential
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, body: dict = None):
+        self.status_code = status_code
+        self.headers = {}
+        self.body = body
+        self.closed = False
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.closed = True
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Client Error")
+    
+    def json(self):
+        return self.body
+
+
+class FakeSession:
+    """按顺序返回预设响应，并记录每次请求使用的access-token"""
+    
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent = []
+        self.tokens = []
+    
+    def post(self, url, headers=None, **kwargs):
+        response = self.responses.pop(0)
+        self.sent.append(response)
+        self.tokens.append(headers.get("access-token"))
+        return response
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = CredentialPool('shortlinetv')
+    monkeypatch.setattr(api_clients, 'credential_pool', pool)
+    monkeypatch.setattr(config, 'CREDENTIAL_MAX_ATTEMPTS', 3)
+    monkeypatch.setattr(config, 'CREDENTIAL_MAX_AUTH_FAILURES', 3)
+    return pool
+
+
+def make_client(db, pool, monkeypatch, responses, count: int = 3):
+    client = ShortLineTVClient(db=db)
+    pool._credentials = {
+        index: Credential(id=index, source='shortlinetv', xtoken=f"token{index}", uid=str(index),
+                          enabled=1, cooldown_until=0, last_used_at=index)
+        for index in range(1, count + 1)
+    }
+    session = FakeSession(responses)
+    monkeypatch.setattr(api_clients, 'get_session', lambda: session)
+    return client, session
+
+
+OK_BODY = {"code": 0, "data": {"list": {"episode_list": []}}}
+
+
+def test_rotates_after_auth_failure_and_closes_responses(db, pool, monkeypatch):
+    client, session = make_client(db, pool, monkeypatch, [FakeResponse(401), FakeResponse(200, OK_BODY)])
+    
+    assert client.get_episodes(1, use_cache=False) == OK_BODY["data"]
+    
+    assert session.tokens == ["token1", "token2"]
+    assert all(response.closed for response in session.sent)
+    assert pool._credentials[1].cooldown_until > 0
+    assert pool._credentials[1].last_error == "HTTP 401"
+
+
+def test_error_code_in_body_cools_credential_down(db, pool, monkeypatch):
+    bad_body = {"code": 401, "msg": "token invalid"}
+    client, session = make_client(db, pool, monkeypatch, [FakeResponse(200, bad_body), FakeResponse(200, OK_BODY)])
+    
+    assert client.get_episodes(1, use_cache=False) == OK_BODY["data"]
+    
+    assert session.tokens == ["token1", "token2"]
+    assert all(response.closed for response in session.sent)
+    failed = pool._credentials[1]
+    assert failed.cooldown_until > 0
+    assert failed.last_error == "API返回错误: token invalid"
+    assert pool._credentials[2].consecutive_failures in (None, 0)
+
+
+def test_gives_up_after_max_attempts(db, pool, monkeypatch):
+    client, session = make_client(db, pool, monkeypatch, [FakeResponse(403), FakeResponse(429), FakeResponse(403)])
+    
+    with pytest.raises(Exception, match="获取剧集信息失败"):
+        client.get_episodes(1, use_cache=False)
+    
+    assert len(session.sent) == 3
+    assert all(response.closed for response in session.sent)
+    assert pool.available_count() == 0
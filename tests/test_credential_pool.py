@@ -0,0 +1,105 @@
+"""
+凭证池的冷却、停用和轮换（不绑定数据库）
+"""
+import pytest
+
+from src import credential_pool as credential_pool_module
+from src.config import config
+from src.credential_pool import CredentialPool
+from src.models import Credential
+
+
+@pytest.fixture
+def now(monkeypatch):
+    current = [1000.0]
+    monkeypatch.setattr(credential_pool_module.time, 'time', lambda: current[0])
+    monkeypatch.setattr(config, 'CREDENTIAL_AUTH_COOLDOWN', 600)
+    monkeypatch.setattr(config, 'CREDENTIAL_MAX_AUTH_FAILURES', 3)
+    monkeypatch.setattr(config, 'CREDENTIAL_RATE_LIMIT_COOLDOWN', 60)
+    monkeypatch.setattr(config, 'CREDENTIAL_MAX_COOLDOWN', 200)
+    return current
+
+
+def make_pool(count: int):
+    pool = CredentialPool('shortlinetv')
+    credentials = [Credential(id=index, source='shortlinetv', xtoken=f"token{index}", uid=str(index),
+                              enabled=1, cooldown_until=0, last_used_at=0)
+                   for index in range(1, count + 1)]
+    pool._credentials = {credential.id: credential for credential in credentials}
+    return pool, credentials
+
+
+def test_acquire_rotates_least_recently_used(now):
+    pool, credentials = make_pool(2)
+    
+    first = pool.acquire()
+    now[0] += 1
+    second = pool.acquire()
+    now[0] += 1
+    
+    assert {first.id, second.id} == {1, 2}
+    assert pool.acquire() is first
+
+
+def test_auth_failure_cools_down_then_disables(now):
+    pool, (credential,) = make_pool(1)
+    
+    pool.report_failure(credential, 401)
+    assert credential.cooldown_until == now[0] + 600
+    assert pool.acquire() is None
+    assert pool.available_count() == 0
+    
+    now[0] += 600
+    assert pool.acquire() is credential
+    
+    pool.report_failure(credential, 403)
+    pool.report_failure(credential, 403)
+    assert not credential.enabled
+    now[0] += 10000
+    assert pool.acquire() is None
+
+
+def test_success_resets_consecutive_failures(now):
+    pool, (credential,) = make_pool(1)
+    
+    pool.report_failure(credential, 401)
+    pool.report_failure(credential, 401)
+    pool.report_success(credential)
+    pool.report_failure(credential, 401)
+    
+    assert credential.enabled
+    assert credential.consecutive_failures == 1
+    assert credential.failure_count == 3
+
+
+def test_rate_limit_uses_retry_after(now):
+    pool, (credential,) = make_pool(1)
+    
+    pool.report_failure(credential, 429, retry_after="15")
+    assert credential.cooldown_until == now[0] + 15
+    
+    # Retry-After同样不超过上限
+    pool.report_failure(credential, 429, retry_after="3600")
+    assert credential.cooldown_until == now[0] + 200
+
+
+def test_rate_limit_backoff_doubles_up_to_cap(now):
+    pool, (credential,) = make_pool(1)
+    
+    cooldowns = []
+    for _ in range(4):
+        pool.report_failure(credential, 429)
+        cooldowns.append(credential.cooldown_until - now[0])
+    
+    assert cooldowns == [60, 120, 200, 200]
+    assert credential.enabled
+
+
+def test_cooled_down_credential_is_skipped(now):
+    pool, (first, second) = make_pool(2)
+    
+    pool.report_failure(first, 429)
+    
+    assert pool.acquire() is second
+    assert pool.acquire() is second
+    assert pool.available_count() == 1
@@ -0,0 +1,229 @@
+"""
+数据库：触发器维护的task_stats、批量删除、已完成剧集的键集分页、数据版本号
+"""
+import sqlite3
+
+from src.database import Database
+
+STATS_COLUMNS = (
+    'pending_count', 'downloading_count', 'completed_count', 'error_count',
+    'deleted_count', 'progress_sum', 'downloaded_bytes', 'total_bytes',
+)
+
+
+def create_task(db, episode_count: int, name: str = "任务") -> int:
+    task_id = db.create_task(name, 'reelshort', name, f"https://example.com/{name}", 1, episode_count, "/tmp")
+    db.add_episodes(task_id, [{'episode_num': num, 'episode_url': f"https://example.com/{name}/{num}"}
+                              for num in range(1, episode_count + 1)])
+    return task_id
+
+
+def episode_ids(db, task_id: int) -> list:
+    return [episode.id for episode in db.get_task_episodes(task_id)]
+
+
+def read_stats(db) -> dict:
+    """task_stats表的内容 {task_id: (各计数和累计值)}"""
+    conn = sqlite3.connect(db.db_path)
+    rows = conn.execute(f"SELECT task_id, {', '.join(STATS_COLUMNS)} FROM task_stats").fetchall()
+    conn.close()
+    # 没有剧集的任务在重建后没有统计行，全为0的行与缺失等价
+    return {row[0]: tuple(row[1:]) for row in rows if any(row[1:])}
+
+
+def assert_stats_consistent(db):
+    """触发器维护的统计与全量重建的结果一致"""
+    maintained = read_stats(db)
+    conn = sqlite3.connect(db.db_path)
+    Database._rebuild_task_stats(conn.cursor())
+    conn.commit()
+    conn.close()
+    assert maintained == read_stats(db)
+
+
+def task_stats(db, task_id: int):
+    """任务的统计信息，没有统计行时返回None"""
+    return next((stats for stats in db.get_all_task_stats() if stats.task_id == task_id), None)
+
+
+def set_updated_at(db, values: dict):
+    """直接设置剧集的updated_at {episode_id: 时间字符串}"""
+    conn = sqlite3.connect(db.db_path)
+    conn.executemany("UPDATE episodes SET updated_at = ? WHERE id = ?",
+                     [(updated_at, episode_id) for episode_id, updated_at in values.items()])
+    conn.commit()
+    conn.close()
+
+
+def test_task_stats_triggers_follow_status_changes(db):
+    first = create_task(db, 5, "first")
+    second = create_task(db, 3, "second")
+    assert_stats_consistent(db)
+    
+    stats = task_stats(db, first)
+    assert stats.pending_count == 5
+    assert stats.total_count == 5
+    
+    ids = episode_ids(db, first)
+    db.update_episode_status(ids[0], 'downloading', progress=40.0, downloaded_bytes=400, total_bytes=1000)
+    db.update_episode_status(ids[1], 'completed', progress=100.0, downloaded_bytes=1000, total_bytes=1000)
+    db.update_episode_status(ids[2], 'error', error_message="HTTP Error 404")
+    assert_stats_consistent(db)
+    
+    stats = task_stats(db, first)
+    assert (stats.pending_count, stats.downloading_count, stats.completed_count, stats.error_count) == (2, 1, 1, 1)
+    assert stats.progress_sum == 140.0
+    assert stats.downloaded_bytes == 1400
+    
+    # 软删除的剧集不计入进度和字节数
+    db.delete_episodes([ids[0], ids[3]])
+    assert_stats_consistent(db)
+    stats = task_stats(db, first)
+    assert stats.deleted_count == 2
+    assert stats.progress_sum == 100.0
+    
+    # 物理删除已完成的剧集、清除软删除的剧集
+    db.delete_completed_episodes([ids[1]])
+    assert db.purge_deleted_episodes() == 2
+    assert_stats_consistent(db)
+    stats = task_stats(db, first)
+    assert (stats.pending_count, stats.error_count, stats.deleted_count) == (1, 1, 0)
+    
+    # 另一个任务不受影响
+    assert task_stats(db, second).pending_count == 3
+
+
+def test_task_stats_removed_with_orphan_task(db):
+    task_id = create_task(db, 2)
+    ids = episode_ids(db, task_id)
+    for episode_id in ids:
+        db.update_episode_status(episode_id, 'completed', progress=100.0)
+    
+    db.delete_completed_episodes(ids)
+    
+    assert db.get_task_by_id(task_id) is None
+    assert task_stats(db, task_id) is None
+    assert_stats_consistent(db)
+
+
+def test_bulk_delete_beyond_variable_limit(db):
+    # 选中数量超过SQLite绑定参数上限（旧版本为999）
+    task_id = create_task(db, 1200)
+    ids = episode_ids(db, task_id)
+    conn = sqlite3.connect(db.db_path)
+    conn.execute("UPDATE episodes SET status = 'completed', progress = 100 WHERE id <= ?", (ids[1099],))
+    conn.commit()
+    conn.close()
+    
+    db.delete_completed_episodes(ids[:1100])
+    assert len(episode_ids(db, task_id)) == 100
+    
+    db.delete_episodes(ids[1100:])
+    assert {episode.status for episode in db.get_task_episodes(task_id)} == {'deleted'}
+    
+    # 清除软删除的剧集后任务没有有效剧集，一并删除
+    assert db.purge_deleted_episodes() == 100
+    assert db.get_task_by_id(task_id) is None
+    assert_stats_consistent(db)
+
+
+def test_completed_pages_follow_keyset_order_with_ties(db):
+    task_id = create_task(db, 7)
+    ids = episode_ids(db, task_id)
+    for episode_id in ids:
+        db.update_episode_status(episode_id, 'completed', progress=100.0)
+    # 多个剧集在同一秒完成时按id倒序
+    set_updated_at(db, {
+        ids[0]: '2026-01-01 10:00:00', ids[1]: '2026-01-01 10:00:01', ids[2]: '2026-01-01 10:00:01',
+        ids[3]: '2026-01-01 10:00:01', ids[4]: '2026-01-01 10:00:02', ids[5]: '2026-01-01 10:00:02',
+        ids[6]: '2026-01-01 10:00:03',
+    })
+    expected = [ids[6], ids[5], ids[4], ids[3], ids[2], ids[1], ids[0]]
+    
+    pages = []
+    before = None
+    while True:
+        page = db.get_completed_episodes_page(limit=3, before=before)
+        if not page:
+            break
+        pages.append([episode.id for episode in page])
+        before = (page[-1].updated_at, page[-1].id)
+    
+    assert pages == [expected[0:3], expected[3:6], expected[6:7]]
+    assert [episode.id for episode in db.get_completed_episodes_page()] == expected
+    
+    # after只返回排在指定剧集之前（更晚完成）的剧集
+    after = db.get_completed_episodes_page(after=('2026-01-01 10:00:01', ids[2]))
+    assert [episode.id for episode in after] == [ids[6], ids[5], ids[4], ids[3]]
+    
+    # since包含指定剧集本身
+    assert db.get_completed_episode_ids(('2026-01-01 10:00:02', ids[5])) == {ids[5], ids[6]}
+
+
+def test_completed_removals_log(db):
+    task_id = create_task(db, 4)
+    ids = episode_ids(db, task_id)
+    for episode_id in ids:
+        db.update_episode_status(episode_id, 'completed', progress=100.0)
+    
+    since, removed = db.get_completed_removals(None)
+    assert removed is None
+    
+    # 重新下载、软删除、删除都会记录；从未完成过的状态变化不记录
+    db.update_episode_status(ids[0], 'pending')
+    db.update_episode_status(ids[0], 'downloading')
+    db.delete_episodes([ids[1]])
+    db.delete_completed_episodes([ids[2]])
+    latest, removed = db.get_completed_removals(since)
+    assert removed == {ids[0], ids[1], ids[2]}
+    
+    assert db.get_completed_removals(latest) == (latest, set())
+
+
+def test_completed_removals_log_pruned(db):
+    task_id = create_task(db, 3)
+    ids = episode_ids(db, task_id)
+    for episode_id in ids:
+        db.update_episode_status(episode_id, 'completed', progress=100.0)
+    since, _ = db.get_completed_removals(None)
+    
+    conn = db.get_connection()
+    conn.execute("UPDATE episodes SET status = 'pending'")
+    conn.execute("DELETE FROM completed_removals WHERE seq = ?", (since + 1,))
+    conn.commit()
+    conn.close()
+    
+    # 日志已清理到since之后，无法确定期间的全部变化
+    assert db.get_completed_removals(since) == (since + 3, None)
+
+
+def test_completed_pages_skip_other_statuses(db):
+    task_id = create_task(db, 3)
+    ids = episode_ids(db, task_id)
+    db.update_episode_status(ids[0], 'completed', progress=100.0)
+    db.update_episode_status(ids[1], 'error')
+    
+    assert [episode.id for episode in db.get_completed_episodes_page(limit=10)] == [ids[0]]
+
+
+def test_download_url_refresh_bumps_data_version(db):
+    task_id = create_task(db, 2)
+    
+    version = db.get_data_version()
+    assert db.update_episode_download_urls(task_id, {1: "https://cdn.example.com/1.m3u8"}) == 1
+    assert db.has_changed_since(version)
+    assert db.get_task_episodes(task_id)[0].download_url == "https://cdn.example.com/1.m3u8"
+    
+    # 没有更新任何剧集时版本号不变
+    version = db.get_data_version()
+    assert db.update_episode_download_urls(task_id, {99: "https://cdn.example.com/99.m3u8"}) == 0
+    assert not db.has_changed_since(version)
+
+
+def test_follow_schedule_bumps_data_version(db):
+    task_id = create_task(db, 2)
+    
+    version = db.get_data_version()
+    db.update_follow_schedule(task_id, 1800, 12345.0)
+    assert db.has_changed_since(version)
+    assert db.get_task_by_id(task_id).follow_interval == 1800
@@ -0,0 +1,145 @@
+"""
+错误分类和按主机的熔断器
+"""
+import pytest
+
+from src import error_policy
+from src.config import config
+from src.error_policy import (
+    CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError, classify_error, is_host_failure,
+    ERROR_AUTH, ERROR_EXPIRED_URL, ERROR_PERMANENT, ERROR_TRANSIENT,
+)
+
+
+class Clock:
+    """可手动推进的time.time"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(error_policy.time, 'time', clock)
+    monkeypatch.setattr(config, 'CIRCUIT_FAILURE_THRESHOLD', 3)
+    monkeypatch.setattr(config, 'CIRCUIT_OPEN_SECONDS', 30)
+    monkeypatch.setattr(config, 'CIRCUIT_MAX_OPEN_SECONDS', 100)
+    return clock
+
+
+@pytest.mark.parametrize("error, context, expected", [
+    ("HTTP Error 401: Unauthorized", 'api', ERROR_AUTH),
+    ("HTTP Error 403: Forbidden", 'download', ERROR_EXPIRED_URL),
+    ("403 Client Error: Forbidden for url", 'api', ERROR_AUTH),
+    ("HTTP Error 410: Gone", 'download', ERROR_EXPIRED_URL),
+    ("HTTP Error 404: Not Found", 'download', ERROR_PERMANENT),
+    ("503 Server Error: Service Unavailable", 'api', ERROR_TRANSIENT),
+    ("HTTP Error 429: Too Many Requests", 'download', ERROR_TRANSIENT),
+    ("Read timed out", 'download', ERROR_TRANSIENT),
+    ("Unsupported URL: https://example.com", 'download', ERROR_PERMANENT),
+    ("Request signature expired", 'download', ERROR_EXPIRED_URL),
+    ("Request signature expired", 'api', ERROR_TRANSIENT),
+    ("something unexpected", 'download', ERROR_TRANSIENT),
+])
+def test_classify_error(error, context, expected):
+    assert classify_error(Exception(error), context) == expected
+
+
+def test_classify_circuit_open_as_transient():
+    assert classify_error(CircuitOpenError("cdn.example.com", 0.0)) == ERROR_TRANSIENT
+
+
+def test_is_host_failure():
+    assert is_host_failure(Exception("503 Server Error: Service Unavailable"))
+    assert is_host_failure(TimeoutError("timed out"))
+    assert not is_host_failure(Exception("HTTP Error 404: Not Found"))
+    assert not is_host_failure(Exception("HTTP Error 403: Forbidden"))
+    assert not is_host_failure(CircuitOpenError("cdn.example.com", 0.0))
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker("cdn.example.com")
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+    
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.open_until == clock.now + 30
+    assert not breaker.is_available()
+    assert not breaker.allow_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker("cdn.example.com")
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_allows_single_probe(clock):
+    breaker = CircuitBreaker("cdn.example.com")
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 30
+    
+    # is_available只查询状态，不占用试探名额
+    assert breaker.is_available()
+    assert breaker.is_available()
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+    assert not breaker.is_available()
+    
+    # 试探请求没有发出时释放名额
+    breaker.release_probe()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens_with_doubled_time(clock):
+    breaker = CircuitBreaker("cdn.example.com")
+    for _ in range(3):
+        breaker.record_failure()
+    
+    open_times = []
+    for _ in range(3):
+        clock.now = breaker.open_until
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        open_times.append(breaker.open_until - clock.now)
+    
+    # 30 -> 60 -> 100（上限）
+    assert open_times == [60, 100, 100]
+
+
+def test_registry_records_by_host(clock):
+    registry = CircuitBreakerRegistry()
+    url = "https://CDN.example.com/video/1.m3u8"
+    for _ in range(3):
+        registry.record(url, Exception("HTTP Error 502: Bad Gateway"))
+    
+    assert not registry.is_available("https://cdn.example.com/video/2.m3u8")
+    assert registry.is_available("https://other.example.com/video/1.m3u8")
+    assert registry.get_open_hosts() == {"cdn.example.com": clock.now + 30}
+    
+    # 404说明主机可达，按成功处理
+    clock.now += 30
+    registry.get("cdn.example.com").allow_request()
+    registry.record(url, Exception("HTTP Error 404: Not Found"))
+    assert registry.get("cdn.example.com").state == CircuitBreaker.CLOSED
@@ -0,0 +1,82 @@
+"""
+追更：检查间隔的自适应调整和剧集区间
+"""
+import pytest
+
+from src.config import config
+from src.follow_syncer import FollowSyncer, follow_range, next_follow_interval
+from src.models import Task, OPEN_END_EPISODE
+
+
+@pytest.fixture(autouse=True)
+def intervals(monkeypatch):
+    monkeypatch.setattr(config, 'FOLLOW_DEFAULT_INTERVAL', 3600)
+    monkeypatch.setattr(config, 'FOLLOW_MIN_INTERVAL', 900)
+    monkeypatch.setattr(config, 'FOLLOW_MAX_INTERVAL', 86400)
+    monkeypatch.setattr(config, 'FOLLOW_BACKOFF_FACTOR', 1.5)
+
+
+def test_interval_halves_on_new_episodes():
+    assert next_follow_interval(3600, True) == 1800
+    assert next_follow_interval(1200, True) == 900
+
+
+def test_interval_backs_off_without_new_episodes():
+    assert next_follow_interval(3600, False) == 5400
+    assert next_follow_interval(80000, False) == 86400
+
+
+def test_interval_defaults_when_unset():
+    assert next_follow_interval(None, False) == 5400
+    assert next_follow_interval(0, True) == 1800
+
+
+def test_interval_converges_for_daily_updates():
+    interval = 3600
+    for _ in range(10):
+        interval = next_follow_interval(interval, True)
+    assert interval == 900
+    for _ in range(30):
+        interval = next_follow_interval(interval, False)
+    assert interval == 86400
+
+
+@pytest.mark.parametrize("source, start, end, expected", [
+    ('shortlinetv', 1, 0, (1, 0, True)),
+    ('shortlinetv', 5, 20, (5, 0, False)),
+    ('reelshort', 0, 0, (0, 0, True)),
+    ('reelshort', 3, 10, (3, OPEN_END_EPISODE, False)),
+])
+def test_follow_range(source, start, end, expected):
+    task = Task(source=source, start_episode=start, end_episode=end)
+    assert follow_range(task) == expected
+
+
+def test_sync_task_inserts_new_episodes_with_resolved_urls(db):
+    task_id = db.create_task("追更", 'reelshort', "追更", "https://www.reelshort.com/movie/x", 1, 2, "/tmp",
+                             follow=True)
+    db.add_episodes(task_id, [{'episode_num': 1, 'episode_url': "page/1", 'download_url': "stream/1"}])
+    task = db.get_task_by_id(task_id)
+    
+    syncer = FollowSyncer(db)
+    listed = [{'episode_num': num, 'episode_url': f"page/{num}", 'download_url': f"page/{num}"}
+              for num in (1, 2, 3)]
+    syncer.fetch_episodes = lambda task: (listed, {})
+    resolved = []
+    
+    def resolve(task, api_data, new_episodes):
+        # 解析时新剧集还没有入库，下载队列不会取到页面地址
+        assert db.get_task_episode_nums(task.id) == {1}
+        resolved.extend(episode['episode_num'] for episode in new_episodes)
+        for episode in new_episodes:
+            episode['download_url'] = f"stream/{episode['episode_num']}"
+    
+    syncer._resolve_new_streams = resolve
+    
+    assert syncer.sync_task(task) == 2
+    assert resolved == [2, 3]
+    episodes = db.get_task_episodes(task_id)
+    assert [(episode.episode_num, episode.download_url, episode.status) for episode in episodes] == [
+        (1, "stream/1", 'pending'), (2, "stream/2", 'pending'), (3, "stream/3", 'pending'),
+    ]
+    assert db.get_task_by_id(task_id).follow_interval == 1800
@@ -0,0 +1,50 @@
+"""
+共享HTTP会话的adapter：请求结果计入熔断器
+"""
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.error_policy import CircuitBreaker, circuit_breakers
+from src.http_session import CountingHTTPAdapter
+
+
+def half_open_breaker(host: str) -> CircuitBreaker:
+    """熔断已到期的主机（下一个请求成为半开状态的试探请求）"""
+    breaker = circuit_breakers.get(host)
+    breaker.state = CircuitBreaker.OPEN
+    breaker.open_until = 0.0
+    return breaker
+
+
+def send_raising(monkeypatch, host: str, error: Exception):
+    def fail(self, request, **kwargs):
+        raise error
+    
+    monkeypatch.setattr(HTTPAdapter, 'send', fail)
+    request = requests.Request('GET', f"https://{host}/video.m3u8").prepare()
+    with pytest.raises(type(error)):
+        CountingHTTPAdapter().send(request)
+
+
+@pytest.mark.parametrize("error", [
+    requests.exceptions.ChunkedEncodingError("connection broken"),
+    requests.exceptions.InvalidURL("bad url"),
+    ValueError("unexpected"),
+])
+def test_other_errors_release_probe(monkeypatch, error):
+    breaker = half_open_breaker("probe-release.example.com")
+    
+    send_raising(monkeypatch, "probe-release.example.com", error)
+    
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_connection_error_reopens(monkeypatch):
+    breaker = half_open_breaker("probe-failure.example.com")
+    
+    send_raising(monkeypatch, "probe-failure.example.com", requests.exceptions.ConnectionError("refused"))
+    
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
@@ -0,0 +1,89 @@
+"""
+yt-dlp进度钩子：分片内插值、进度单调、速度平滑
+"""
+import pytest
+
+from src.config import config
+from src.download_manager import DownloadProgressHook
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+    
+    def __call__(self, episode_id, progress, status, error_message=None, **kwargs):
+        self.calls.append((progress, status, kwargs.get('total_bytes')))
+
+
+def fragment_update(completed: int, downloaded: int, count: int = 10, estimate: int = 8000) -> dict:
+    """yt-dlp分片下载的进度：fragment_index从0开始，每完成一个分片加1"""
+    return {
+        'status': 'downloading', 'fragment_index': completed, 'fragment_count': count,
+        'downloaded_bytes': downloaded, 'total_bytes_estimate': estimate,
+    }
+
+
+def test_fragment_progress_interpolates_within_fragment():
+    recorder = Recorder()
+    hook = DownloadProgressHook(1, recorder)
+    updates = [
+        (0, 0),       # 第一个分片完成前按估算总大小平均（800字节/分片）
+        (0, 500),
+        (1, 1000),    # 之后按已完成分片的平均大小（1000字节/分片）
+        (1, 1500),
+        (1, 1999),
+        (1, 2500),    # 超出估算的分片大小时停在分片末尾
+        (2, 2600),    # 两个分片共2600字节（1300字节/分片）
+        (2, 3380),
+        (9, 9000),
+        (9, 9900),
+        (10, 10000),  # 全部分片已完成，等待finished
+    ]
+    for completed, downloaded in updates:
+        hook(fragment_update(completed, downloaded))
+    
+    progresses = [progress for progress, _, _ in recorder.calls]
+    assert progresses == pytest.approx([0, 6.25, 10, 15, 19.99, 20, 20, 26, 90, 99, 99.9])
+    totals = [total_bytes for _, _, total_bytes in recorder.calls]
+    assert totals[0] == pytest.approx(8000)
+    assert totals[2] == pytest.approx(10000)
+    assert totals[6] == pytest.approx(13000)
+    assert totals[10] == pytest.approx(10000)
+
+
+def test_progress_never_decreases_and_stays_below_complete():
+    recorder = Recorder()
+    hook = DownloadProgressHook(1, recorder)
+    
+    hook(fragment_update(2, 2000))
+    hook(fragment_update(1, 1000))  # yt-dlp重试较早的分片
+    hook(fragment_update(9, 9000))
+    hook(fragment_update(9, 20000))
+    hook({'status': 'finished'})
+    
+    assert [progress for progress, _, _ in recorder.calls] == [20, 20, 90, 99.9, 100.0]
+    assert recorder.calls[-1][1] == 'completed'
+
+
+def test_progress_without_fragments_uses_total_bytes():
+    recorder = Recorder()
+    hook = DownloadProgressHook(1, recorder)
+    
+    hook({'status': 'downloading', 'downloaded_bytes': 250, 'total_bytes': 1000})
+    hook({'status': 'downloading', 'downloaded_bytes': 400, 'total_bytes_estimate': 800})
+    hook({'status': 'downloading', 'downloaded_bytes': 500})
+    
+    assert [progress for progress, _, _ in recorder.calls] == [25, 50, 50]
+
+
+def test_speed_is_smoothed(monkeypatch):
+    monkeypatch.setattr(config, 'PROGRESS_SPEED_SMOOTHING', 0.3)
+    hook = DownloadProgressHook(1, None)
+    
+    assert hook.update_speed(0, now=0.0) is None
+    assert hook.update_speed(1000, now=1.0) == pytest.approx(1000)
+    assert hook.update_speed(3000, now=2.0) == pytest.approx(1300)
+    # 时间没有前进或字节数回退（重新开始下载）时保持原值
+    assert hook.update_speed(3500, now=2.0) == pytest.approx(1300)
+    assert hook.update_speed(0, now=3.0) == pytest.approx(1300)
+    assert hook.update_speed(None) == pytest.approx(1300)
@@ -0,0 +1,180 @@
+"""
+列表模型的增量更新（不依赖Qt，用记录调用的假模型代替QAbstractItemModel）
+"""
+from src.models import Episode
+from src.ui.row_sync import (RowIndex, insert_rows, remove_rows, sync_rows, history_key, history_page_rows,
+                             history_stale_rows, history_missing_rows, history_new_rows)
+
+PARENT = object()
+
+
+class FakeSignal:
+    def __init__(self, calls):
+        self.calls = calls
+    
+    def emit(self, top_left, bottom_right):
+        self.calls.append(('changed', top_left, bottom_right))
+
+
+class FakeModel:
+    """记录beginInsertRows/beginRemoveRows和dataChanged调用的模型"""
+    
+    def __init__(self):
+        self.calls = []
+        self.dataChanged = FakeSignal(self.calls)
+    
+    def beginInsertRows(self, parent, first, last):
+        assert parent is PARENT
+        self.calls.append(('insert', first, last))
+    
+    def endInsertRows(self):
+        pass
+    
+    def beginRemoveRows(self, parent, first, last):
+        assert parent is PARENT
+        self.calls.append(('remove', first, last))
+    
+    def endRemoveRows(self):
+        pass
+    
+    def index(self, row, column, parent):
+        return (row, column)
+
+
+def sync(model, items, signatures, new_items):
+    """按(key, value)元组同步：key为主键，value变化时发出dataChanged"""
+    sync_rows(model, PARENT, items, signatures, new_items,
+              key=lambda item: item[0], signature=lambda item: (item[1],), last_column=3)
+
+
+def make_rows(*keys, value=0):
+    return [(key, value) for key in keys]
+
+
+def test_sync_rows_from_empty_inserts_all():
+    model = FakeModel()
+    items, signatures = [], []
+    
+    sync(model, items, signatures, make_rows('a', 'b', 'c'))
+    
+    assert model.calls == [('insert', 0, 2)]
+    assert items == make_rows('a', 'b', 'c')
+    assert signatures == [(0,), (0,), (0,)]
+
+
+def test_sync_rows_removes_contiguous_ranges_from_bottom():
+    model = FakeModel()
+    items, signatures = make_rows('a', 'b', 'c', 'd', 'e'), [(0,)] * 5
+    
+    sync(model, items, signatures, make_rows('a', 'd'))
+    
+    assert model.calls == [('remove', 4, 4), ('remove', 1, 2)]
+    assert items == make_rows('a', 'd')
+    assert len(signatures) == 2
+
+
+def test_sync_rows_inserts_at_new_positions():
+    model = FakeModel()
+    items, signatures = make_rows('b', 'd'), [(0,)] * 2
+    
+    sync(model, items, signatures, make_rows('a', 'b', 'c', 'd', 'e', 'f'))
+    
+    assert model.calls == [('insert', 0, 0), ('insert', 2, 2), ('insert', 4, 5)]
+    assert items == make_rows('a', 'b', 'c', 'd', 'e', 'f')
+
+
+def test_sync_rows_emits_changed_only_for_modified_rows():
+    model = FakeModel()
+    items, signatures = make_rows('a', 'b', 'c', 'd'), [(0,)] * 4
+    
+    sync(model, items, signatures, [('a', 0), ('b', 1), ('c', 1), ('d', 0)])
+    
+    assert model.calls == [('changed', (1, 0), (2, 3))]
+    assert signatures == [(0,), (1,), (1,), (0,)]
+    
+    # 内容不变时不发出任何信号
+    model.calls.clear()
+    sync(model, items, signatures, [('a', 0), ('b', 1), ('c', 1), ('d', 0)])
+    assert model.calls == []
+
+
+def test_sync_rows_rebuilds_on_reorder():
+    model = FakeModel()
+    items, signatures = make_rows('a', 'b', 'c'), [(0,)] * 3
+    
+    sync(model, items, signatures, make_rows('c', 'a', 'b'))
+    
+    assert model.calls == [('remove', 0, 2), ('insert', 0, 2)]
+    assert items == make_rows('c', 'a', 'b')
+
+
+def completed(episode_id: int, updated_at: str) -> Episode:
+    return Episode(id=episode_id, status='completed', updated_at=updated_at)
+
+
+def test_history_page_rows_skips_loaded_and_newer_rows():
+    loaded = [completed(5, '2026-01-01 10:00:05'), completed(3, '2026-01-01 10:00:03')]
+    page = [completed(3, '2026-01-01 10:00:03'), completed(4, '2026-01-01 10:00:04'),
+            completed(2, '2026-01-01 10:00:03'), completed(1, '2026-01-01 10:00:01')]
+    
+    assert [episode.id for episode in history_page_rows(loaded, page)] == [2, 1]
+    assert [episode.id for episode in history_page_rows([], page)] == [3, 4, 2, 1]
+
+
+def test_history_stale_rows_looks_up_changed_ids():
+    rows = {5: 0, 4: 1, 3: 2, 2: 3}
+    
+    # 剧集4重新完成、剧集3已移出完成状态，剧集9未加载
+    assert history_stale_rows(lambda episode_id: rows.get(episode_id, -1), [3, 4, 9, 4]) == [1, 2]
+    assert history_stale_rows(lambda episode_id: rows.get(episode_id, -1), []) == []
+
+
+def test_history_missing_rows():
+    loaded = [completed(5, '2026-01-01 10:00:05'), completed(4, '2026-01-01 10:00:04'),
+              completed(3, '2026-01-01 10:00:03'), completed(2, '2026-01-01 10:00:02')]
+    
+    # 剧集4、3已不存在；floor之后追加的剧集2不在检查范围内
+    assert history_missing_rows(loaded, live_ids={5}, floor=history_key(loaded[2])) == [1, 2]
+
+
+def test_history_new_rows_only_above_top():
+    loaded = [completed(5, '2026-01-01 10:00:05')]
+    new_episodes = [completed(7, '2026-01-01 10:00:07'), completed(6, '2026-01-01 10:00:05'),
+                    completed(4, '2026-01-01 10:00:05')]
+    
+    assert [episode.id for episode in history_new_rows(loaded, new_episodes)] == [7, 6]
+    assert [episode.id for episode in history_new_rows([], new_episodes)] == [7, 6, 4]
+
+
+def test_row_index_follows_inserts_and_removals():
+    model = FakeModel()
+    items, signatures = [], []
+    index = RowIndex(key=lambda item: item)
+    
+    def insert(row, new_items):
+        insert_rows(model, PARENT, items, signatures, row, new_items, lambda item: (item,))
+        index.inserted(items, row, len(new_items))
+    
+    def remove(rows):
+        keys = [items[row] for row in rows]
+        remove_rows(model, PARENT, items, signatures, rows)
+        index.removed(items, rows, keys)
+    
+    def assert_consistent():
+        assert [index.row_of(item) for item in items] == list(range(len(items)))
+    
+    insert(0, ['c', 'd'])  # 首次插入
+    insert(2, ['e', 'f'])  # 末尾追加
+    insert(0, ['a', 'b'])  # 顶部插入
+    assert_consistent()
+    
+    remove([0])  # 删除顶部的行
+    assert_consistent()
+    remove([1, 3])  # 删除中间的行
+    assert items == ['b', 'd', 'f']
+    assert_consistent()
+    insert(1, ['x'])  # 中间插入
+    assert_consistent()
+    
+    assert index.row_of('a') == -1
+    assert index.row_of('c') == -1